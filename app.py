@@ -4,11 +4,19 @@ import numpy as np
 from datetime import date, timedelta
 import string
 import time
+from comum.aquecimento import Progresso_Aquecimento, iniciar_aquecimento
+from comum.perfil import Controle_Perfil, Painel_Perfil
+from comum.secoes import reiniciar_dependencias
+from comum.telemetria import iniciar_telemetria, medir_execucao, registrar_execucao
 #Definindo função para pegar dados
 
 #Definindo as pages
 
 st.set_page_config(layout="wide")
+# Carrega todas as planilhas em segundo plano logo na primeira execução
+aquecimento = iniciar_aquecimento()
+# Exporta as métricas se DASHS_METRICAS_PORTA ou DASHS_METRICAS_ARQUIVO estiverem definidas
+iniciar_telemetria()
 backlog = st.Page("backlog_ordens/backlog.py",title="BackLog de Ordens",icon=":material/dashboard:") 
 tempotria = st.Page("tempotria/tempotria.py",title="Tempo de Triagem",icon=":material/dashboard:")
 ci =  st.Page("ci/ci.py",title="Condições Inseguras",icon=":material/dashboard:")
@@ -24,6 +32,8 @@ def Logo(url):
 
 LOGO_URL_LARGE="images/samarco.png"
 Logo(LOGO_URL_LARGE)
+Progresso_Aquecimento(aquecimento)
+Controle_Perfil()
 
 
 pg = st.navigation(
@@ -33,4 +43,10 @@ pg = st.navigation(
         "Computer-Vision":[cv]
     }
 )
-pg.run()
\ No newline at end of file
+registrar_execucao(pg.title)
+# As seções da página se registram de novo a cada execução completa (ver comum.secoes)
+reiniciar_dependencias()
+with medir_execucao(pg.title):
+    pg.run()
+# Só aparece com a medição de desempenho ligada
+Painel_Perfil()
\ No newline at end of file
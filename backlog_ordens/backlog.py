@@ -1,455 +1,104 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 from datetime import date, timedelta
 import string
-import altair as alt
 from streamlit_extras.metric_cards import style_metric_cards
+from comum.cargas import carregar
+from comum.exportar import Baixar_Dados
+from comum.filtros import Filtro_Ano, selecao
+from comum.graficos import Grafico_Rotulado_Data, Grafico_Rotulado_Data_Dual
+from comum.perfil import etapa
+from comum.previsao import FREQUENCIAS, NIVEIS, avaliacao_filtrada, consolidado
+from comum.secoes import Executar_Secao
+from comum.tabela import Tabela_Paginada
+
+# Filtro de ano: (chave do ano, chave dos meses, coluna de data)
+ANO = ("filtro_ano", "filtro_meses", "Data-base_iníc")
+
+# Métricas exibidas: (nome em comum.previsao.METRICAS, casas decimais, sufixo, cor do delta)
+CARTOES = [
+    ("MSE", 2, "", "inverse"),
+    ("RMSE", 2, "", "inverse"),
+    ("MAE", 2, "", "inverse"),
+    ("MAPE", 2, " %", "inverse"),
+    ("R²", 2, " %", "normal"),
+    ("Viés", 2, "", "off"),
+]
+# Janela móvel das métricas, em períodos da consolidação (meses, avaliando cada registro)
+JANELA = 3
+
+
+def _formatar(valor, casas, sufixo=""):
+    # Número no formato brasileiro: 1.234,56
+    if np.isnan(valor):
+        return "–"
+    # Somar 0.0 troca o -0,00 dos arredondamentos por 0,00
+    valor = round(valor, casas) + 0.0
+    return f"{valor:,.{casas}f}".replace(",", "_").replace(".", ",").replace("_", ".") + sufixo
 
-@st.cache_data
-def load_data():
-    tria = pd.read_excel("./PrevisaoHH.xlsx")
-    tria.columns= ["X","y_train","y_pred"]
-    return tria
 
-
-@st.cache_data
-def get_data():
-    # Criar colunas baseadas no alfabeto
-    columns = ["Produto " + column for column in string.ascii_uppercase[:10]]  # Limitar para 10 produtos
-    valores = np.random.normal(1000, 600, len(columns))
-    dicionario = dict(zip(columns, valores))
-
-    # Criar datas para o intervalo desejado
-    data_vendas = pd.date_range(start=date(2023, 1, 1), end=date(2023, 12, 31), freq="D")
-
-    # Criar DataFrame com os dados simulados
-    data = pd.DataFrame(index=data_vendas)
-
-    for column, valor in dicionario.items():
-        data[column] = np.random.normal(valor, 500, len(data_vendas))
-
-    return data
-
-
-def Grafico_Rotulado_Data(data, axisx, axisy, rotuloY, titulo):
-    """
-    Exibe um gráfico de linha com área preenchida, interativo, com hover, pontos, tooltips e rótulos.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy: Nome da coluna para o eixo Y.
-    - rotuloY: Título do eixo Y.
-    - titulo: Título do gráfico.
-    """
-    hover = alt.selection_single(
-        fields=[axisx],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
-
-    # Criar o gráfico de linha com área preenchida
-    area = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_area(opacity=0.4, line={"color": "#005FB8", "width": 2})  # Linha com área preenchida
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-    )
-
-    # Pontos para o hover
-    points = area.transform_filter(hover).mark_circle(size=75, color="#005FB8")
-
-    # Rótulos nos pontos
-    labels = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, dy=-5, fontSize=12, color="#005FB8")
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            text=alt.Text(axisy, format=".0f"),
-        )
-        .transform_filter(hover)  # Mostra apenas o rótulo no ponto de hover
-    )
-
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule(color="gray")
-        .encode(
-            x=alt.X(axisx, title=""),
-            opacity=alt.condition(hover, alt.value(0.5), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-        .add_selection(hover)
-    )
-
-    # Combinação de camadas
-    data_layer = area + points + labels + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
-
-def Grafico_Rotulado_Data_Dual(data, axisx, axisy1, axisy2, rotuloY1, rotuloY2, titulo, cor1="#005FB8", cor2="#FF0000"):
-    """
-    Exibe um gráfico de linha com área preenchida para dois conjuntos de dados no mesmo eixo X.
-    Interativo, com hover, pontos, tooltips e rótulos.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy1: Nome da primeira coluna para o eixo Y.
-    - axisy2: Nome da segunda coluna para o eixo Y.
-    - rotuloY1: Título do primeiro eixo Y.
-    - rotuloY2: Título do segundo eixo Y.
-    - titulo: Título do gráfico.
-    - cor1: Cor para o primeiro gráfico (padrão azul).
-    - cor2: Cor para o segundo gráfico (padrão vermelho).
-    """
-    hover = alt.selection_single(
-        fields=[axisx],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
-
-    # Gráfico para o primeiro conjunto de dados (Y1)
-    area1 = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_area(opacity=0.4, line={"color": cor1, "width": 2})
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy1, title=rotuloY1),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy1, title=rotuloY1),
-            ],
-        )
-    )
-
-    points1 = area1.transform_filter(hover).mark_circle(size=75, color=cor1)
-
-    labels1 = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, dy=-5, fontSize=12, color=cor1)
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy1, title=rotuloY1),
-            text=alt.Text(axisy1, format=".0f"),
-        )
-        .transform_filter(hover)
-    )
-
-    # Gráfico para o segundo conjunto de dados (Y2)
-    area2 = (
-        alt.Chart(data.reset_index())
-        .mark_area(opacity=0.4, line={"color": cor2, "width": 2})
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy2, title=rotuloY2),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy2, title=rotuloY2),
-            ],
-        )
-    )
-
-    points2 = area2.transform_filter(hover).mark_circle(size=75, color=cor2)
-
-    labels2 = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, dy=-5, fontSize=12, color=cor2)
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy2, title=rotuloY2),
-            text=alt.Text(axisy2, format=".0f"),
-        )
-        .transform_filter(hover)
-    )
-
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule(color="gray")
-        .encode(
-            x=alt.X(axisx, title=""),
-            opacity=alt.condition(hover, alt.value(0.5), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy1, title=rotuloY1),
-                alt.Tooltip(axisy2, title=rotuloY2),
-            ],
-        )
-        .add_selection(hover)
+def Metricas(data):
+    # Consolidação escolhida pelo usuário; trocar a opção reexecuta só esta seção
+    rotulo = st.radio("Avaliar", list(NIVEIS), horizontal=True, key="metricas_nivel")
+    avaliacao = avaliacao_filtrada(
+        data, "y", "y_pred_original", "Data-base_iníc",
+        filtros=selecao([], ANO), nivel=NIVEIS[rotulo], janela=JANELA,
     )
-
-    # Combinação de camadas
-    data_layer = area1 + points1 + labels1 + area2 + points2 + labels2 + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
-
-
-
-
-
-def Cartoes(data):
-    mediaA = round(np.average(data[['Produto A']]), 2)
-    mediaB = round(np.average(data[['Produto B']]), 2)
-    mediaC = round(np.average(data[['Produto C']]), 2)
-
-    with st.container(height=300):
-        st.metric(label="Média Produto A", value=mediaA)
-    with st.container(height=300):
-        st.metric(label="Média Produto B", value=mediaB)
-    with st.container(height=300):
-        st.metric(label="Média Produto C", value=mediaC)
-
-
-def Secao1(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Selecionando colunas relevantes
-    data = data[['Status', 'MSPN', 'Empresa', 'Disciplina', 'Centro_de_Trabalho']].copy()
-
-    # Verificar se todos os filtros estão no estado padrão ou nenhum foi selecionado
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione uma empresa") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Aplicar filtro padrão
-        data = data[data["Status"] == "MSPN"]
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione uma empresa":
-            data = data[(data['Status'] == 'MSPN') & (data['Empresa'] == st.session_state["filtro1"])]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[(data['Status'] == 'MSPN') & (data['Disciplina'] == st.session_state["filtro2"])]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[(data['Status'] == 'MSPN') & (data['Centro_de_Trabalho'] == st.session_state["filtro3"])]
-
-    # Garantindo que 'MSPN' é datetime
-    if not np.issubdtype(data['MSPN'].dtype, np.datetime64):
-        data['MSPN'] = pd.to_datetime(data['MSPN'], errors='coerce')
-
-    # Criando a coluna de mês/ano e agrupando
-    data['Mes_Ano'] = data['MSPN'].dt.to_period("M")
-    data = data.groupby("Mes_Ano")['Status'].count().reset_index()
-
-    # Convertendo Mes_Ano para timestamp
-    data['Mes_Ano'] = data['Mes_Ano'].dt.to_timestamp()
-
-    # Configurando índice para Mes_Ano
-    data.set_index('Mes_Ano', inplace=True)
-
-    # Criando o gráfico
-    with st.container(height=350):
-        Grafico_Rotulado_Data(
-            data=data.reset_index(),  # Reseta o índice para o gráfico
-            axisx="Mes_Ano",
-            axisy="Status",
-            rotuloY="",
-            titulo="Entrada de Notas MPSN",
-        )
-
-    
-def Secao2(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-    # Selecionando colunas e filtrando por 'Status' == 'MSPN'
-    data = data[['Status', 'MSPR']].copy()
-    data = data[data['Status'] == 'MSPR']
-
-    # Garantindo que 'MSPN' é datetime
-    if not np.issubdtype(data['MSPR'].dtype, np.datetime64):
-        data['MSPR'] = pd.to_datetime(data['MSPR'], errors='coerce')
-
-    # Criando a coluna de mês/ano e agrupando
-    data['Mes_Ano'] = data['MSPR'].dt.to_period("M")
-    data = data.groupby("Mes_Ano")['Status'].count().reset_index()
-
-    # Convertendo Mes_Ano para timestamp
-    data['Mes_Ano'] = data['Mes_Ano'].dt.to_timestamp()
-
-    # Configurando índice para Mes_Ano
-    data.set_index('Mes_Ano', inplace=True)
-
-    # Criando um container para as colunas
-    with st.container(height=350):
-        Grafico_Rotulado_Data(
-                data=data.reset_index(),  # Reseta o índice para o gráfico
-                axisx="Mes_Ano",
-                axisy="Status",
-                rotuloY="",
-                titulo="Entrada de Notas MSPN x MSPR",
+    geral, movel = avaliacao["geral"], avaliacao["movel"]
+    # Delta: janela móvel mais recente em relação à série inteira
+    recente = movel.iloc[-1] if len(movel) else geral * np.nan
+
+    for linha in (CARTOES[:3], CARTOES[3:]):
+        for coluna, (nome, casas, sufixo, cor) in zip(st.columns(3), linha):
+            escala = 100 if nome == "R²" else 1
+            coluna.metric(
+                label=nome,
+                value=_formatar(geral[nome] * escala, casas, sufixo),
+                delta=None if np.isnan(recente[nome]) else _formatar((recente[nome] - geral[nome]) * escala, casas, sufixo),
+                delta_color=cor,
+                help=f"Delta: últimos {JANELA} períodos em relação ao período todo",
             )
-def Secao3(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Verificando os filtros aplicados no st.session_state
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione uma empresa") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Nenhum filtro selecionado: utiliza os dados sem filtro
-        data = data[['ORDA']].copy()
-        data = data.dropna()
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione uma empresa":
-            data = data[data['Empresa'] == st.session_state["filtro1"]]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[data['Disciplina'] == st.session_state["filtro2"]]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[data['Centro_de_Trabalho'] == st.session_state["filtro3"]]
-
-        # Filtrando apenas a coluna ORDA
-        data = data[['ORDA']].copy()
-        data = data.dropna()
-
-    # Garantindo que 'ORDA' é datetime
-    data['ORDA'] = pd.to_datetime(data['ORDA'], errors='coerce')
-
-    # Criando a coluna de mês/ano e agrupando
-    data["Mes_Ano"] = data["ORDA"].dt.to_period("M")
-    data = data.groupby("Mes_Ano")["ORDA"].count().reset_index()
-    data["Mes_Ano"] = data["Mes_Ano"].dt.to_timestamp()
-
-    # Configurando o índice para Mes_Ano
-    data.set_index("Mes_Ano", inplace=True)
-
-    # Criando o gráfico
-    with st.container(height=350):
-        Grafico_Rotulado_Data(
-            data=data.reset_index(),  # Reseta o índice para o gráfico
-            axisx="Mes_Ano",
-            axisy="ORDA",
-            rotuloY="Contagem de Ordens",
-            titulo="Contagem de notas em Ordens",
-        )
-
-
-
-
-
-
-def Metricas(data):
-    # Configuração das colunas
-    col1, col2, col3 = st.columns(3)
-    col1.metric(label="MSE", value="21,2352", delta=-10)
-    col2.metric(label="Coeficiente R2", value="70,91 %", delta=0.4)
-    col3.metric(label="MAP", value="60", delta=-16)
 
     # Aplicação de estilo
     style_metric_cards(border_left_color="#005FB8",background_color="#262730",border_color="#005FB8")
 
-   
-    
 
-def Filtro_Ano(data):
-    # Criando uma coluna de ano
-    data['Ano'] = data['Data_de_criação'].dt.year
-    lista_anos = list(data['Ano'].unique())
+def Graficos(data):
+    # Granularidade escolhida pelo usuário; trocar a opção reexecuta só esta seção
+    rotulo = st.radio("Granularidade", list(FREQUENCIAS), index=2, horizontal=True, key="granularidade")
 
-    # CSS para aumentar o tamanho do texto "Ano"
-    st.markdown(
-        """
-        <style>
-        label[data-testid="stSelectboxLabel"] {
-            font-size: 20px; /* Altere o tamanho da fonte aqui */
-            font-weight: bold; /* Deixe o texto em negrito se desejar */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-    # Criando o selectbox
-    option = st.selectbox(
-        "Ano",
-        lista_anos,
-        index=None,
-        placeholder="Selecione um ano...",
-    )
-
-    return option
-def Tabela(data):
-    st.dataframe(data[["Nota","Texto","Status","Idade_média","MSPN_X_MSPR","Centro_de_Trabalho"]],hide_index=True)
-@st.cache_data
-def Previsao():
-    data = pd.read_excel("BacklogHH.xlsx")
-    return data
-
-# Criando as abas com ícones nos nomes
-tab1, tab2 = st.tabs(["📊 DashBoard: BackLog HH", "📥 Baixar dados"])
-
-with tab1:
-    st.title("Previsão Backlog HH :chart_with_upwards_trend:")
-    #df = load_data()
-   
-    prev = Previsao()
-    Metricas(prev)
-    prev["Data-base_iníc"] = pd.to_datetime(prev["Data-base_iníc"],errors="coerce")
-    
-    prev.set_index("Data-base_iníc",inplace=True)
-    y_pred =  prev['y_pred_original'].groupby(prev.index.to_period('M')).sum().reset_index()
-    y_pred['Data-base_iníc'] = y_pred['Data-base_iníc'].dt.to_timestamp()
-
-    
-    y =  prev['y'].groupby(prev.index.to_period('M')).sum().reset_index()
-    y['Data-base_iníc'] = y['Data-base_iníc'].dt.to_timestamp()
-
-    
-
-   # df.set_index('X', inplace=True)  # Colocando a coluna X como index
-   
-
-    # Agrupar por mês para y_train
-   # df_y_train = df['y_train'].groupby(df.index.to_period('M')).sum().reset_index()
-    #df_y_train['X'] = df_y_train['X'].dt.to_timestamp()
-   # df_y_train.set_index('X', inplace=True)
-
-    # Agrupar por mês para y_pred
-   # df_y_pred = df['y_pred'].groupby(df.index.to_period('M')).sum().reset_index()
-   # df_y_pred['X'] = df_y_pred['X'].dt.to_timestamp()
-   # df_y_pred.set_index('X', inplace=True)
+    # Real e previsto somados juntos sobre o mesmo índice de períodos, só no período escolhido;
+    # a série vem pronta do disco quando foi pré-calculada (ver comum.precomputar)
+    serie = consolidado(
+        data, "Data-base_iníc", ["y", "y_pred_original"], FREQUENCIAS[rotulo], selecao([], ANO)
+    ).reset_index()
+    lacunas = int((serie["Registros"] == 0).sum())
+    if lacunas:
+        st.caption(f"{lacunas} de {len(serie)} períodos sem registros ficam sem valor nos gráficos")
 
     with st.container(height=350):
         Grafico_Rotulado_Data(
-                data=y_pred.reset_index(),  # Reseta o índice para o gráfico
+                data=serie,
                 axisx="Data-base_iníc",
                 axisy="y_pred_original",
                 rotuloY="",
                 titulo="Previsão",
+                rotulo_hover=True,
             )
         
     with st.container(height=350):
         Grafico_Rotulado_Data(
-                data=y.reset_index(),  # Reseta o índice para o gráfico
+                data=serie,
                 axisx="Data-base_iníc",
                 axisy="y",
                 rotuloY="",
                 titulo="Valor real HH",
+                rotulo_hover=True,
             )
     with st.container(height=350):
-        df_combined = pd.DataFrame({
-        "Data-base_iníc": y_pred.reset_index()["Data-base_iníc"],  # Usando as datas de df_y_train como referência para o eixo X
-        "HH Real": y["y"].values,  # Valores de y_train
-        "HH Previsto": y_pred["y_pred_original"].values  # Valores de y_pred
-          })
-        df_long = df_combined.melt(id_vars="Data-base_iníc", var_name="Tipo", value_name="Valor")
+        # Real e previsto já alinhados pela data do período, não pela posição
         Grafico_Rotulado_Data_Dual(
-            data=df_combined,  # DataFrame com colunas para X, y_train e y_pred
+            data=serie.rename(columns={"y": "HH Real", "y_pred_original": "HH Previsto"}),
             axisx="Data-base_iníc",
             axisy1="HH Real",  # Primeiro eixo Y
             axisy2="HH Previsto",  # Segundo eixo Y
@@ -457,14 +106,37 @@ with tab1:
             rotuloY2="HH Previsto",
             titulo="Sobreposição: HH Real e HH Previsto"
         )
-    
-    st.dataframe(Previsao(),hide_index=True,use_container_width=True)
+
+
+def Tabela(data):
+    # Só a página visível é enviada ao navegador
+    Tabela_Paginada(data, colunas=list(data.columns), chave="tabela_previsao", filtros=selecao([], ANO))
+def Exportacao(data):
+    # Sem dependências declaradas: mudar o ano reexecuta a página inteira, e o botão junto
+    Baixar_Dados(data, "previsao_backlog_hh", filtros=selecao([], ANO), chave="exportar_previsao")
+def Previsao():
+    # Cache compartilhado com o aquecimento do app.py
+    return carregar("backlog_hh")
+
+# Criando as abas com ícones nos nomes
+tab1, tab2 = st.tabs(["📊 DashBoard: BackLog HH", "📥 Baixar dados"])
+
+with tab1:
+    st.title("Previsão Backlog HH :chart_with_upwards_trend:")
+   
+    with etapa("carga"):
+        prev = Previsao()
+    Filtro_Ano(prev, ANO)
+    Executar_Secao(Metricas, prev)
+    Executar_Secao(Graficos, prev)
+    Executar_Secao(Tabela, prev)
  
 
  
 
 with tab2:
     st.write("📥 Baixar Dados")
+    Executar_Secao(Exportacao, prev)
 
 
 
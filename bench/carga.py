@@ -0,0 +1,374 @@
+"""
+Teste de carga com várias sessões simultâneas.
+
+Cada sessão simulada repete, até o fim do teste: abre uma página sorteada
+(ZPM2, Tempo de Triagem ou Backlog), muda de um a três filtros da barra lateral
+(``filtro1``..``filtro3``) e pensa entre uma ação e outra. Dois modos:
+
+- ``--servidor URL``: conecta no websocket de um servidor do Streamlit já no
+  ar, como um navegador. A troca de filtro dispara o callback de verdade, então
+  mede as reexecuções isoladas dos fragmentos (ver comum.secoes);
+- ``--iniciar``: sobe um ``streamlit run app.py`` local numa porta livre, roda
+  o teste contra ele e encerra o servidor;
+- sem nenhum dos dois: roda o app pelo AppTest, uma thread por sessão, no
+  próprio processo e com os mesmos caches. O AppTest não dispara callbacks
+  (cada troca de filtro é uma execução completa) e não aceita execuções
+  simultâneas, então as execuções entram numa fila única: a latência inclui a
+  espera na fila, como num servidor com um só núcleo livre.
+
+Relata vazão, latências p50/p95/p99 por tipo de ação e o crescimento de
+memória do servidor (RSS pelo /proc no modo local e no AppTest; com
+``--metricas``, lido de ``dashs_memoria_rss_bytes``, ver comum.telemetria).
+
+Uso: python -m bench.carga --sessoes 8 --duracao 60 [--pensar 1 3]
+                           [--servidor ws://localhost:8501 | --iniciar]
+                           [--metricas http://localhost:9464/metrics]
+"""
+import argparse
+import contextlib
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Páginas navegadas: (script no AppTest, título no st.navigation do app.py)
+PAGINAS = {
+    "zpm2": ("zpm2/zpm2.py", "ZPM2"),
+    "tempotria": ("tempotria/tempotria.py", "Tempo de Triagem"),
+    "backlog": ("backlog_ordens/backlog.py", "BackLog de Ordens"),
+}
+FILTROS = ["filtro1", "filtro2", "filtro3"]
+
+# O AppTest guarda estado global durante a execução; uma execução por vez
+_FILA_APPTEST = threading.Lock()
+
+
+def _rss_processo(pid):
+    # RSS de um processo pelo /proc (Linux)
+    paginas = int(Path(f"/proc/{pid}/statm").read_text().split()[1])
+    return paginas * os.sysconf("SC_PAGE_SIZE")
+
+
+def _rss_metricas(url):
+    texto = urllib.request.urlopen(url, timeout=5).read().decode()
+    return float(re.search(r"^dashs_memoria_rss_bytes (\S+)$", texto, re.M).group(1))
+
+
+class SessaoHeadless:
+    """
+    Sessão simulada pelo AppTest, no mesmo processo.
+
+    Parâmetros:
+    - tempo_limite: Segundos máximos de uma execução do script.
+    """
+
+    def __init__(self, tempo_limite=300):
+        from streamlit.testing.v1 import AppTest
+
+        self._teste = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=tempo_limite)
+        self.opcoes = {}
+
+    def _verificar(self):
+        if self._teste.exception:
+            raise RuntimeError(self._teste.exception[0].message)
+
+    def abrir(self, pagina):
+        with _FILA_APPTEST:
+            self._teste.switch_page(PAGINAS[pagina][0]).run()
+        self._verificar()
+        self.opcoes = {
+            caixa.key: list(caixa.options) for caixa in self._teste.sidebar.selectbox if caixa.key in FILTROS
+        }
+
+    def filtrar(self, chave, valor):
+        self._teste.session_state[chave] = valor
+        with _FILA_APPTEST:
+            self._teste.run()
+        self._verificar()
+
+    def fechar(self):
+        pass
+
+
+class SessaoServidor:
+    """
+    Sessão simulada pelo websocket do servidor, como um navegador.
+
+    Parâmetros:
+    - url: Endereço do servidor, por exemplo ``ws://localhost:8501``.
+    - tempo_limite: Segundos máximos de espera pelo fim de uma execução.
+
+    Requer o pacote ``websockets``.
+    """
+
+    def __init__(self, url, tempo_limite=300):
+        try:
+            from websockets.sync.client import connect
+        except ImportError as erro:
+            raise ImportError("O modo --servidor requer o pacote websockets") from erro
+
+        self._tempo_limite = tempo_limite
+        # As versões novas do websockets pedem a conexão como gerenciador de contexto
+        self._pilha = contextlib.ExitStack()
+        self._conexao = self._pilha.enter_context(
+            connect(f"{url.rstrip('/')}/_stcore/stream", subprotocols=["streamlit"], max_size=None)
+        )
+        self._paginas = {}
+        self._pagina = ""
+        self._widgets = {}
+        self._valores = {}
+        self.opcoes = {}
+        # A primeira execução traz a lista de páginas (mensagem de navegação)
+        self._executar()
+
+    def _executar(self, estados=()):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        mensagem = BackMsg()
+        mensagem.rerun_script.page_script_hash = self._pagina
+        mensagem.rerun_script.widget_states.widgets.extend(estados)
+        self._conexao.send(mensagem.SerializeToString())
+
+        while True:
+            resposta = ForwardMsg()
+            resposta.ParseFromString(self._conexao.recv(timeout=self._tempo_limite))
+            tipo = resposta.WhichOneof("type")
+            if tipo == "navigation":
+                # A página padrão tem caminho de URL vazio; o título identifica todas
+                self._paginas = {pagina.page_name: pagina.page_script_hash for pagina in resposta.navigation.app_pages}
+            elif tipo == "delta" and resposta.delta.WhichOneof("type") == "new_element":
+                elemento = resposta.delta.new_element
+                if elemento.WhichOneof("type") == "exception":
+                    raise RuntimeError(elemento.exception.message)
+                if elemento.WhichOneof("type") == "selectbox":
+                    caixa = elemento.selectbox
+                    # O id dos widgets com key termina com a própria key
+                    chave = caixa.id.rsplit("-", 1)[-1]
+                    if chave in FILTROS:
+                        self._widgets[chave] = caixa.id
+                        self.opcoes[chave] = list(caixa.options)
+            elif tipo == "script_finished" and resposta.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def abrir(self, pagina):
+        self._pagina = self._paginas[PAGINAS[pagina][1]]
+        self._widgets, self.opcoes, self._valores = {}, {}, {}
+        self._executar()
+
+    def filtrar(self, chave, valor):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        # O navegador sempre envia o valor de todos os widgets conhecidos
+        self._valores[chave] = valor
+        estados = [
+            WidgetState(id=self._widgets[nome], string_value=escolhido) for nome, escolhido in self._valores.items()
+        ]
+        self._executar(estados)
+
+    def fechar(self):
+        self._pilha.close()
+
+
+def _simular(criar_sessao, numero, fim, pensar, medicoes, erros):
+    gerador = random.Random(numero)
+    # Sessões chegam espalhadas, não todas no mesmo instante
+    time.sleep(gerador.uniform(0, pensar[1]))
+    try:
+        sessao = criar_sessao()
+    except Exception as erro:
+        erros.append(f"sessão {numero}: {erro}")
+        return
+    try:
+        while time.monotonic() < fim:
+            pagina = gerador.choice(list(PAGINAS))
+            acoes = [("abrir", None)] + [("filtro", gerador.choice(FILTROS)) for _ in range(gerador.randint(1, 3))]
+            for acao, chave in acoes:
+                if time.monotonic() >= fim:
+                    break
+                inicio = time.perf_counter()
+                if acao == "abrir":
+                    sessao.abrir(pagina)
+                elif sessao.opcoes.get(chave):
+                    sessao.filtrar(chave, gerador.choice(sessao.opcoes[chave]))
+                else:
+                    # Página sem esse filtro (o Backlog não tem filtros)
+                    continue
+                medicoes.append({
+                    "sessao": numero,
+                    "acao": acao,
+                    "pagina": pagina,
+                    "segundos": time.perf_counter() - inicio,
+                    "fim": time.monotonic(),
+                })
+                time.sleep(gerador.uniform(*pensar))
+    except Exception as erro:
+        erros.append(f"sessão {numero}: {erro}")
+    finally:
+        sessao.fechar()
+
+
+def _porta_livre():
+    with socket.socket() as soquete:
+        soquete.bind(("127.0.0.1", 0))
+        return soquete.getsockname()[1]
+
+
+def iniciar_servidor(porta, tempo_limite=120):
+    """
+    Sobe ``streamlit run app.py`` na porta e espera o health check responder.
+
+    Parâmetros:
+    - porta: Porta local do servidor.
+    - tempo_limite: Segundos máximos de espera.
+
+    Retorna o subprocess.Popen do servidor.
+    """
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+         "--server.port", str(porta), "--browser.gatherUsageStats", "false"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + tempo_limite
+    while time.monotonic() < limite:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{porta}/_stcore/health", timeout=1)
+            return processo
+        except OSError:
+            if processo.poll() is not None:
+                raise RuntimeError("O servidor do Streamlit encerrou durante a inicialização")
+            time.sleep(0.5)
+    processo.kill()
+    raise TimeoutError(f"O servidor não respondeu em {tempo_limite} s")
+
+
+def _amostrar_memoria(ler, parar, amostras, intervalo=0.5):
+    while not parar.is_set():
+        try:
+            amostras.append(ler())
+        except (OSError, AttributeError, ValueError):
+            pass
+        parar.wait(intervalo)
+
+
+def executar(sessoes, duracao, pensar, criar_sessao, ler_memoria=None):
+    """
+    Roda as sessões simultâneas e retorna (medições, erros, amostras de memória).
+
+    Parâmetros:
+    - sessoes: Número de sessões simultâneas.
+    - duracao: Segundos de teste.
+    - pensar: Tupla (mínimo, máximo) do tempo de espera entre ações, em segundos.
+    - criar_sessao: Função sem argumentos que retorna uma sessão (SessaoHeadless ou SessaoServidor).
+    - ler_memoria: Função que retorna o RSS do servidor em bytes; se omitida, não mede memória.
+    """
+    medicoes, erros, amostras = [], [], []
+    parar = threading.Event()
+    if ler_memoria is not None:
+        threading.Thread(target=_amostrar_memoria, args=(ler_memoria, parar, amostras), daemon=True).start()
+    fim = time.monotonic() + duracao
+    threads = [
+        threading.Thread(target=_simular, args=(criar_sessao, numero, fim, pensar, medicoes, erros), daemon=True)
+        for numero in range(sessoes)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    parar.set()
+    return pd.DataFrame(medicoes), erros, amostras
+
+
+def resumo(medicoes, duracao):
+    """
+    Retorna a tabela de vazão e latências por tipo de ação e no total.
+
+    Parâmetros:
+    - medicoes: DataFrame retornado por ``executar``.
+    - duracao: Segundos de teste, para a vazão.
+    """
+    grupos = [(acao, grupo["segundos"]) for acao, grupo in medicoes.groupby("acao")]
+    grupos.append(("total", medicoes["segundos"]))
+    return pd.DataFrame([
+        {
+            "acao": acao,
+            "execucoes": len(segundos),
+            "por_segundo": len(segundos) / duracao,
+            "p50": np.percentile(segundos, 50),
+            "p95": np.percentile(segundos, 95),
+            "p99": np.percentile(segundos, 99),
+            "maximo": segundos.max(),
+        }
+        for acao, segundos in grupos
+    ]).round(3)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas.")
+    parser.add_argument("--sessoes", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=60, help="segundos de teste")
+    parser.add_argument("--pensar", type=float, nargs=2, default=[1, 3], metavar=("MIN", "MAX"))
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--servidor", help="websocket de um servidor no ar, por exemplo ws://localhost:8501")
+    modo.add_argument("--iniciar", action="store_true", help="sobe um servidor local para o teste")
+    parser.add_argument("--metricas", help="endpoint /metrics do app, para ler a memória do servidor")
+    parser.add_argument("--saida", help="CSV com todas as medições")
+    opcoes = parser.parse_args(argumentos)
+
+    os.chdir(RAIZ)
+    processo = None
+    ler_memoria = None
+    if opcoes.iniciar:
+        porta = _porta_livre()
+        processo = iniciar_servidor(porta)
+        opcoes.servidor = f"ws://127.0.0.1:{porta}"
+        ler_memoria = lambda: _rss_processo(processo.pid)
+    if opcoes.metricas:
+        ler_memoria = lambda: _rss_metricas(opcoes.metricas)
+
+    if opcoes.servidor:
+        criar_sessao = lambda: SessaoServidor(opcoes.servidor)
+    else:
+        from streamlit.logger import set_log_level
+
+        set_log_level("error")
+        criar_sessao = SessaoHeadless
+        ler_memoria = ler_memoria or (lambda: _rss_processo(os.getpid()))
+
+    try:
+        medicoes, erros, amostras = executar(
+            opcoes.sessoes, opcoes.duracao, tuple(opcoes.pensar), criar_sessao, ler_memoria
+        )
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    for erro in erros:
+        print(erro, file=sys.stderr)
+    if medicoes.empty:
+        print("Nenhuma ação concluída.")
+        return 1
+    print(f"{opcoes.sessoes} sessões, {opcoes.duracao:g} s, pensando de {opcoes.pensar[0]:g} a {opcoes.pensar[1]:g} s")
+    print(resumo(medicoes, opcoes.duracao).to_string(index=False))
+    if amostras:
+        mb = np.array(amostras) / 1e6
+        print(f"Memória do servidor: {mb[0]:.0f} MB no início, pico de {mb.max():.0f} MB, {mb[-1]:.0f} MB no fim")
+    if opcoes.saida:
+        medicoes.to_csv(opcoes.saida, index=False)
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Benchmark dos dashboards com dados sintéticos em várias escalas.
+
+Para cada escala, gera (ou reaproveita) os dados de ``bench.sinteticos``,
+aponta a fonte de dados para eles (``DASHS_FONTE=parquet:<pasta>``) e mede:
+
+- carga: leitura de cada conjunto com o esquema aplicado, com todos os caches
+  vazios: os do Streamlit são limpos e os persistentes (cache em disco,
+  memória compartilhada e snapshots) apontam para pastas novas a cada escala;
+- filtro: máscara combinada dos filtros da barra lateral (sem cache);
+- agregacao: montagem do cubo de ordens e consultas a ele, e o agrupamento
+  mensal das notas;
+- especificacao: montagem da especificação Vega-Lite de um gráfico;
+- pagina_*: execução completa de cada página pelo AppTest do Streamlit, na
+  primeira execução, numa reexecução e depois de mudar os filtros.
+
+O pico de memória de cada etapa é o maior RSS do processo até ali; com
+``--tracemalloc``, é o pico de alocações Python da própria etapa (os tempos
+ficam mais lentos nesse modo).
+
+Uso: python -m bench.paginas [--escalas 1 10 100] [--saida resultado.csv]
+                             [--comparar base.csv] [--tracemalloc]
+"""
+import argparse
+import hashlib
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+PASTA_DADOS = RAIZ / "bench" / ".dados"
+
+# Página: (script, filtros escolhidos na barra lateral para a etapa pagina_filtro)
+PAGINAS = {
+    "zpm2": ("zpm2/zpm2.py", {"filtro1": "ZPM2", "filtro2": "Mecânica"}),
+    "tempotria": ("tempotria/tempotria.py", {"filtro1": "Samarco", "filtro2": "Elétrica"}),
+    "backlog": ("backlog_ordens/backlog.py", {}),
+}
+
+
+def _pico_rss_mb():
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1 << 20) if sys.platform == "darwin" else pico / 1024
+
+
+def _medir(resultados, escala, etapa, alvo, funcao, repeticoes=1, precisa_memoria=False):
+    # Registra o menor tempo entre as repetições e o pico de memória da etapa
+    tempos = []
+    for _ in range(repeticoes):
+        if precisa_memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if precisa_memoria:
+            pico = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+    resultados.append({
+        "escala": escala,
+        "etapa": etapa,
+        "alvo": alvo,
+        "segundos": round(min(tempos), 4),
+        "pico_mb": round(pico if precisa_memoria else _pico_rss_mb(), 1),
+    })
+    print(f"  {etapa:<15} {alvo:<12} {min(tempos):8.3f} s", flush=True)
+
+
+def _dados_sinteticos(escala):
+    from bench import sinteticos
+
+    # Mudar o gerador gera outra pasta: dados de uma versão anterior nunca são reaproveitados
+    versao = hashlib.sha1(Path(sinteticos.__file__).read_bytes()).hexdigest()[:8]
+    pasta = PASTA_DADOS / f"escala-{escala:g}-{versao}"
+    if not (pasta / "ordens.parquet").exists():
+        print(f"Gerando dados sintéticos na escala {escala:g}x em {pasta}...", flush=True)
+        sinteticos.gravar(pasta, escala)
+    return pasta
+
+
+def _caches_vazios():
+    # Pastas novas para os caches persistentes, para a carga ler as fontes e não os
+    # arquivos de uma execução anterior; retorna as pastas, apagadas ao fim da escala
+    memoria = Path("/dev/shm") if Path("/dev/shm").is_dir() else None
+    pastas = {
+        "DASHS_CACHE_DISCO": Path(tempfile.mkdtemp(prefix="dashs-bench-disco-")),
+        "DASHS_COMPARTILHADO": Path(tempfile.mkdtemp(prefix="dashs-bench-", dir=memoria)),
+        "DASHS_SNAPSHOTS": Path(tempfile.mkdtemp(prefix="dashs-bench-snapshots-")),
+    }
+    os.environ.update({variavel: str(pasta) for variavel, pasta in pastas.items()})
+    # Os módulos leem as pastas na importação; da segunda escala em diante já foram importados
+    for modulo, atributo, variavel in (
+        ("comum.cache_disco", "PASTA", "DASHS_CACHE_DISCO"),
+        ("comum.compartilhado", "PASTA", "DASHS_COMPARTILHADO"),
+        ("comum.snapshot", "PASTA_SNAPSHOTS", "DASHS_SNAPSHOTS"),
+    ):
+        if modulo in sys.modules:
+            setattr(sys.modules[modulo], atributo, pastas[variavel])
+    return list(pastas.values())
+
+
+def medir_escala(escala, resultados, repeticoes=3, precisa_memoria=False):
+    """
+    Mede todas as etapas de todas as páginas numa escala.
+
+    Parâmetros:
+    - escala: Multiplicador do volume atual de linhas.
+    - resultados: Lista onde cada medição é acrescentada como dicionário.
+    - repeticoes: Repetições das etapas rápidas; vale o menor tempo.
+    - precisa_memoria: Mede o pico de alocações com tracemalloc em vez do RSS.
+    """
+    pastas = _caches_vazios()
+    try:
+        _medir_escala(escala, resultados, repeticoes, precisa_memoria)
+    finally:
+        for pasta in pastas:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+def _medir_escala(escala, resultados, repeticoes, precisa_memoria):
+    import streamlit as st
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    from comum import graficos
+    from comum.cargas import carregar
+    from comum.cubo import construir_cubo
+    from comum.filtros import posicoes
+    from comum.incremental import conjunto_incremental
+    from comum.ordens import dimensoes_ordens
+
+    # Os avisos do Streamlit fora de um servidor poluem a saída
+    set_log_level("error")
+    os.environ["DASHS_FONTE"] = f"parquet:{_dados_sinteticos(escala)}"
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    print(f"Escala {escala:g}x", flush=True)
+    medir = lambda etapa, alvo, funcao, vezes=1: _medir(
+        resultados, escala, etapa, alvo, funcao, vezes, precisa_memoria
+    )
+
+    medir("carga", "ordens", lambda: conjunto_incremental("ordens").dados())
+    medir("carga", "triagem", lambda: conjunto_incremental("triagem").dados())
+    medir("carga", "backlog_hh", lambda: carregar("backlog_hh"))
+
+    ordens = conjunto_incremental("ordens").dados()
+    notas = conjunto_incremental("triagem").dados()
+    # Sem a versão, posicoes não usa o cache e recalcula a máscara
+    ordens_sem_cache = ordens.copy(deep=False)
+    ordens_sem_cache.attrs = {}
+    filtros = {"Tipo": "ZPM2", "Disciplina": "Mecânica", "CT": "CMEC501"}
+    medir("filtro", "ordens", lambda: posicoes(ordens_sem_cache, filtros), repeticoes)
+
+    cubo = construir_cubo(*dimensoes_ordens(ordens))
+    medir("agregacao", "cubo_ordens", lambda: construir_cubo(*dimensoes_ordens(ordens)), repeticoes)
+    medir("agregacao", "consultas", lambda: [
+        cubo.serie(dimensao, {"Tipo": tipo}) for dimensao in ("Mes_Ano", "CT", "Disciplina") for tipo in (None, "ZPM2")
+    ], repeticoes)
+    medir("agregacao", "notas_mes", lambda: notas.groupby(notas["MSPN"].dt.to_period("M"))["Status"].count(), repeticoes)
+
+    def especificacao():
+        graficos._especificacao_area.clear()
+        graficos._especificacao_area("Mes_Ano", "Status", "", "Entrada de Notas", ("temporal", "quantitative"), False)
+
+    medir("especificacao", "area", especificacao, repeticoes)
+
+    for pagina, (script, escolhas) in PAGINAS.items():
+        teste = AppTest.from_file(str(RAIZ / script), default_timeout=600)
+        medir("pagina_primeira", pagina, teste.run)
+        medir("pagina_rerun", pagina, teste.run)
+        if escolhas:
+            for chave, valor in escolhas.items():
+                teste.session_state[chave] = valor
+            medir("pagina_filtro", pagina, teste.run)
+        if teste.exception:
+            print(f"  {pagina}: {teste.exception[0].message}", file=sys.stderr)
+
+
+def comparar(atual, base, limite, folga=0.01):
+    """
+    Compara duas medições e retorna as etapas que ficaram mais lentas que o limite.
+
+    Parâmetros:
+    - atual: DataFrame com o resultado desta execução.
+    - base: DataFrame com um resultado anterior (por exemplo, do branch principal).
+    - limite: Razão atual/base a partir da qual a etapa é considerada regressão.
+    - folga: Diferença mínima em segundos; abaixo dela a variação é ruído de medição.
+    """
+    chaves = ["escala", "etapa", "alvo"]
+    juntos = atual.merge(base, on=chaves, suffixes=("", "_base"))
+    juntos["razao"] = juntos["segundos"] / juntos["segundos_base"].replace(0, np.nan)
+    return juntos[(juntos["razao"] > limite) & (juntos["segundos"] - juntos["segundos_base"] > folga)]
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos dashboards com dados sintéticos.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="CSV onde o resultado é gravado")
+    parser.add_argument("--comparar", help="CSV de uma execução anterior, para apontar regressões")
+    parser.add_argument("--limite", type=float, default=1.25, help="razão de tempo considerada regressão")
+    parser.add_argument("--folga", type=float, default=0.01, help="diferença mínima em segundos para contar como regressão")
+    parser.add_argument("--tracemalloc", action="store_true", help="mede o pico de alocações de cada etapa")
+    opcoes = parser.parse_args(argumentos)
+
+    # As páginas leem os arquivos relativos à raiz do repositório
+    os.chdir(RAIZ)
+    warnings.filterwarnings("ignore")
+    resultados = []
+    for escala in opcoes.escalas:
+        medir_escala(escala, resultados, opcoes.repeticoes, opcoes.tracemalloc)
+
+    tabela = pd.DataFrame(resultados)
+    print(tabela.pivot_table(index=["etapa", "alvo"], columns="escala", values="segundos").to_string())
+    if opcoes.saida:
+        tabela.to_csv(opcoes.saida, index=False)
+    if opcoes.comparar:
+        regressoes = comparar(tabela, pd.read_csv(opcoes.comparar), opcoes.limite, opcoes.folga)
+        if len(regressoes):
+            print("\nRegressões:")
+            print(regressoes[["escala", "etapa", "alvo", "segundos_base", "segundos", "razao"]].to_string(index=False))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Dados sintéticos com o mesmo formato das planilhas dos dashboards.
+
+Cada gerador devolve um DataFrame com as mesmas colunas e tipos brutos das
+planilhas (antes do esquema de comum.esquema), sorteadas com as frequências
+medidas nas planilhas reais: a seletividade dos filtros e o número de células
+dos cubos acompanham os de produção em qualquer escala. ``escala=1`` gera o volume atual; ``escala=10`` e
+``escala=100`` simulam o histórico crescendo em volume e em número de meses.
+
+Uso: python -m bench.sinteticos <pasta> [escala]
+Grava um ``<conjunto>.parquet`` por conjunto, que as páginas leem com
+``DASHS_FONTE=parquet:<pasta>``.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Volume atual de cada planilha
+LINHAS = {"ordens": 68941, "triagem": 12247, "backlog_hh": 9384}
+
+# Frequências medidas nas planilhas reais (novembro de 2024). Nas ordens, os
+# atributos são contados por ordem, não por linha; os pesos são normalizados no sorteio.
+TIPOS_ORDEM = {"ZPM1": 0.7298, "ZPM5": 0.1518, "ZPM3": 0.0702, "ZPM2": 0.0266, "ZPM6": 0.0215, "ZOS3": 0.00002}
+DISCIPLINAS_ORDEM = {
+    "Mecânica": 0.58, "Alpinismo": 0.1616, "Elétrica": 0.1143, "Instrumentação": 0.0902, "Inspeção": 0.0456,
+    "Andaime": 0.0082,
+}
+EMPRESAS_ORDEM = {"Contratada": 0.53, "Samarco": 0.47}
+# Linhas por ordem (uma por data de encerramento)
+REPETICOES = {1: 0.4588, 2: 0.5158, 3: 0.0103, 4: 0.0133, 5: 0.0002, 6: 0.0014, 8: 0.0001}
+# Ordens sem Ordem_XT, que também não têm data de encerramento
+SEM_ENCERRAMENTO = 0.1324
+CTS_ORDEM = {
+    "CMEC503": 0.2955, "STUR500": 0.0904, "SINS505": 0.049, "CMEC501": 0.0373, "CMEC504": 0.0341,
+    "SMEC508": 0.0293, "CMEC505": 0.0271, "SELE503": 0.0264, "SMEC509": 0.0252, "STUR503": 0.0236,
+    "SINS502": 0.0229, "SELE504": 0.0213, "SENG506": 0.0206, "CMEC502": 0.0199, "SMEC507": 0.0195,
+    "SMEC503": 0.0186, "STUR501": 0.0172, "CMEC511": 0.0164, "CELE502": 0.016, "STUR504": 0.0155,
+    "STUR502": 0.0148, "SELE505": 0.0147, "CMEC519": 0.014, "SMEC506": 0.0139, "CMEC509": 0.0117,
+    "SENG505": 0.0101, "CELE504": 0.0095, "CELE505": 0.0093, "SINS504": 0.0087, "CUTL501": 0.0082,
+    "SENG508": 0.0081, "CMEC514": 0.0071, "CELE507": 0.0069, "SENG507": 0.0069, "CELE506": 0.006,
+    "CMEC520": 0.0052, "SINS507": 0.0047, "CELE503": 0.0039, "SMEC523": 0.0037, "SINS506": 0.0034,
+    "CMEC507": 0.0009, "SINS503": 0.0008, "CMEC506": 0.0008, "SINS501": 0.0007, "CELE508": 0.0003,
+}
+DISCIPLINAS_NOTA = {
+    "Mecânica": 0.6264, "Elétrica": 0.2769, "Instrumentação": 0.0661, "Andaime": 0.0189, "Alpinismo": 0.0065,
+    "Inspeção": 0.0054,
+}
+EMPRESAS_NOTA = {"Contratada": 0.548, "Samarco": 0.452}
+CTS_NOTA = {
+    "CMEC503": 0.0966, "SMEC508": 0.0801, "SMEC509": 0.0657, "CMEC501": 0.0625, "SMEC503": 0.0558,
+    "CELE502": 0.0557, "SELE503": 0.0471, "CMEC507": 0.0411, "CMEC511": 0.0391, "SINS505": 0.0389,
+    "CMEC504": 0.0358, "SMEC507": 0.0345, "CELE503": 0.0305, "SMEC506": 0.029, "SELE505": 0.0268,
+    "CELE505": 0.0256, "CELE507": 0.0249, "SELE504": 0.0241, "CELE506": 0.0211, "CMEC509": 0.0206,
+    "CELE504": 0.0201, "CUTL501": 0.0189, "CMEC502": 0.0144, "SMEC523": 0.0143, "SINS507": 0.0136,
+    "CMEC514": 0.0118, "CMEC506": 0.0118, "SINS502": 0.0073, "CMEC519": 0.0069, "CMEC505": 0.0055,
+    "SINS504": 0.0049, "SENG506": 0.0041, "CALP501": 0.0032, "SENG505": 0.0012, "STUR503": 0.0011,
+    "CMEC520": 0.0011, "STUR500": 0.0011, "CELE508": 0.001, "SINS506": 0.0008, "STUR502": 0.0007,
+    "SINS501": 0.0003, "SINS503": 0.0002, "STUR501": 0.0002, "SENG508": 0.0001, "STUR504": 0.0001,
+}
+# Prioridade das notas; 0,02% ficam sem prioridade
+PRIORIDADES = {4: 0.6345, 3: 0.2285, 6: 0.0897, 2: 0.0352, 1: 0.0119}
+CODES = {
+    "M2-OUT": 0.5274, "M2-MNT": 0.2762, "M2-INT": 0.0563, "M2-CON": 0.0425, "M2-MND": 0.0287,
+    "M2-DOP": 0.0245, "M3-ROT": 0.0152, "M1-INF": 0.0117, "M3-TUR": 0.0075, "M1-MNT": 0.0053,
+    "M1-OPR": 0.0019, "M2-ANF": 0.0012, "M2-JMP": 0.0011, "RS0010": 0.0002, "AN.FALHA": 0.0001,
+}
+STATUS = ["MSPN", "MSPR", "MSEN", "MREL"]
+FIM = pd.Timestamp("2024-11-25")
+
+
+def _sortear(gerador, frequencias, quantidade):
+    # Sorteia valores com as frequências {valor: peso}
+    valores = np.array(list(frequencias))
+    pesos = np.array(list(frequencias.values()), dtype="float64")
+    return valores[gerador.choice(len(valores), quantidade, p=pesos / pesos.sum())]
+
+
+def _datas(gerador, quantidade, dias):
+    # Datas diárias no histórico, mais densas nos meses recentes
+    deslocamento = (gerador.power(1.5, quantidade) * dias).astype("int64")
+    return (FIM - pd.to_timedelta(deslocamento, unit="D")).normalize()
+
+
+def _textos(gerador, quantidade, distintos, prefixos):
+    # Vocabulário de textos livres sorteados com repetição, como os textos padrão de ordens e notas
+    numero = pd.Series(np.arange(distintos))
+    vocabulario = (
+        pd.Series(np.array(prefixos)[gerador.integers(0, len(prefixos), distintos)])
+        + "-U" + (numero % 97).astype(str).str.zfill(2)
+        + "-" + numero.astype(str).str.zfill(6)
+        + " MANUTENÇÃO"
+    ).to_numpy()
+    return vocabulario[gerador.integers(0, distintos, quantidade)]
+
+
+def _dias(escala):
+    # O histórico cresce com a escala, até dez anos
+    return int(330 * min(escala, 10))
+
+
+def gerar_ordens(escala=1, semente=0):
+    """
+    Gera ordens no formato de Ordens_zpm2zpm3.xlsx.
+
+    Parâmetros:
+    - escala: Multiplicador do volume atual de linhas.
+    - semente: Semente do gerador aleatório.
+
+    Cada ordem aparece em uma ou mais linhas (uma por data de encerramento),
+    com a distribuição de REPETICOES, como na planilha.
+    """
+    gerador = np.random.default_rng(semente)
+    linhas = int(LINHAS["ordens"] * escala)
+    media = sum(vezes * peso for vezes, peso in REPETICOES.items()) / sum(REPETICOES.values())
+    numero_ordens = int(linhas / media)
+    ordens = 3100000000 + np.sort(gerador.choice(numero_ordens * 10, numero_ordens, replace=False))
+    repeticoes = _sortear(gerador, REPETICOES, numero_ordens)
+    ordem = np.repeat(ordens, repeticoes)[:linhas]
+    linhas = len(ordem)
+    criacao_ordem = _datas(gerador, numero_ordens, _dias(escala))
+    criacao = np.repeat(criacao_ordem, repeticoes)[:linhas]
+
+    # Atributos da ordem se repetem em todas as suas linhas
+    por_ordem = lambda valores: np.repeat(valores, repeticoes)[:linhas]
+    tipo = por_ordem(_sortear(gerador, TIPOS_ORDEM, numero_ordens))
+    disciplina = por_ordem(_sortear(gerador, DISCIPLINAS_ORDEM, numero_ordens))
+    empresa = por_ordem(_sortear(gerador, EMPRESAS_ORDEM, numero_ordens))
+    ct = por_ordem(_sortear(gerador, CTS_ORDEM, numero_ordens))
+    texto = por_ordem(_textos(gerador, numero_ordens, max(1, int(numero_ordens * 0.42)), ["MNT", "MND", "INS", "LUB"]))
+    sem_encerramento = por_ordem(gerador.random(numero_ordens) < SEM_ENCERRAMENTO)
+    ordem_xt = np.where(sem_encerramento, np.nan, ordem.astype("float64"))
+    # Ordens encerradas sempre têm data; as mais recentes não passam do fim do histórico
+    encerramento = pd.Series(pd.DatetimeIndex(criacao) + pd.to_timedelta(gerador.integers(1, 120, linhas), unit="D")).clip(upper=FIM)
+
+    return pd.DataFrame({
+        "Ordem": ordem,
+        "Tipo": tipo,
+        "Data_de_Criacao": criacao,
+        "Texto_da_Ordem": texto,
+        "Empresa": empresa,
+        "CT": ct,
+        "Ordem_XT": ordem_xt,
+        "Data_de_Encerramento": encerramento.where(~sem_encerramento),
+        "Disciplina": disciplina,
+    })
+
+
+def gerar_triagem(escala=1, semente=0):
+    """
+    Gera notas no formato de tempo_triagem_notas.xlsx.
+
+    Parâmetros:
+    - escala: Multiplicador do volume atual de linhas.
+    - semente: Semente do gerador aleatório.
+
+    As datas de cada etapa (MSPN, MSPR, MSEN, MREL, ORDA) seguem a ordem do
+    ciclo de vida da nota, e o Status é a última etapa alcançada.
+    """
+    gerador = np.random.default_rng(semente + 1)
+    linhas = int(LINHAS["triagem"] * escala)
+    dia = lambda valores: pd.to_timedelta(valores, unit="D")
+
+    criacao = pd.Series(_datas(gerador, linhas, _dias(escala)))
+    mspn = criacao + dia(gerador.geometric(0.6, linhas) - 1)
+    # Quantas etapas cada nota já percorreu: 0 = MSPN, 1 = MSPR, 2 = MSEN, 3 = MREL
+    etapa = gerador.choice(4, linhas, p=[0.1, 0.4, 0.41, 0.09])
+    mspr = (mspn + dia(gerador.geometric(0.08, linhas) - 1)).where(etapa >= 1)
+    msen = (mspr + dia(gerador.geometric(0.1, linhas))).where(etapa >= 2)
+    mrel = (msen + dia(gerador.geometric(0.05, linhas))).where(etapa >= 3)
+    orda = (mspr + dia(gerador.geometric(0.12, linhas) - 1)).where(gerador.random(linhas) < 0.75)
+    limite = lambda datas: datas.where(datas <= FIM)
+    mspr, msen, mrel, orda = limite(mspr), limite(msen), limite(mrel), limite(orda)
+    tem_ordem = orda.notna()
+
+    dados = pd.DataFrame({
+        "Nota": 11000000 + np.arange(linhas),
+        "Tipo": "M2",
+        "Texto": _textos(gerador, linhas, max(1, int(linhas * 0.92)), ["VAZAMENTO", "RUÍDO", "TROCA", "AJUSTE"]),
+        "Prioridade": np.where(gerador.random(linhas) < 0.0002, np.nan, _sortear(gerador, PRIORIDADES, linhas).astype("float64")),
+        "Data_de_criação": criacao,
+        "Ordem": np.where(tem_ordem, 3900000000 + gerador.integers(0, 10000 * max(1, int(escala)), linhas), np.nan),
+        "Criado_por": gerador.choice([f"USUARIO{i:03d}" for i in range(198)], linhas),
+        "Tipo_de_prioridade": "ZR",
+        "Codificação": gerador.choice([f"{i:03d}" for i in range(37)], linhas),
+        "Code": _sortear(gerador, CODES, linhas),
+        "Data_de_Vencimento": criacao + dia(gerador.integers(1, 400, linhas)),
+        "Empresa": _sortear(gerador, EMPRESAS_NOTA, linhas),
+        "Centro_de_Trabalho": _sortear(gerador, CTS_NOTA, linhas),
+        "MREL": mrel,
+        "MSEN": msen,
+        "MSIM": mspn.where(gerador.random(linhas) < 0.02),
+        "MSPN": mspn,
+        "MSPR": mspr,
+        "ORDA": orda,
+        "Status": np.array(STATUS)[etapa],
+        "Disciplina": _sortear(gerador, DISCIPLINAS_NOTA, linhas),
+        "Idade_média": (FIM - criacao).dt.days.astype("int64"),
+        "Diferenca_Dias": np.nan,
+        "MSPR_x_ORDA": (orda - mspr).dt.days.astype("float64"),
+        "MSPN_X_MSPR": (mspr - mspn).dt.days.astype("float64"),
+        "DATEDIFF": np.nan,
+    })
+    return dados
+
+
+def gerar_backlog(escala=1, semente=0):
+    """
+    Gera a série de BacklogHH.xlsx: valor real e previsto de HH por data-base.
+
+    Parâmetros:
+    - escala: Multiplicador do volume atual de linhas.
+    - semente: Semente do gerador aleatório.
+
+    A data-base fica como texto "dd-mm-aaaa", como na planilha.
+    """
+    gerador = np.random.default_rng(semente + 2)
+    linhas = int(LINHAS["backlog_hh"] * escala)
+    meses = pd.date_range(end=FIM, periods=max(40, int(40 * min(escala, 10))), freq="MS")
+    data_base = pd.DatetimeIndex(gerador.choice(meses, linhas)).strftime("%d-%m-%Y")
+    real = gerador.gamma(2.0, 15.0, linhas).round(1)
+    return pd.DataFrame({
+        "Data-base_iníc": np.where(gerador.random(linhas) < 0.01, None, data_base),
+        "y_pred_original": real * gerador.normal(1.0, 0.15, linhas),
+        "y": real,
+    })
+
+
+GERADORES = {"ordens": gerar_ordens, "triagem": gerar_triagem, "backlog_hh": gerar_backlog}
+
+
+def gravar(pasta, escala=1, semente=0):
+    """
+    Gera todos os conjuntos e grava um Parquet por conjunto na pasta.
+
+    Parâmetros:
+    - pasta: Pasta de destino, criada se necessário.
+    - escala: Multiplicador do volume atual de linhas.
+    - semente: Semente do gerador aleatório.
+
+    Os resultados do computer vision (results.csv) são pequenos e fixos, então
+    são copiados sem escala. Retorna o caminho da pasta.
+    """
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    for nome, gerar in GERADORES.items():
+        gerar(escala, semente).to_parquet(pasta / f"{nome}.parquet", index=False)
+    # A fonte parquet espera um arquivo por conjunto registrado
+    pd.read_csv(Path(__file__).resolve().parent.parent / "results.csv").to_parquet(pasta / "resultados_cv.parquet", index=False)
+    return pasta
+
+
+if __name__ == "__main__":
+    gravar(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 1)
@@ -0,0 +1 @@
+"""Módulos compartilhados pelos dashboards da Samarco."""
@@ -0,0 +1,118 @@
+"""
+Aquecimento dos dados na inicialização do app.
+
+Na primeira execução do ``app.py`` todas as planilhas registradas em
+``comum.cargas.CONJUNTOS`` são carregadas em segundo plano, em paralelo, e
+ficam no cache do ``carregar``, junto com os índices de busca textual (ver
+comum.busca). Assim nenhum usuário abre uma página fria: quem chega durante
+o aquecimento só espera a planilha que ainda falta, sem disparar uma segunda
+leitura.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from comum.busca import BUSCAS, indice_busca
+from comum.cargas import CONJUNTOS, carregar
+from comum.incremental import INCREMENTAIS, conjunto_incremental
+
+logger = logging.getLogger(__name__)
+
+
+class Aquecimento:
+    """
+    Carrega um conjunto de planilhas em segundo plano e acompanha o progresso.
+
+    Parâmetros:
+    - nomes: Nomes dos conjuntos de dados, como registrados em CONJUNTOS.
+    """
+
+    def __init__(self, nomes):
+        self._trava = threading.Lock()
+        self.estados = {nome: {"estado": "pendente", "segundos": None, "erro": None, "memoria": None} for nome in nomes}
+
+    def iniciar(self):
+        # Uma thread por planilha; a conversão em si roda num processo separado (ver comum.fontes)
+        executor = ThreadPoolExecutor(max_workers=len(self.estados) or 1, thread_name_prefix="aquecimento")
+        for nome in self.estados:
+            executor.submit(self._carregar, nome)
+        executor.shutdown(wait=False)
+        return self
+
+    def _carregar(self, nome):
+        self._atualizar(nome, estado="carregando")
+        inicio = time.perf_counter()
+        try:
+            dados = conjunto_incremental(nome).dados() if nome in INCREMENTAIS else carregar(nome)
+            if nome in BUSCAS:
+                # O índice de busca fica pronto junto com os dados
+                indice_busca(dados, BUSCAS[nome])
+        except Exception as erro:
+            logger.exception("Falha ao pré-carregar %s", nome)
+            self._atualizar(nome, estado="erro", segundos=time.perf_counter() - inicio, erro=str(erro))
+        else:
+            self._atualizar(
+                nome, estado="pronto", segundos=time.perf_counter() - inicio, memoria=dados.attrs.get("memoria")
+            )
+
+    def _atualizar(self, nome, **valores):
+        with self._trava:
+            self.estados[nome].update(valores)
+
+    def resumo(self):
+        """Retorna uma cópia do estado de cada conjunto de dados."""
+        with self._trava:
+            return {nome: dict(estado) for nome, estado in self.estados.items()}
+
+    @property
+    def concluido(self):
+        return all(estado["estado"] in ("pronto", "erro") for estado in self.resumo().values())
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_aquecimento():
+    """Inicia o aquecimento uma única vez por servidor e retorna o objeto que o acompanha."""
+    return Aquecimento(list(CONJUNTOS)).iniciar()
+
+
+def _painel(aquecimento):
+    resumo = aquecimento.resumo()
+    prontos = sum(estado["estado"] in ("pronto", "erro") for estado in resumo.values())
+    if prontos < len(resumo):
+        st.progress(prontos / len(resumo), text=f"Carregando dados: {prontos}/{len(resumo)}")
+    elif st.session_state.get("_aquecimento_em_andamento"):
+        # Terminou agora: reexecuta o app para parar a atualização periódica
+        st.session_state["_aquecimento_em_andamento"] = False
+        st.rerun(scope="app")
+
+    with st.expander("Carga dos dados", expanded=False):
+        for nome, estado in resumo.items():
+            if estado["estado"] == "pronto":
+                texto = f"✅ {nome}: {estado['segundos']:.1f} s"
+                if estado["memoria"]:
+                    antes, depois = estado["memoria"]
+                    texto += f" · {antes / 1e6:.1f} → {depois / 1e6:.1f} MB"
+                st.caption(texto)
+            elif estado["estado"] == "erro":
+                st.caption(f"⚠️ {nome}: {estado['erro']}")
+            else:
+                st.caption(f"⏳ {nome}: {estado['estado']}")
+
+
+def Progresso_Aquecimento(aquecimento):
+    """
+    Mostra na barra lateral o progresso do aquecimento e o tempo de cada carga.
+
+    Parâmetros:
+    - aquecimento: Objeto retornado por ``iniciar_aquecimento``.
+
+    Enquanto houver planilhas pendentes o painel se atualiza a cada segundo,
+    sem reexecutar a página aberta.
+    """
+    em_andamento = not aquecimento.concluido
+    st.session_state["_aquecimento_em_andamento"] = em_andamento
+    with st.sidebar:
+        st.fragment(_painel, run_every=1 if em_andamento else None)(aquecimento)
@@ -0,0 +1,150 @@
+"""
+Busca textual nos textos das ordens e das notas.
+
+O índice invertido é montado uma vez por versão dos dados sobre os textos
+distintos da coluna (os textos se repetem muito), já sem acentos e em
+minúsculas. Cada termo aponta para os textos em que aparece, e os termos
+ficam ordenados, então a busca por prefixo é um intervalo do vocabulário
+encontrado por busca binária. O resultado volta para as linhas pelo código de
+cada texto, sem comparar strings linha a linha.
+
+A busca entra nos filtros como mais um valor, ``{coluna: Busca(texto)}``, e é
+combinada com os demais filtros em comum.filtros.
+"""
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from comum import telemetria
+
+# Colunas de texto indexadas no aquecimento: {conjunto: coluna}
+BUSCAS = {
+    "ordens": "Texto_da_Ordem",
+    "triagem": "Texto",
+}
+
+_TERMO = re.compile(r"\w+")
+# Maior caractere Unicode: todo termo que começa com o prefixo é menor que prefixo + _FIM
+_FIM = "\U0010ffff"
+
+
+def normalizar(texto):
+    """
+    Retorna o texto sem acentos e em minúsculas ("Fixação" vira "fixacao").
+
+    Parâmetros:
+    - texto: Texto a normalizar.
+    """
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(letra for letra in decomposto if not unicodedata.combining(letra)).casefold()
+
+
+def termos(texto):
+    """
+    Retorna os termos de um texto, já normalizados.
+
+    Parâmetros:
+    - texto: Texto livre; pontuação e hífens separam os termos.
+    """
+    return _TERMO.findall(normalizar(texto))
+
+
+class Busca:
+    """
+    Valor de filtro que seleciona as linhas cujo texto contém todos os termos.
+
+    Parâmetros:
+    - texto: Texto digitado; cada termo é buscado como prefixo ("bomb" encontra "BOMBA").
+    """
+
+    __slots__ = ("texto",)
+
+    def __init__(self, texto):
+        self.texto = texto
+
+    def __eq__(self, outro):
+        return isinstance(outro, Busca) and outro.texto == self.texto
+
+    def __hash__(self):
+        return hash((Busca, self.texto))
+
+    def __repr__(self):
+        return f"Busca({self.texto!r})"
+
+    def __reduce__(self):
+        # Também usado pelo hash dos caches do Streamlit: a classe entra na chave
+        return Busca, (self.texto,)
+
+
+class IndiceBusca:
+    """
+    Índice invertido de uma coluna de texto.
+
+    Parâmetros:
+    - serie: Coluna de textos; categorias são aproveitadas como textos distintos.
+    """
+
+    def __init__(self, serie):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            self.codigos = serie.cat.codes.to_numpy()
+            textos = serie.cat.categories
+        else:
+            self.codigos, textos = pd.factorize(serie)
+        self.textos = len(textos)
+
+        # Um termo por linha, com o número do texto distinto de origem
+        explodidos = pd.Series(textos, dtype=object).map(termos, na_action="ignore").explode().dropna()
+        codigo, vocabulario = pd.factorize(explodidos.to_numpy(dtype=object), sort=True)
+        # Pares (termo, texto) únicos, ordenados por termo e, dentro do termo, por texto
+        pares = np.unique(codigo.astype(np.int64) * self.textos + explodidos.index.to_numpy())
+        self.vocabulario = np.asarray(vocabulario, dtype=object)
+        self.documentos = pares % self.textos
+        self.inicios = np.searchsorted(pares // self.textos, np.arange(len(self.vocabulario) + 1))
+
+    def _prefixo(self, termo):
+        # Textos que contêm algum termo começado pelo prefixo
+        primeiro = np.searchsorted(self.vocabulario, termo, side="left")
+        ultimo = np.searchsorted(self.vocabulario, termo + _FIM, side="left")
+        achados = np.zeros(self.textos + 1, dtype=bool)
+        achados[self.documentos[self.inicios[primeiro]:self.inicios[ultimo]]] = True
+        return achados
+
+    def mascara(self, texto, linhas=None):
+        """
+        Retorna a máscara das linhas cujo texto contém todos os termos buscados.
+
+        Parâmetros:
+        - texto: Texto digitado; uma busca sem termos seleciona todas as linhas.
+        - linhas: Posições avaliadas; se omitido, todas as linhas.
+        """
+        # A última posição representa as linhas sem texto (código -1), nunca encontradas
+        achados = np.ones(self.textos + 1, dtype=bool)
+        achados[-1] = False
+        for termo in termos(texto):
+            achados &= self._prefixo(termo)
+        codigos = self.codigos if linhas is None else self.codigos[linhas]
+        return achados[codigos]
+
+
+@telemetria.cache_resource("indice_busca", show_spinner=False)
+def _indice_em_cache(versao, linhas, coluna, _data):
+    return IndiceBusca(_data[coluna])
+
+
+def indice_busca(data, coluna):
+    """
+    Retorna o índice de busca de uma coluna de texto.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - coluna: Coluna de texto indexada.
+
+    O índice fica em cache pela versão do snapshot (``data.attrs["versao"]``) e
+    é compartilhado, sem cópia, entre as sessões.
+    """
+    versao = data.attrs.get("versao")
+    if versao is None:
+        return IndiceBusca(data[coluna])
+    return _indice_em_cache(versao, len(data), coluna, data)
@@ -0,0 +1,131 @@
+"""
+Cache persistente em disco para as cargas e agregações.
+
+O ``st.cache_data`` vive na memória de cada processo: reiniciar o servidor ou
+subir uma nova réplica refaz todas as cargas. Este cache fica numa pasta
+compartilhada (``DASHS_CACHE_DISCO``), com um arquivo Arrow IPC por resultado,
+cujo nome é o hash do nome da função, dos argumentos e da versão do conteúdo
+de origem (ver ``FonteArquivos.versao``): uma planilha alterada gera outra
+chave, e a entrada antiga simplesmente deixa de ser usada.
+
+Os arquivos têm o formato de comum.compartilhado e são lidos por mapeamento
+em memória, sem cópia das colunas: essas páginas ficam no cache de páginas do
+sistema operacional, compartilhadas por todos os processos que leram o mesmo
+arquivo. Quando a pasta passa de ``DASHS_CACHE_DISCO_MB`` megabytes, os
+arquivos usados há mais tempo são apagados (cada acerto atualiza a data de uso
+do arquivo).
+
+``DASHS_CACHE_DISCO`` vazio desliga o cache em disco.
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import os
+from pathlib import Path
+
+import pyarrow as pa
+
+from comum import telemetria
+from comum.compartilhado import EXTENSAO, gravar_atomico, limpar, mapear
+
+logger = logging.getLogger(__name__)
+
+_CONFIGURACAO = os.environ.get("DASHS_CACHE_DISCO", ".cache_disco")
+PASTA = Path(_CONFIGURACAO) if _CONFIGURACAO else None
+LIMITE = int(float(os.environ.get("DASHS_CACHE_DISCO_MB", 1024)) * 1e6)
+
+
+def chave(*partes):
+    """
+    Retorna o nome de arquivo (hash sha256) de uma entrada do cache.
+
+    Parâmetros:
+    - partes: Valores que identificam o resultado; entram na chave pelo repr.
+    """
+    return hashlib.sha256(repr(partes).encode()).hexdigest()
+
+
+def ler(nome):
+    """
+    Retorna o DataFrame gravado sob a chave, ou None se não estiver no cache.
+
+    Parâmetros:
+    - nome: Chave, como retornada por ``chave``.
+
+    Os atributos (``dados.attrs``, com a versão) voltam junto com os dados.
+    """
+    if PASTA is None:
+        return None
+    caminho = PASTA / f"{nome}{EXTENSAO}"
+    try:
+        dados = mapear(caminho)
+        # Atualiza a data de uso, que decide quem sai primeiro na limpeza
+        os.utime(caminho)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        logger.warning("Entrada ilegível no cache em disco: %s", caminho, exc_info=True)
+        caminho.unlink(missing_ok=True)
+        return None
+    return dados
+
+
+def gravar(nome, dados):
+    """
+    Grava um DataFrame no cache sob a chave e apaga as entradas mais antigas se passar do limite.
+
+    Parâmetros:
+    - nome: Chave, como retornada por ``chave``.
+    - dados: DataFrame gravado, com seus atributos.
+
+    Falhas de gravação (pasta somente leitura, disco cheio) só geram um aviso.
+    """
+    if PASTA is None:
+        return
+    try:
+        gravar_atomico(PASTA, nome, dados)
+        limpar(PASTA, LIMITE)
+    except (OSError, ValueError, TypeError, pa.ArrowException):
+        logger.warning("Não foi possível gravar no cache em disco", exc_info=True)
+
+
+def persistente(versao, nome=None):
+    """
+    Decora uma função que retorna um DataFrame com o cache em disco.
+
+    Parâmetros:
+    - versao: Função que recebe os mesmos argumentos e retorna a versão do
+      conteúdo de origem, ou None quando ela não é conhecida sem executar a função.
+    - nome: Rótulo ``cache`` das métricas e parte da chave; por padrão, o nome da função.
+
+    Sem versão conhecida antes da execução, o resultado só é gravado se a
+    versão passar a ser conhecida depois dela (um snapshot recém-criado, por
+    exemplo); fontes sem versão, como as SQL, nunca são gravadas. Use por
+    baixo do ``telemetria.cache_data``, que continua sendo o primeiro nível.
+    """
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def chamar(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            # Como no st.cache_data, parâmetros com "_" no início ficam fora da chave
+            identificacao = sorted((nome_arg, valor) for nome_arg, valor in argumentos.arguments.items() if not nome_arg.startswith("_"))
+            atual = versao(*args, **kwargs)
+            if atual is not None:
+                dados = ler(chave(rotulo, identificacao, atual))
+                if dados is not None:
+                    telemetria.CACHE_ACERTOS.inc(cache=f"{rotulo}_disco")
+                    return dados
+            telemetria.CACHE_FALTAS.inc(cache=f"{rotulo}_disco")
+            dados = funcao(*args, **kwargs)
+            atual = versao(*args, **kwargs) if atual is None else atual
+            if atual is not None:
+                gravar(chave(rotulo, identificacao, atual), dados)
+            return dados
+
+        return chamar
+    return decorar
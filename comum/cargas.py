@@ -0,0 +1,122 @@
+"""
+Carga dos conjuntos de dados registrados para os dashboards.
+
+Todas as páginas leem seus dados por ``carregar(nome)``, então o cache é o
+mesmo para a página e para o aquecimento feito na inicialização do app (ver
+comum.aquecimento). Os dados vêm da fonte configurada em ``DASHS_FONTE``
+(ver comum.fontes): por padrão, as planilhas do repositório.
+
+Os conjuntos carregados ficam na memória compartilhada entre os processos do
+servidor (ver comum.compartilhado). Abaixo dela, as cargas e agregações passam
+pelo cache em disco (ver comum.cache_disco), mantido entre reinícios do servidor.
+"""
+import os
+import time
+
+import streamlit as st
+
+from comum import cache_disco, compartilhado, telemetria
+from comum.esquema import ESQUEMAS, aplicar_esquema
+from comum.fontes import criar_fonte
+
+# Arquivos usados pela fonte local: {nome: (caminho, parâmetros de leitura)}.
+# Nas fontes SQL, o nome do conjunto é também o nome da tabela.
+CONJUNTOS = {
+    "ordens": ("./Ordens_zpm2zpm3.xlsx", {}),
+    "triagem": ("./tempo_triagem_notas.xlsx", {}),
+    "backlog_hh": ("./BacklogHH.xlsx", {}),
+    "resultados_cv": ("./results.csv", {}),
+}
+
+
+@st.cache_resource(show_spinner=False)
+def fonte():
+    """Retorna a fonte de dados configurada em DASHS_FONTE, criada uma vez por servidor."""
+    return criar_fonte(os.environ.get("DASHS_FONTE"), CONJUNTOS)
+
+
+def _versao(nome, *args, **kwargs):
+    # Versão do conteúdo de origem junto com o esquema: mudar os tipos declarados também invalida o disco
+    versao = fonte().versao(nome)
+    return None if versao is None else (versao, ESQUEMAS.get(nome))
+
+
+@cache_disco.persistente(_versao)
+def ler(nome, colunas=None, filtros=None):
+    """
+    Lê um conjunto da fonte e aplica o esquema, passando pelo cache em disco.
+
+    Parâmetros:
+    - nome: Nome do conjunto de dados.
+    - colunas: Colunas lidas; se omitido, todas.
+    - filtros: Dicionário {coluna: valor ou lista de valores}, aplicado na própria fonte.
+
+    Não usa o cache em memória: as páginas devem chamar ``carregar``.
+    """
+    dados = fonte().ler(nome, colunas, filtros)
+    # Tipos declarados em comum.esquema, aplicados uma única vez por carga
+    return aplicar_esquema(dados, ESQUEMAS.get(nome, {}))
+
+
+@telemetria.cache_resource("carregar", show_spinner=False)
+def _publicado(nome, colunas, filtros, versao):
+    # Aberto uma vez por processo e por versão; todos os processos mapeiam o mesmo arquivo publicado
+    inicio = time.perf_counter()
+    dados = None if versao is None else compartilhado.abrir(cache_disco.chave("carregar", nome, colunas, filtros, versao))
+    if dados is not None:
+        telemetria.CACHE_ACERTOS.inc(cache="compartilhado")
+        tipo = "compartilhada"
+    else:
+        telemetria.CACHE_FALTAS.inc(cache="compartilhado")
+        tipo = "completa"
+        dados = ler(nome, colunas, filtros)
+        # Uma planilha lida pela primeira vez só tem versão depois que o snapshot é criado
+        publicada = _versao(nome) if versao is None else versao
+        if publicada is not None:
+            dados = compartilhado.publicar(cache_disco.chave("carregar", nome, colunas, filtros, publicada), dados)
+    telemetria.CARGAS.observar(time.perf_counter() - inicio, conjunto=nome, tipo=tipo)
+    telemetria.CONJUNTO_BYTES.definir(dados.attrs["memoria"][1], conjunto=nome)
+    return dados
+
+
+def carregar(nome, colunas=None, filtros=None):
+    """
+    Retorna o DataFrame de um conjunto registrado em CONJUNTOS.
+
+    Parâmetros:
+    - nome: Nome do conjunto de dados (por exemplo, "ordens").
+    - colunas: Colunas lidas; se omitido, todas.
+    - filtros: Dicionário {coluna: valor ou lista de valores}, aplicado na própria fonte.
+
+    As colunas já chegam com os tipos do esquema do conjunto (ver comum.esquema).
+    O conjunto é publicado uma vez na memória compartilhada (ver
+    comum.compartilhado) e aberto uma vez por processo e por versão do conteúdo
+    de origem: uma planilha alterada é lida de novo na chamada seguinte. Cada
+    chamada recebe uma cópia rasa, que não duplica os dados e isola as colunas
+    acrescentadas pela página.
+    """
+    versao = _versao(nome)
+    dados = _publicado(nome, colunas, filtros, versao)
+    if versao is None and _versao(nome) is not None:
+        # Planilha lida antes de ter snapshot: a entrada sem versão não pode responder
+        # por uma alteração futura, que também chega sem versão até o snapshot ser refeito
+        _publicado.clear(nome, colunas, filtros, None)
+    return dados.copy(deep=False)
+
+
+@telemetria.cache_data("agregar", show_spinner=False)
+@cache_disco.persistente(_versao, nome="agregar")
+def agregar(nome, dimensoes, filtros=None, contar=None):
+    """
+    Retorna a contagem por combinação das dimensões, calculada na fonte.
+
+    Parâmetros:
+    - nome: Nome do conjunto de dados.
+    - dimensoes: Colunas do agrupamento, como tupla.
+    - filtros: Dicionário {coluna: valor ou lista de valores}, aplicado na própria fonte.
+    - contar: Coluna cujos valores preenchidos são contados; se omitido, conta linhas.
+
+    A contagem fica na coluna ``Quantidade``; as dimensões seguem o esquema do conjunto.
+    """
+    dados = fonte().agregar(nome, list(dimensoes), filtros, contar)
+    return aplicar_esquema(dados, ESQUEMAS.get(nome, {}))
@@ -0,0 +1,234 @@
+"""
+Conjuntos de dados publicados em memória compartilhada.
+
+Cada processo do Streamlit guardava a sua cópia de cada conjunto, e o
+``st.cache_data`` ainda devolvia uma cópia nova a cada chamada. Aqui o
+conjunto é gravado uma vez, como arquivo Arrow IPC, em ``DASHS_COMPARTILHADO``
+(por padrão ``/dev/shm/dashs``, que fica na memória), e cada processo o abre
+por mapeamento em memória, somente leitura: todos os processos e sessões leem
+as mesmas páginas de memória.
+
+O Arrow só entrega ao pandas sem cópia as colunas sem nulos, então o arquivo
+guarda cada coluna já na representação do pandas, sem máscara de validade do
+Arrow: datas como inteiros (NaT incluso), decimais com NaN, categorias pelos
+códigos (-1 para nulo) e inteiros anuláveis como valores mais máscara. Na
+abertura, as colunas são só visões do arquivo mapeado. Colunas de outros tipos
+(textos, por exemplo) seguem no formato do próprio Arrow.
+
+Os arquivos mais antigos são apagados quando a pasta passa de
+``DASHS_COMPARTILHADO_MB`` megabytes; processos que já os mapearam continuam
+lendo normalmente. ``DASHS_COMPARTILHADO`` vazio desliga a publicação.
+"""
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+_PADRAO = Path("/dev/shm/dashs") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir()) / "dashs-compartilhado"
+_CONFIGURACAO = os.environ.get("DASHS_COMPARTILHADO", str(_PADRAO))
+PASTA = Path(_CONFIGURACAO) if _CONFIGURACAO else None
+LIMITE = int(float(os.environ.get("DASHS_COMPARTILHADO_MB", 512)) * 1e6)
+
+EXTENSAO = ".arrow"
+# Chave dos metadados do esquema Arrow com a descrição das colunas
+_META = b"dashs"
+
+
+def _indice_bytes(indice):
+    # Categorias gravadas como um fluxo Arrow nos metadados, preservando o tipo
+    tabela = pa.table({"categorias": pa.array(indice)})
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return saida.getvalue().to_pybytes()
+
+
+def _indice(conteudo):
+    return pd.Index(pa.ipc.open_stream(conteudo).read_all().column(0).to_pandas().array)
+
+
+def _colunas(dados):
+    # Para cada coluna do pandas: (descrição, {nome no Arrow: array}, metadados extras)
+    for posicao, (nome, serie) in enumerate(dados.items()):
+        valores, tipo = serie.array, serie.dtype
+        if isinstance(tipo, pd.CategoricalDtype):
+            yield (
+                {"nome": nome, "tipo": "categoria", "ordenada": bool(tipo.ordered)},
+                {str(posicao): valores.codes},
+                {f"categorias:{posicao}".encode(): _indice_bytes(tipo.categories)},
+            )
+        elif isinstance(valores, pd.arrays.DatetimeArray) and tipo.kind == "M" and getattr(tipo, "tz", None) is None:
+            yield {"nome": nome, "tipo": "numpy", "dtype": str(tipo)}, {str(posicao): valores._ndarray.view("int64")}, {}
+        elif isinstance(tipo, np.dtype) and tipo.kind in "biufm":
+            # Booleanos como bytes: o Arrow guarda bool em bits, o que exigiria conversão
+            bruto = valores.to_numpy()
+            bruto = bruto.view("uint8") if tipo.kind == "b" else bruto.view("int64") if tipo.kind == "m" else bruto
+            yield {"nome": nome, "tipo": "numpy", "dtype": str(tipo)}, {str(posicao): bruto}, {}
+        elif isinstance(valores, pd.arrays.IntegerArray | pd.arrays.FloatingArray | pd.arrays.BooleanArray):
+            yield (
+                {"nome": nome, "tipo": "mascarado", "dtype": str(tipo)},
+                {str(posicao): valores._data.view("uint8") if tipo.kind == "b" else valores._data,
+                 f"{posicao}_mascara": valores._mask.view("uint8")},
+                {},
+            )
+        else:
+            yield {"nome": nome, "tipo": "arrow", "dtype": str(tipo)}, {str(posicao): pa.array(serie)}, {}
+
+
+def escrever(caminho, dados):
+    """
+    Grava um DataFrame num arquivo Arrow IPC que pode ser aberto sem cópia por ``mapear``.
+
+    Parâmetros:
+    - caminho: Arquivo de destino.
+    - dados: DataFrame gravado; o índice é descartado e ``dados.attrs`` é preservado.
+    """
+    descricao, arrays, extras = [], {}, {}
+    for coluna, valores, metadados in _colunas(dados):
+        descricao.append(coluna)
+        arrays.update({nome: pa.array(valor) if isinstance(valor, np.ndarray) else valor for nome, valor in valores.items()})
+        extras.update(metadados)
+    meta = {"colunas": descricao, "linhas": len(dados), "attrs": dados.attrs}
+    tabela = pa.table(arrays).replace_schema_metadata({_META: json.dumps(meta, default=str).encode(), **extras})
+    with pa.OSFile(str(caminho), "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+
+
+def _numpy(coluna):
+    # Visão do arquivo mapeado: o arquivo tem um único bloco, sem nulos do Arrow
+    bloco = coluna.chunk(0) if coluna.num_chunks == 1 else coluna.combine_chunks()
+    return bloco.to_numpy(zero_copy_only=True)
+
+
+def mapear(caminho):
+    """
+    Abre por mapeamento em memória um arquivo gravado por ``escrever``.
+
+    Parâmetros:
+    - caminho: Arquivo a abrir.
+
+    As colunas são visões somente leitura do arquivo: com o copy-on-write do
+    pandas, qualquer alteração copia só a coluna alterada.
+    """
+    with pa.memory_map(str(caminho)) as arquivo:
+        tabela = pa.ipc.open_file(arquivo).read_all()
+    metadados = tabela.schema.metadata
+    meta = json.loads(metadados[_META])
+    colunas = {}
+    for posicao, coluna in enumerate(meta["colunas"]):
+        valores = tabela.column(str(posicao))
+        if coluna["tipo"] == "categoria":
+            tipo = pd.CategoricalDtype(_indice(metadados[f"categorias:{posicao}".encode()]), ordered=coluna["ordenada"])
+            colunas[coluna["nome"]] = pd.Categorical.from_codes(_numpy(valores), dtype=tipo, validate=False)
+        elif coluna["tipo"] == "numpy":
+            colunas[coluna["nome"]] = _numpy(valores).view(np.dtype(coluna["dtype"]))
+        elif coluna["tipo"] == "mascarado":
+            tipo = pd.api.types.pandas_dtype(coluna["dtype"])
+            dados = _numpy(valores)
+            mascara = _numpy(tabela.column(f"{posicao}_mascara")).view(bool)
+            colunas[coluna["nome"]] = tipo.construct_array_type()(dados.view(bool) if tipo.kind == "b" else dados, mascara)
+        else:
+            colunas[coluna["nome"]] = valores.to_pandas().astype(coluna["dtype"]).array
+    dados = pd.DataFrame(colunas, index=pd.RangeIndex(meta["linhas"]), copy=False)
+    dados.attrs = meta["attrs"]
+    return dados
+
+
+def limpar(pasta, limite):
+    """
+    Apaga os arquivos usados há mais tempo até a pasta caber no limite.
+
+    Parâmetros:
+    - pasta: Pasta com os arquivos ``.arrow``; os ``.parcial`` ainda estão sendo gravados.
+    - limite: Tamanho máximo da pasta, em bytes.
+
+    A data de uso é o mtime, atualizado a cada leitura.
+    """
+    arquivos = []
+    for caminho in pasta.glob(f"*{EXTENSAO}"):
+        try:
+            arquivos.append((caminho.stat(), caminho))
+        except FileNotFoundError:
+            continue
+    arquivos.sort(key=lambda item: item[0].st_mtime, reverse=True)
+    total = 0
+    for estado, caminho in arquivos:
+        total += estado.st_size
+        if total > limite:
+            # Quem já mapeou o arquivo continua lendo normalmente
+            caminho.unlink(missing_ok=True)
+
+
+def gravar_atomico(pasta, nome, dados):
+    """
+    Grava o arquivo ``<nome>.arrow`` na pasta por troca atômica e retorna o caminho.
+
+    Parâmetros:
+    - pasta: Pasta de destino, criada se necessário.
+    - nome: Nome do arquivo, sem extensão.
+    - dados: DataFrame gravado com ``escrever``.
+    """
+    pasta.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix=f"{EXTENSAO}.parcial")
+    os.close(descritor)
+    try:
+        escrever(temporario, dados)
+        # Outro processo nunca lê um arquivo pela metade
+        destino = pasta / f"{nome}{EXTENSAO}"
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+    return destino
+
+
+def abrir(chave):
+    """
+    Retorna o conjunto publicado sob a chave, mapeado em memória, ou None se não houver.
+
+    Parâmetros:
+    - chave: Nome do arquivo publicado, como o de ``cache_disco.chave``.
+    """
+    if PASTA is None:
+        return None
+    caminho = PASTA / f"{chave}{EXTENSAO}"
+    try:
+        dados = mapear(caminho)
+        os.utime(caminho)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        logger.warning("Conjunto publicado ilegível: %s", caminho, exc_info=True)
+        caminho.unlink(missing_ok=True)
+        return None
+    return dados
+
+
+def publicar(chave, dados):
+    """
+    Publica um conjunto na memória compartilhada e o retorna mapeado do arquivo publicado.
+
+    Parâmetros:
+    - chave: Nome do arquivo publicado; processos que pedirem a mesma chave leem o mesmo arquivo.
+    - dados: DataFrame publicado.
+
+    Se a publicação falhar (pasta sem espaço, coluna que o Arrow não aceita),
+    retorna os próprios dados, que ficam só neste processo.
+    """
+    if PASTA is None:
+        return dados
+    try:
+        caminho = gravar_atomico(PASTA, chave, dados)
+        publicados = mapear(caminho)
+        limpar(PASTA, LIMITE)
+    except (OSError, ValueError, TypeError, pa.ArrowException):
+        logger.warning("Não foi possível publicar o conjunto na memória compartilhada", exc_info=True)
+        return dados
+    return publicados
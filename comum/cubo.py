@@ -0,0 +1,160 @@
+"""
+Cubo de contagens pré-agregadas.
+
+O cubo é montado uma única vez por snapshot de dados e guarda, num array
+denso, a contagem de linhas para cada combinação das dimensões escolhidas
+(mês, tipo, disciplina, CT...). Qualquer combinação de filtros é respondida
+somando fatias desse array, sem voltar a percorrer as linhas originais.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _posicoes(indice, valor):
+    # Aceita um valor único ou uma lista de valores; rótulos inexistentes são ignorados
+    valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+    return [indice[v] for v in valores if v in indice]
+
+
+class Cubo:
+    """
+    Contagens indexadas por dimensões categóricas.
+
+    Parâmetros:
+    - eixos: Dicionário ordenado {dimensão: pd.Index com os rótulos do eixo}.
+    - contagens: Array com uma posição para cada combinação de rótulos.
+    """
+
+    def __init__(self, eixos, contagens):
+        self.eixos = eixos
+        self.contagens = contagens
+        # Posição de cada rótulo no seu eixo, para fatiar sem buscar no Index
+        self.indices = {dimensao: {rotulo: i for i, rotulo in enumerate(eixo)} for dimensao, eixo in eixos.items()}
+
+    def _fatia(self, filtros):
+        contagens = self.contagens
+        for numero, dimensao in enumerate(self.eixos):
+            valor = (filtros or {}).get(dimensao)
+            if valor is None:
+                continue
+            contagens = np.take(contagens, _posicoes(self.indices[dimensao], valor), axis=numero)
+        return contagens
+
+    def serie(self, dimensao, filtros=None):
+        """
+        Retorna a contagem por rótulo de uma dimensão, já com os filtros aplicados.
+
+        Parâmetros:
+        - dimensao: Dimensão que será mantida no resultado.
+        - filtros: Dicionário {dimensão: valor ou lista de valores}. Dimensões
+          ausentes ou com valor None não são filtradas.
+
+        Assim como um groupby, rótulos nulos e combinações sem linhas ficam de fora.
+        """
+        numero = list(self.eixos).index(dimensao)
+        fatia = self._fatia(filtros)
+        outros = tuple(i for i in range(fatia.ndim) if i != numero)
+        valores = fatia.sum(axis=outros)
+
+        eixo = self.eixos[dimensao]
+        valor = (filtros or {}).get(dimensao)
+        if valor is not None:
+            eixo = eixo[_posicoes(self.indices[dimensao], valor)]
+
+        manter = (valores > 0) & eixo.notna()
+        return pd.Series(valores[manter], index=eixo[manter])
+
+    def atualizar(self, dimensoes, pesos=None):
+        """
+        Retorna um novo cubo com as linhas informadas somadas às contagens.
+
+        Parâmetros:
+        - dimensoes: Dicionário {dimensão: coluna com os rótulos de cada linha},
+          com as mesmas dimensões do cubo.
+        - pesos: Peso de cada linha; use pesos negativos para retirar linhas.
+          Se omitido, cada linha vale 1.
+
+        Rótulos que ainda não existem são acrescentados aos eixos. Só as linhas
+        informadas são percorridas: o custo depende do tamanho da alteração, não
+        do histórico inteiro. O cubo original não é alterado, para que quem já o
+        tenha em mãos continue vendo contagens consistentes.
+        """
+        eixos, mapas, valores = {}, [], []
+        for dimensao, eixo in self.eixos.items():
+            rotulos = pd.Index(_rotulos(dimensoes[dimensao]))
+            novos = rotulos[eixo.get_indexer(rotulos) < 0].unique()
+            if len(novos):
+                eixo = eixo.append(novos).sort_values(na_position="last")
+            eixos[dimensao] = eixo
+            mapas.append(eixo.get_indexer(self.eixos[dimensao]))
+            valores.append(eixo.get_indexer(rotulos))
+
+        forma = tuple(len(eixo) for eixo in eixos.values())
+        contagens = self.contagens
+        if forma != contagens.shape:
+            # Reposiciona as contagens antigas nos eixos ampliados
+            contagens = np.zeros(forma, dtype=np.int64)
+            contagens[np.ix_(*mapas)] = self.contagens
+        else:
+            contagens = contagens.copy()
+
+        if pesos is None:
+            pesos = np.ones(len(valores[0]), dtype=np.int64)
+        np.add.at(contagens.reshape(-1), np.ravel_multi_index(valores, forma), np.asarray(pesos, dtype=np.int64))
+        return Cubo(eixos, contagens)
+
+    def celulas(self):
+        """
+        Retorna as combinações com contagem diferente de zero, uma por linha.
+
+        As dimensões ficam nas colunas de mesmo nome e a contagem em
+        ``Quantidade``: passar as dimensões e a contagem (como pesos) para
+        construir_cubo remonta o cubo, por exemplo depois de gravá-lo em disco.
+        """
+        posicoes = np.flatnonzero(self.contagens)
+        indices = np.unravel_index(posicoes, self.contagens.shape)
+        celulas = pd.DataFrame({dimensao: eixo.take(i) for (dimensao, eixo), i in zip(self.eixos.items(), indices)})
+        celulas["Quantidade"] = self.contagens.reshape(-1)[posicoes]
+        return celulas
+
+    def total(self, filtros=None):
+        """
+        Retorna o total de linhas que atendem aos filtros.
+
+        Parâmetros:
+        - filtros: Dicionário {dimensão: valor ou lista de valores}.
+        """
+        return int(self._fatia(filtros).sum())
+
+
+def _rotulos(valores):
+    # Eixos categóricos viram eixos comuns, para aceitar rótulos novos nas atualizações
+    if isinstance(getattr(valores, "dtype", None), pd.CategoricalDtype):
+        return np.asarray(valores, dtype=object)
+    return np.asarray(valores)
+
+
+def construir_cubo(dimensoes, pesos=None):
+    """
+    Monta um cubo de contagens a partir de colunas alinhadas.
+
+    Parâmetros:
+    - dimensoes: Dicionário ordenado {dimensão: coluna com os rótulos de cada linha}.
+    - pesos: Peso de cada linha (por exemplo, ``data["Ordem"].notna()`` para
+      contar apenas ordens preenchidas). Se omitido, cada linha vale 1.
+    """
+    codigos = []
+    eixos = {}
+    for dimensao, valores in dimensoes.items():
+        # Colunas categóricas são fatoradas pelos códigos, sem converter as linhas em objetos
+        valores = pd.array(valores, copy=False) if isinstance(getattr(valores, "dtype", None), pd.CategoricalDtype) else _rotulos(valores)
+        codigo, rotulos = pd.factorize(valores, sort=True, use_na_sentinel=False)
+        codigos.append(codigo)
+        eixos[dimensao] = pd.Index(_rotulos(rotulos), name=dimensao)
+
+    forma = tuple(len(eixo) for eixo in eixos.values())
+    posicoes = np.ravel_multi_index(codigos, forma)
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=np.float64)
+    contagens = np.bincount(posicoes, weights=pesos, minlength=int(np.prod(forma)))
+    return Cubo(eixos, contagens.reshape(forma).astype(np.int64))
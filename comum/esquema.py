@@ -0,0 +1,127 @@
+"""
+Esquema declarado de cada conjunto de dados.
+
+O tipo de cada coluna é aplicado uma única vez, logo após a carga: colunas de
+baixa cardinalidade (tipo, disciplina, CT, status...) viram categorias, números
+são reduzidos ao menor tipo que comporta os valores e datas chegam já
+convertidas. Assim as seções não precisam reconverter colunas a cada execução,
+os filtros comparam códigos inteiros e os DataFrames em cache ocupam menos memória.
+"""
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tipos aceitos: "categoria", "inteiro", "decimal", "data" ou ("data", formato do strftime)
+ESQUEMAS = {
+    "ordens": {
+        "Ordem": "inteiro",
+        "Tipo": "categoria",
+        "Data_de_Criacao": "data",
+        # Os textos das ordens se repetem muito (cerca de 18 mil textos distintos em 69 mil linhas)
+        "Texto_da_Ordem": "categoria",
+        "Empresa": "categoria",
+        "CT": "categoria",
+        "Ordem_XT": "inteiro",
+        "Data_de_Encerramento": "data",
+        "Disciplina": "categoria",
+    },
+    "triagem": {
+        "Nota": "inteiro",
+        "Tipo": "categoria",
+        "Prioridade": "inteiro",
+        "Data_de_criação": "data",
+        "Ordem": "inteiro",
+        "Criado_por": "categoria",
+        "Tipo_de_prioridade": "categoria",
+        "Codificação": "categoria",
+        "Code": "categoria",
+        "Data_de_Vencimento": "data",
+        "Empresa": "categoria",
+        "Centro_de_Trabalho": "categoria",
+        "MREL": "data",
+        "MSEN": "data",
+        "MSIM": "data",
+        "MSPN": "data",
+        "MSPR": "data",
+        "ORDA": "data",
+        "Status": "categoria",
+        "Disciplina": "categoria",
+        "Idade_média": "inteiro",
+        "Diferenca_Dias": "decimal",
+        "MSPR_x_ORDA": "decimal",
+        "MSPN_X_MSPR": "decimal",
+        "DATEDIFF": "decimal",
+    },
+    "backlog_hh": {
+        # A planilha traz a data como texto "dd-mm-aaaa"; sem o formato o pandas inverte dia e mês
+        "Data-base_iníc": ("data", "%d-%m-%Y"),
+        "y_pred_original": "decimal",
+        "y": "decimal",
+    },
+}
+
+
+def _inteiro(serie):
+    # Menor inteiro que comporta os valores; com nulos, usa o inteiro anulável equivalente
+    preenchidos = serie.dropna()
+    if len(preenchidos) and (preenchidos % 1 != 0).any():
+        return pd.to_numeric(serie, downcast="float")
+    sinal = "unsigned" if len(preenchidos) and preenchidos.min() >= 0 else "integer"
+    tipo = pd.to_numeric(preenchidos.astype("int64"), downcast=sinal).dtype
+    if len(preenchidos) == len(serie):
+        return serie.astype(tipo)
+    return serie.astype(tipo.name.replace("uint", "UInt").replace("int", "Int"))
+
+
+def _converter(serie, tipo):
+    formato = None
+    if isinstance(tipo, tuple):
+        tipo, formato = tipo
+    if tipo == "categoria":
+        return serie.astype("category")
+    if tipo == "inteiro":
+        return _inteiro(serie)
+    if tipo == "decimal":
+        return pd.to_numeric(serie, errors="coerce", downcast="float")
+    if tipo == "data":
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        return pd.to_datetime(serie, format=formato, errors="coerce")
+    raise ValueError(f"Tipo de coluna desconhecido: {tipo!r}")
+
+
+def aplicar_esquema(dados, esquema):
+    """
+    Converte as colunas do DataFrame para os tipos declarados no esquema.
+
+    Parâmetros:
+    - dados: DataFrame recém-carregado; é alterado no lugar e também retornado.
+    - esquema: Dicionário {coluna: tipo}, como os de ESQUEMAS. Colunas ausentes
+      no DataFrame são ignoradas e colunas fora do esquema ficam como estão.
+
+    O uso de memória antes e depois fica em ``dados.attrs["memoria"]`` como
+    uma tupla ``(bytes_antes, bytes_depois)``.
+    """
+    antes = int(dados.memory_usage(deep=True).sum())
+    for coluna, tipo in esquema.items():
+        if coluna in dados.columns:
+            dados[coluna] = _converter(dados[coluna], tipo)
+    depois = int(dados.memory_usage(deep=True).sum())
+    dados.attrs["memoria"] = (antes, depois)
+    logger.info("Esquema aplicado: %.1f MB -> %.1f MB", antes / 1e6, depois / 1e6)
+    return dados
+
+
+def relatorio_memoria(dados):
+    """
+    Retorna um DataFrame com os bytes de cada coluna e o tipo atual.
+
+    Parâmetros:
+    - dados: DataFrame a ser inspecionado.
+    """
+    return pd.DataFrame({
+        "Tipo": dados.dtypes.astype(str),
+        "Bytes": dados.memory_usage(deep=True, index=False),
+    }).sort_values("Bytes", ascending=False)
@@ -0,0 +1,232 @@
+"""
+Exportação dos dados filtrados na aba "Baixar dados".
+
+O arquivo (CSV, Parquet ou Excel) só é gerado quando o usuário clica no botão,
+numa thread separada da execução da página, e é escrito direto no disco em
+blocos de ``DASHS_EXPORTAR_BLOCO`` linhas recortados do DataFrame em cache: a
+geração nunca monta uma cópia inteira dos dados filtrados, só um bloco por vez
+e o arquivo final. No máximo ``DASHS_EXPORTAR_SIMULTANEAS`` arquivos são
+gerados ao mesmo tempo; as demais exportações esperam a vez sem travar as
+outras sessões.
+
+A entrega, porém, passa pelo ``st.download_button``, que só aceita o conteúdo
+inteiro: a cada download o arquivo é lido de uma vez e os bytes ficam no
+gerenciador de mídia do Streamlit enquanto a sessão mantiver o botão. Uma
+exportação grande ocupa a memória do servidor, no tamanho do arquivo gerado,
+durante esse tempo.
+
+Os arquivos gerados ficam em ``DASHS_EXPORTAR_PASTA``, com o nome derivado da
+versão dos dados, dos filtros, das colunas e do formato. Pedir de novo a mesma
+exportação (inclusive de outra sessão) reaproveita o arquivo; os mais antigos
+são apagados quando passam de ``DASHS_EXPORTAR_ARQUIVOS``, menos os usados nos
+últimos minutos, que outra sessão ainda pode estar lendo.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from comum import telemetria
+from comum.filtros import filtros_ativos, posicoes
+
+# {rótulo: (extensão, tipo MIME)}
+FORMATOS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+BLOCO = int(os.environ.get("DASHS_EXPORTAR_BLOCO", 50_000))
+PASTA = Path(os.environ.get("DASHS_EXPORTAR_PASTA", Path(tempfile.gettempdir()) / "dashs-exportacoes"))
+ARQUIVOS = int(os.environ.get("DASHS_EXPORTAR_ARQUIVOS", 32))
+_SIMULTANEAS = threading.BoundedSemaphore(int(os.environ.get("DASHS_EXPORTAR_SIMULTANEAS", 2)))
+_TRAVA_GERAL = threading.Lock()
+_TRAVAS = {}
+# Segundos depois do último uso em que um arquivo não é apagado: outra sessão pode estar lendo
+_EM_USO = 300
+
+# Linhas de dados por planilha do Excel (a primeira linha é o cabeçalho)
+_LINHAS_PLANILHA = 1_048_575
+
+
+def _blocos(data, linhas, colunas):
+    # Recorta as linhas bloco a bloco; sem linhas, um único bloco vazio mantém o cabeçalho
+    data = data[colunas]
+    for inicio in range(0, max(len(linhas), 1), BLOCO):
+        yield data.take(linhas[inicio:inicio + BLOCO])
+
+
+def _csv(blocos, caminho):
+    # Separador ";" e vírgula decimal, como o Excel em português espera
+    with open(caminho, "w", encoding="utf-8-sig", newline="") as arquivo:
+        for numero, bloco in enumerate(blocos):
+            bloco.to_csv(arquivo, sep=";", decimal=",", index=False, header=numero == 0)
+
+
+def _parquet(blocos, caminho):
+    escritor = None
+    try:
+        for bloco in blocos:
+            # O Arrow grava o dicionário inteiro das categorias; só as do bloco seguem
+            for coluna in bloco.select_dtypes("category").columns:
+                bloco[coluna] = bloco[coluna].cat.remove_unused_categories()
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(caminho, tabela.schema)
+            # Um bloco com uma coluna toda nula não pode mudar o esquema do arquivo
+            escritor.write_table(tabela.cast(escritor.schema))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _xlsx(blocos, caminho):
+    # Modo write_only: as linhas vão para o disco à medida que são acrescentadas
+    livro = openpyxl.Workbook(write_only=True)
+    planilha, linhas = None, 0
+    for bloco in blocos:
+        if planilha is None:
+            planilha = livro.create_sheet("Dados")
+            planilha.append(list(bloco.columns))
+        # Nulos (NaN, NaT, NA) viram células vazias
+        valores = bloco.astype(object).where(bloco.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            if linhas == _LINHAS_PLANILHA:
+                # Acima do limite do Excel, as linhas continuam numa nova planilha
+                planilha = livro.create_sheet(f"Dados {len(livro.worksheets) + 1}")
+                planilha.append(list(bloco.columns))
+                linhas = 0
+            planilha.append(linha)
+            linhas += 1
+    livro.save(caminho)
+
+
+_ESCRITORES = {"csv": _csv, "parquet": _parquet, "xlsx": _xlsx}
+
+
+def _limpar():
+    # Mantém só os ARQUIVOS usados mais recentemente; os ".parcial" ainda estão sendo gerados
+    arquivos = []
+    for caminho in PASTA.iterdir():
+        if caminho.suffix[1:] in _ESCRITORES:
+            try:
+                arquivos.append((caminho.stat().st_mtime, caminho))
+            except FileNotFoundError:
+                continue
+    arquivos.sort(reverse=True)
+    # Usados há pouco podem estar entre o gerar e a leitura de outra sessão, mesmo além do limite
+    limite = time.time() - _EM_USO
+    for uso, caminho in arquivos[ARQUIVOS:]:
+        if uso < limite:
+            caminho.unlink(missing_ok=True)
+
+
+def _escrever(data, linhas, colunas, extensao):
+    # Gera o arquivo num nome temporário; a geração em si respeita o limite de exportações simultâneas
+    with _SIMULTANEAS:
+        inicio = time.perf_counter()
+        descritor, temporario = tempfile.mkstemp(dir=PASTA, suffix=f".{extensao}.parcial")
+        os.close(descritor)
+        try:
+            _ESCRITORES[extensao](_blocos(data, linhas, colunas), temporario)
+        except Exception:
+            os.unlink(temporario)
+            raise
+        telemetria.EXPORTACOES.observar(time.perf_counter() - inicio, formato=extensao)
+    return Path(temporario)
+
+
+def _trava(nome):
+    # Uma trava por arquivo: pedidos iguais e simultâneos geram o arquivo uma vez só
+    with _TRAVA_GERAL:
+        return _TRAVAS.setdefault(nome, threading.Lock())
+
+
+def gerar(data, linhas, colunas, extensao, nome=None):
+    """
+    Gera o arquivo de exportação no disco e retorna o caminho.
+
+    Parâmetros:
+    - data: DataFrame completo.
+    - linhas: Posições das linhas exportadas.
+    - colunas: Colunas exportadas.
+    - extensao: "csv", "parquet" ou "xlsx".
+    - nome: Nome do arquivo em cache (sem extensão). Se já existir, é
+      reaproveitado; se omitido, o arquivo é temporário e cabe a quem chamou apagá-lo.
+    """
+    PASTA.mkdir(parents=True, exist_ok=True)
+    if nome is None:
+        return _escrever(data, linhas, colunas, extensao)
+
+    destino = PASTA / f"{nome}.{extensao}"
+    with _trava(f"{nome}.{extensao}"):
+        if destino.exists():
+            telemetria.CACHE_ACERTOS.inc(cache="exportacao")
+            # Atualiza a data de uso, que decide quem sai primeiro na limpeza
+            os.utime(destino)
+            return destino
+        telemetria.CACHE_FALTAS.inc(cache="exportacao")
+        # Troca atômica: nenhuma leitura encontra um arquivo pela metade
+        os.replace(_escrever(data, linhas, colunas, extensao), destino)
+    _limpar()
+    return destino
+
+
+def _conteudo(data, linhas, colunas, extensao, nome):
+    # Executado pelo Streamlit no clique, numa thread separada da página. O
+    # download_button precisa dos bytes: o arquivo inteiro vai para a memória aqui
+    caminho = gerar(data, linhas, colunas, extensao, nome)
+    try:
+        return caminho.read_bytes()
+    finally:
+        if nome is None:
+            caminho.unlink(missing_ok=True)
+
+
+def _nome(versao, linhas, filtros, colunas):
+    chave = repr((versao, linhas, filtros_ativos(filtros), list(colunas)))
+    return hashlib.sha1(chave.encode()).hexdigest()
+
+
+def Baixar_Dados(data, nome, filtros=None, colunas=None, chave="exportar"):
+    """
+    Exibe o botão que baixa os dados filtrados no formato escolhido.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - nome: Nome do arquivo baixado, sem extensão.
+    - filtros: Dicionário {coluna: valor}, como os das seções; valores None são ignorados.
+    - colunas: Colunas exportadas; se omitido, todas.
+    - chave: Prefixo das chaves dos widgets no st.session_state.
+
+    Chame dentro de uma seção que dependa dos mesmos filtros (ver comum.secoes),
+    para que o botão acompanhe a seleção atual.
+    """
+    colunas = list(data.columns if colunas is None else colunas)
+    selecionadas = posicoes(data, filtros or {})
+    linhas = np.arange(len(data)) if selecionadas is None else selecionadas
+
+    formato = st.radio("Formato", list(FORMATOS), horizontal=True, key=f"{chave}_formato")
+    extensao, mime = FORMATOS[formato]
+    versao = data.attrs.get("versao")
+    arquivo = None if versao is None else _nome(versao, len(data), filtros or {}, colunas)
+
+    st.caption(f"{len(linhas)} linhas · {len(colunas)} colunas, com os filtros atuais da página")
+    st.download_button(
+        "Baixar",
+        data=partial(_conteudo, data, linhas, colunas, extensao, arquivo),
+        file_name=f"{nome}.{extensao}",
+        mime=mime,
+        on_click="ignore",
+        icon=":material/download:",
+        key=f"{chave}_baixar",
+    )
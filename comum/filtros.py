@@ -0,0 +1,223 @@
+"""
+Filtros da barra lateral compartilhados pelos dashboards.
+
+Cada página declara seus filtros como uma lista de tuplas
+``(chave, coluna, rotulo, padrao)``: a chave do ``st.session_state``, a coluna
+filtrada, o rótulo do selectbox e o texto exibido quando nada foi escolhido.
+A seleção atual vira uma única máscara combinada, calculada sobre os códigos
+categóricos quando possível e guardada em cache por combinação de filtros.
+
+O filtro de ano (com intervalo de meses) é declarado como ``(chave do ano,
+chave dos meses, coluna de data)`` e vira um período ``(inicio, fim)`` na
+seleção. O período é resolvido pelo índice de partição da coluna (ver
+comum.particao), e os demais filtros só percorrem as linhas desse período.
+Buscas textuais entram como ``{coluna: Busca(texto)}`` (ver comum.busca).
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from comum import telemetria
+from comum.busca import Busca, indice_busca
+from comum.particao import intervalo_ano, particao
+from comum.perfil import etapa
+from comum.secoes import rerun_dependentes
+
+
+def Filtros(data, definicoes):
+    """
+    Cria os filtros na barra lateral.
+
+    Parâmetros:
+    - data: DataFrame usado para listar as opções de cada filtro.
+    - definicoes: Lista de tuplas (chave, coluna, rotulo, padrao).
+
+    Alterar um filtro reexecuta apenas as seções que dependem dele (ver comum.secoes).
+    """
+    for chave, coluna, rotulo, padrao in definicoes:
+        # Inicializando o filtro no st.session_state com o valor padrão
+        if chave not in st.session_state:
+            st.session_state[chave] = padrao
+
+        st.sidebar.selectbox(
+            rotulo,
+            options=[padrao] + list(data[coluna].unique()),
+            index=0,  # Define o texto padrão como opção inicial
+            key=chave,
+            on_change=rerun_dependentes,
+            args=(chave,),
+        )
+
+
+MESES = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+
+
+def Filtro_Ano(data, definicao):
+    """
+    Cria o filtro de ano e de intervalo de meses.
+
+    Parâmetros:
+    - data: DataFrame usado para listar os anos com dados.
+    - definicao: Tupla (chave do ano, chave dos meses, coluna de data).
+
+    Os anos vêm do índice de partição da coluna; o DataFrame não é alterado.
+    Assim como em Filtros, alterar o período reexecuta apenas as seções que
+    dependem das duas chaves.
+    """
+    chave_ano, chave_meses, coluna = definicao
+
+    # CSS para aumentar o tamanho do texto "Ano"
+    st.markdown(
+        """
+        <style>
+        label[data-testid="stSelectboxLabel"] {
+            font-size: 20px; /* Altere o tamanho da fonte aqui */
+            font-weight: bold; /* Deixe o texto em negrito se desejar */
+        }
+        </style>
+        """,
+        unsafe_allow_html=True
+    )
+
+    col1, col2 = st.columns([1, 3])
+    col1.selectbox(
+        "Ano",
+        particao(data, coluna).anos(),
+        index=None,
+        placeholder="Selecione um ano...",
+        key=chave_ano,
+        on_change=rerun_dependentes,
+        args=(chave_ano,),
+    )
+    col2.select_slider(
+        "Meses",
+        options=list(range(1, 13)),
+        value=(1, 12),
+        format_func=lambda mes: MESES[mes - 1],
+        key=chave_meses,
+        help="Aplicado apenas quando um ano está selecionado",
+        on_change=rerun_dependentes,
+        args=(chave_meses,),
+    )
+
+
+def periodo(definicao):
+    """
+    Retorna o período escolhido como (inicio, fim), ou None se nenhum ano foi escolhido.
+
+    Parâmetros:
+    - definicao: Tupla (chave do ano, chave dos meses, coluna de data).
+    """
+    chave_ano, chave_meses, _ = definicao
+    ano = st.session_state.get(chave_ano)
+    if ano is None:
+        return None
+    return intervalo_ano(ano, tuple(st.session_state.get(chave_meses, (1, 12))))
+
+
+def selecao(definicoes, ano=None):
+    """
+    Retorna os filtros escolhidos como {coluna: valor}; None indica filtro vazio.
+
+    Parâmetros:
+    - definicoes: Lista de tuplas (chave, coluna, rotulo, padrao).
+    - ano: Definição do filtro de ano, como em Filtro_Ano; o período entra na
+      seleção como {coluna de data: (inicio, fim)}.
+    """
+    escolhidos = {}
+    for chave, coluna, _, padrao in definicoes:
+        valor = st.session_state.get(chave)
+        escolhidos[coluna] = None if not valor or valor == padrao else valor
+    if ano is not None:
+        escolhidos[ano[2]] = periodo(ano)
+    return escolhidos
+
+
+def _mascara(data, filtros, linhas=None):
+    # Com linhas informadas, a máscara é calculada só sobre essas posições
+    mascara = np.ones(len(data) if linhas is None else len(linhas), dtype=bool)
+    for coluna, valor in filtros:
+        serie = data[coluna]
+        if isinstance(valor, Busca):
+            # Busca textual: resolvida pelo índice invertido da coluna
+            mascara &= indice_busca(data, coluna).mascara(valor.texto, linhas)
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            # Compara o código inteiro da categoria em vez do texto de cada linha
+            codigo = serie.cat.categories.get_indexer([valor])[0]
+            if codigo < 0:
+                return np.zeros(len(mascara), dtype=bool)
+            codigos = serie.cat.codes.to_numpy()
+            mascara &= (codigos if linhas is None else codigos[linhas]) == codigo
+        else:
+            serie = serie if linhas is None else serie.take(linhas)
+            mascara &= (serie == valor).to_numpy(dtype=bool, na_value=False)
+    return mascara
+
+
+def _selecionar(data, filtros):
+    # Períodos (tuplas de datas) saem do índice de partição; os demais filtros
+    # só percorrem as linhas do período
+    linhas = None
+    demais = []
+    for coluna, valor in filtros:
+        if isinstance(valor, tuple):
+            intervalo = particao(data, coluna).intervalo(*valor)
+            linhas = np.sort(intervalo) if linhas is None else np.intersect1d(linhas, intervalo)
+        else:
+            demais.append((coluna, valor))
+    if linhas is None:
+        return np.flatnonzero(_mascara(data, demais))
+    return linhas[_mascara(data, demais, linhas)]
+
+
+def filtros_ativos(filtros):
+    """
+    Normaliza os filtros numa tupla ordenada de (coluna, valor), sem os vazios.
+
+    Parâmetros:
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados.
+    """
+    return tuple(sorted((coluna, valor) for coluna, valor in filtros.items() if valor is not None))
+
+
+@telemetria.cache_data("posicoes", show_spinner=False)
+def _posicoes_em_cache(versao, linhas, filtros, _data):
+    return _selecionar(_data, filtros)
+
+
+def posicoes(data, filtros):
+    """
+    Retorna as posições das linhas que atendem aos filtros, ou None se nenhum estiver ativo.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados. Em colunas
+      de data, o valor pode ser um período (inicio, fim), como o de ``periodo``.
+
+    O resultado fica em cache pela versão do snapshot (``data.attrs["versao"]``),
+    pelo número de linhas e pela combinação de filtros, então as seções de uma
+    mesma página avaliam a máscara uma única vez.
+    """
+    ativos = filtros_ativos(filtros)
+    if not ativos:
+        return None
+    with etapa("filtro"):
+        versao = data.attrs.get("versao")
+        if versao is None:
+            return _selecionar(data, ativos)
+        return _posicoes_em_cache(versao, len(data), ativos, data)
+
+
+def filtrar(data, colunas, filtros):
+    """
+    Retorna apenas as colunas pedidas das linhas que atendem aos filtros.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - colunas: Colunas necessárias para a seção.
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados.
+    """
+    selecionadas = posicoes(data, filtros)
+    if selecionadas is None:
+        return data[colunas]
+    return data[colunas].take(selecionadas)
@@ -0,0 +1,447 @@
+"""
+Fontes de dados dos dashboards.
+
+As páginas não sabem de onde vêm os dados: ``comum.cargas`` pede cada conjunto
+à fonte configurada na variável de ambiente ``DASHS_FONTE``:
+
+- ``arquivos`` (padrão): planilhas e CSVs do repositório, lidos pelos
+  snapshots Parquet de ``comum.snapshot``;
+- ``parquet:<pasta>``: um arquivo ``<conjunto>.parquet`` por conjunto na pasta
+  (por exemplo, os dados sintéticos gerados por ``bench.sinteticos``);
+- ``sqlite:<caminho>``: banco SQLite local com as mesmas tabelas, usado como
+  substituto do warehouse em testes (gerado por ``python -m comum.fontes``);
+- ``databricks``: SQL warehouse do Databricks, com as credenciais em
+  ``DATABRICKS_SERVER_HOSTNAME``, ``DATABRICKS_HTTP_PATH`` e ``DATABRICKS_TOKEN``
+  e o prefixo das tabelas (``catalogo.esquema.``) em ``DASHS_TABELAS``.
+
+Todas as fontes aceitam projeção de colunas, filtros de igualdade e um limite
+inferior de data sobre uma ou mais colunas (usado na carga incremental, ver
+comum.incremental), que são empurrados para a leitura (filtros do Parquet ou
+cláusula WHERE), e agregações por contagem, para que o warehouse devolva só as linhas já agrupadas.
+"""
+import functools
+import hashlib
+import json
+import logging
+import operator
+import os
+import queue
+import sqlite3
+import subprocess
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from comum.snapshot import garantir_snapshot, snapshot_atualizado, versao_snapshot
+
+logger = logging.getLogger(__name__)
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Nome da coluna com a contagem nas agregações
+QUANTIDADE = "Quantidade"
+
+
+def _valores(valor):
+    return list(valor) if isinstance(valor, (list, tuple, set)) else [valor]
+
+
+def _ativos(filtros):
+    return {coluna: valor for coluna, valor in (filtros or {}).items() if valor is not None}
+
+
+def _marcas(desde):
+    # (coluna ou colunas, data) -> (tupla de colunas, Timestamp)
+    colunas, valor = desde
+    return ((colunas,) if isinstance(colunas, str) else tuple(colunas)), pd.Timestamp(valor)
+
+
+def _filtrar(dados, filtros, desde, chave=None):
+    # Filtros aplicados em memória, para leituras que não aceitam predicados
+    if desde is not None:
+        colunas, valor = _marcas(desde)
+        recentes = pd.to_datetime(dados[colunas[0]]).isna()
+        for coluna in colunas:
+            recentes |= pd.to_datetime(dados[coluna]) >= valor
+        if chave is not None:
+            recentes = dados[chave].isin(dados.loc[recentes, chave])
+        dados = dados[recentes]
+    for coluna, valor in filtros.items():
+        dados = dados[dados[coluna].isin(_valores(valor))]
+    return dados
+
+
+def _condicoes(filtros, desde):
+    # Predicado do pyarrow, avaliado na leitura do Parquet
+    condicoes = [pc.field(coluna).isin(_valores(valor)) for coluna, valor in filtros.items()]
+    if desde is not None:
+        colunas, valor = _marcas(desde)
+        recentes = pc.field(colunas[0]).is_null()
+        for coluna in colunas:
+            recentes = recentes | (pc.field(coluna) >= valor)
+        condicoes.append(recentes)
+    return functools.reduce(operator.and_, condicoes) if condicoes else None
+
+
+def _ler_parquet(caminho, colunas, filtros, desde, chave):
+    if desde is not None and chave is not None:
+        # Duas passagens: as chaves com alguma linha recente e, depois, todas as linhas delas
+        chaves = pd.read_parquet(caminho, columns=[chave], filters=_condicoes({}, desde))[chave]
+        filtros, desde = {chave: chaves.dropna().unique().tolist(), **filtros}, None
+    return pd.read_parquet(caminho, columns=colunas, filters=_condicoes(filtros, desde))
+
+
+def _contar(dados, dimensoes, contar):
+    agrupado = dados.groupby(dimensoes, dropna=False, observed=True)
+    contagem = agrupado[contar].count() if contar else agrupado.size()
+    return contagem.rename(QUANTIDADE).reset_index()
+
+
+def _versao_parquet(caminho):
+    # Arquivos Parquet podem ser grandes: a versão vem do mtime e do tamanho
+    estado = os.stat(caminho)
+    return hashlib.sha1(f"{caminho}|{estado.st_mtime_ns}|{estado.st_size}".encode()).hexdigest()
+
+
+def _versao_csv(caminho):
+    with open(caminho, "rb") as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()
+
+
+class FonteArquivos:
+    """
+    Lê os conjuntos a partir das planilhas e CSVs do repositório.
+
+    Parâmetros:
+    - conjuntos: Dicionário {nome: (caminho, parâmetros de leitura)}.
+
+    Planilhas passam pelo snapshot Parquet e arquivos Parquet são lidos direto:
+    em ambos, as colunas e os filtros são aplicados pelo pyarrow na leitura.
+    CSVs pequenos são lidos inteiros.
+    """
+
+    def __init__(self, conjuntos):
+        self.conjuntos = conjuntos
+
+    def _converter(self, caminho, parametros):
+        # Processo separado em vez de multiprocessing: o Streamlit troca o __main__
+        # pelo script da página, e um filho "spawn" reexecutaria o app inteiro
+        ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(RAIZ), os.environ.get("PYTHONPATH")])))
+        comando = [sys.executable, "-m", "comum.snapshot", caminho, json.dumps(parametros)]
+        try:
+            subprocess.run(comando, env=ambiente, check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError):
+            # Sem o processo auxiliar, garantir_snapshot converte no próprio processo
+            logger.warning("Falha ao converter %s em outro processo", caminho, exc_info=True)
+
+    def assinatura(self, nome):
+        """
+        Retorna o mtime e o tamanho do arquivo de origem, para detectar mudanças sem lê-lo.
+
+        Parâmetros:
+        - nome: Nome do conjunto de dados.
+        """
+        estado = os.stat(self.conjuntos[nome][0])
+        return estado.st_mtime_ns, estado.st_size
+
+    def versao(self, nome):
+        """
+        Retorna a versão que ``ler`` atribuiria ao conjunto, sem ler as linhas.
+
+        Parâmetros:
+        - nome: Nome do conjunto de dados.
+
+        Para planilhas, a versão é o hash registrado no snapshot; sem snapshot
+        atualizado, retorna None.
+        """
+        caminho, parametros = self.conjuntos[nome]
+        if caminho.endswith(".parquet"):
+            return _versao_parquet(caminho)
+        if caminho.endswith(".csv"):
+            return _versao_csv(caminho)
+        return versao_snapshot(caminho, **parametros)
+
+    def ler(self, nome, colunas=None, filtros=None, desde=None, chave=None):
+        """
+        Retorna as linhas de um conjunto.
+
+        Parâmetros:
+        - nome: Nome do conjunto de dados.
+        - colunas: Colunas lidas; se omitido, todas.
+        - filtros: Dicionário {coluna: valor ou lista de valores}; None é ignorado.
+        - desde: Tupla (colunas, data): lê só as linhas em que alguma das colunas é
+          maior ou igual à data ou em que a primeira delas (a marca d'água) é nula.
+        - chave: Com ``desde``, lê todas as linhas das chaves que têm alguma linha selecionada.
+        """
+        caminho, parametros = self.conjuntos[nome]
+        filtros = _ativos(filtros)
+        if caminho.endswith(".parquet"):
+            versao = _versao_parquet(caminho)
+            dados = _ler_parquet(caminho, colunas, filtros, desde, chave)
+        elif caminho.endswith(".csv"):
+            versao = _versao_csv(caminho)
+            dados = _filtrar(pd.read_csv(caminho, **parametros), filtros, desde, chave)
+            dados = dados[colunas] if colunas else dados
+        else:
+            if not snapshot_atualizado(caminho, **parametros):
+                self._converter(caminho, parametros)
+            arquivo, versao = garantir_snapshot(caminho, **parametros)
+            if arquivo is None:
+                # Snapshot não pôde ser gravado: lê a planilha e filtra em memória
+                dados = _filtrar(pd.read_excel(caminho, **parametros), filtros, desde, chave)
+                dados = dados[colunas] if colunas else dados
+            else:
+                dados = _ler_parquet(arquivo, colunas, filtros, desde, chave)
+        dados.attrs["versao"] = versao
+        return dados
+
+    def agregar(self, nome, dimensoes, filtros=None, contar=None):
+        """
+        Retorna a contagem de linhas por combinação das dimensões.
+
+        Parâmetros:
+        - nome: Nome do conjunto de dados.
+        - dimensoes: Colunas do agrupamento.
+        - filtros: Dicionário {coluna: valor ou lista de valores}; None é ignorado.
+        - contar: Coluna cujos valores preenchidos são contados; se omitido, conta linhas.
+
+        A contagem fica na coluna ``Quantidade``.
+        """
+        colunas = list(dimensoes) + ([contar] if contar and contar not in dimensoes else [])
+        dados = self.ler(nome, colunas, filtros)
+        agregado = _contar(dados, list(dimensoes), contar)
+        agregado.attrs["versao"] = dados.attrs["versao"]
+        return agregado
+
+
+class _Pool:
+    # Conexões reaproveitadas entre execuções, no máximo ``tamanho`` abertas ao mesmo tempo
+    def __init__(self, conectar, tamanho):
+        self._conectar = conectar
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    @contextmanager
+    def conexao(self):
+        self._vagas.acquire()
+        try:
+            try:
+                conexao = self._livres.get_nowait()
+            except queue.Empty:
+                conexao = self._conectar()
+            try:
+                yield conexao
+            except Exception:
+                # Conexão possivelmente quebrada: descarta em vez de devolver ao pool
+                conexao.close()
+                raise
+            self._livres.put(conexao)
+        finally:
+            self._vagas.release()
+
+
+class FonteSQL:
+    """
+    Lê os conjuntos de um banco SQL por DB-API, com conexões em pool.
+
+    Parâmetros:
+    - conectar: Função sem argumentos que abre uma nova conexão DB-API.
+    - prefixo: Texto colocado antes do nome de cada tabela (por exemplo, "catalogo.esquema.").
+    - aspas: Caractere usado para citar nomes de colunas e tabelas.
+    - tamanho_pool: Número máximo de conexões abertas ao mesmo tempo.
+    - tamanho_lote: Linhas buscadas por vez.
+
+    O banco precisa aceitar parâmetros nomeados no formato ``:nome``, como o
+    sqlite3 e o databricks-sql-connector. Cursores com ``fetchmany_arrow``
+    entregam os lotes já em Arrow; os demais são convertidos lote a lote.
+    """
+
+    def __init__(self, conectar, prefixo="", aspas='"', tamanho_pool=4, tamanho_lote=50_000):
+        self.prefixo = prefixo
+        self.aspas = aspas
+        self.tamanho_lote = tamanho_lote
+        self._pool = _Pool(conectar, tamanho_pool)
+
+    def _nome(self, nome):
+        return f"{self.aspas}{nome}{self.aspas}"
+
+    def _where(self, filtros, desde=None, tabela=None, chave=None):
+        condicoes, parametros = [], {}
+        if desde is not None:
+            # Texto ISO: compara corretamente tanto com TIMESTAMP quanto com datas gravadas como texto
+            colunas, valor = _marcas(desde)
+            parametros["desde"] = str(valor)
+            recentes = " OR ".join([f"{self._nome(colunas[0])} IS NULL", *(f"{self._nome(coluna)} >= :desde" for coluna in colunas)])
+            if chave is not None:
+                recentes = f"{self._nome(chave)} IN (SELECT {self._nome(chave)} FROM {tabela} WHERE {recentes})"
+            condicoes.append(f"({recentes})")
+        for coluna, valor in _ativos(filtros).items():
+            marcadores = []
+            for item in _valores(valor):
+                chave_parametro = f"p{len(parametros)}"
+                parametros[chave_parametro] = item
+                marcadores.append(f":{chave_parametro}")
+            condicoes.append(f"{self._nome(coluna)} IN ({', '.join(marcadores)})")
+        return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), parametros
+
+    def _lotes(self, cursor):
+        if hasattr(cursor, "fetchmany_arrow"):
+            while True:
+                lote = cursor.fetchmany_arrow(self.tamanho_lote)
+                if lote.num_rows == 0:
+                    return
+                yield lote
+        nomes = [descricao[0] for descricao in cursor.description]
+        while linhas := cursor.fetchmany(self.tamanho_lote):
+            yield pa.Table.from_arrays([pa.array(coluna) for coluna in zip(*linhas)], names=nomes)
+
+    def _consultar(self, sql, parametros):
+        with self._pool.conexao() as conexao:
+            cursor = conexao.cursor()
+            try:
+                cursor.execute(sql, parametros)
+                nomes = [descricao[0] for descricao in cursor.description]
+                lotes = list(self._lotes(cursor))
+            finally:
+                cursor.close()
+        if not lotes:
+            return pd.DataFrame(columns=nomes)
+        # Lotes só com nulos chegam com tipo "null"; a promoção unifica os tipos
+        return pa.concat_tables(lotes, promote_options="permissive").to_pandas()
+
+    def assinatura(self, nome):
+        # Não há como saber se a tabela mudou sem consultá-la
+        return None
+
+    def versao(self, nome):
+        # Cada leitura é uma nova versão: nada a reaproveitar entre processos
+        return None
+
+    def ler(self, nome, colunas=None, filtros=None, desde=None, chave=None):
+        """
+        Retorna as linhas de um conjunto, com projeção e filtros feitos no banco.
+
+        Parâmetros:
+        - nome: Nome da tabela, sem o prefixo.
+        - colunas: Colunas lidas; se omitido, todas.
+        - filtros: Dicionário {coluna: valor ou lista de valores}; None é ignorado.
+        - desde: Tupla (colunas, data): lê só as linhas em que alguma das colunas é
+          maior ou igual à data ou em que a primeira delas (a marca d'água) é nula.
+        - chave: Com ``desde``, lê todas as linhas das chaves que têm alguma linha selecionada.
+        """
+        selecao = ", ".join(self._nome(coluna) for coluna in colunas) if colunas else "*"
+        tabela = f"{self.prefixo}{self._nome(nome)}"
+        where, parametros = self._where(filtros, desde, tabela, chave)
+        dados = self._consultar(f"SELECT {selecao} FROM {tabela}{where}", parametros)
+        # Cada leitura é uma nova versão para os caches derivados (cubos, filtros...)
+        dados.attrs["versao"] = uuid.uuid4().hex
+        return dados
+
+    def agregar(self, nome, dimensoes, filtros=None, contar=None):
+        """
+        Retorna a contagem por combinação das dimensões, agrupada no banco.
+
+        Parâmetros:
+        - nome: Nome da tabela, sem o prefixo.
+        - dimensoes: Colunas do agrupamento.
+        - filtros: Dicionário {coluna: valor ou lista de valores}; None é ignorado.
+        - contar: Coluna cujos valores preenchidos são contados; se omitido, conta linhas.
+        """
+        grupos = ", ".join(self._nome(coluna) for coluna in dimensoes)
+        contagem = f"COUNT({self._nome(contar)})" if contar else "COUNT(*)"
+        where, parametros = self._where(filtros)
+        sql = (
+            f"SELECT {grupos}, {contagem} AS {self._nome(QUANTIDADE)} "
+            f"FROM {self.prefixo}{self._nome(nome)}{where} GROUP BY {grupos}"
+        )
+        dados = self._consultar(sql, parametros)
+        dados.attrs["versao"] = uuid.uuid4().hex
+        return dados
+
+
+def FonteSQLite(caminho, **kwargs):
+    """
+    Fonte SQL sobre um arquivo SQLite local.
+
+    Parâmetros:
+    - caminho: Caminho do banco, como gerado por ``exportar_sqlite``.
+    - kwargs: Parâmetros repassados para FonteSQL.
+    """
+    return FonteSQL(lambda: sqlite3.connect(caminho, check_same_thread=False), **kwargs)
+
+
+def FonteDatabricks(**kwargs):
+    """
+    Fonte SQL sobre um SQL warehouse do Databricks.
+
+    Parâmetros:
+    - kwargs: Parâmetros repassados para FonteSQL.
+
+    Requer o pacote ``databricks-sql-connector`` e as variáveis de ambiente
+    DATABRICKS_SERVER_HOSTNAME, DATABRICKS_HTTP_PATH e DATABRICKS_TOKEN.
+    """
+    try:
+        from databricks import sql
+    except ImportError as erro:
+        raise ImportError("A fonte 'databricks' requer o pacote databricks-sql-connector") from erro
+
+    def conectar():
+        return sql.connect(
+            server_hostname=os.environ["DATABRICKS_SERVER_HOSTNAME"],
+            http_path=os.environ["DATABRICKS_HTTP_PATH"],
+            access_token=os.environ["DATABRICKS_TOKEN"],
+        )
+
+    kwargs.setdefault("prefixo", os.environ.get("DASHS_TABELAS", ""))
+    return FonteSQL(conectar, aspas="`", **kwargs)
+
+
+def criar_fonte(configuracao, conjuntos):
+    """
+    Cria a fonte descrita por ``configuracao`` (o valor de DASHS_FONTE).
+
+    Parâmetros:
+    - configuracao: "arquivos", "parquet:<pasta>", "sqlite:<caminho>" ou "databricks".
+    - conjuntos: Dicionário {nome: (caminho, parâmetros de leitura)} usado pela fonte de arquivos.
+    """
+    tipo, _, argumento = (configuracao or "arquivos").partition(":")
+    if tipo == "arquivos":
+        return FonteArquivos(conjuntos)
+    if tipo == "parquet":
+        pasta = Path(argumento)
+        return FonteArquivos({nome: (str(pasta / f"{nome}.parquet"), {}) for nome in conjuntos})
+    if tipo == "sqlite":
+        return FonteSQLite(argumento)
+    if tipo == "databricks":
+        return FonteDatabricks()
+    raise ValueError(f"Fonte de dados desconhecida: {configuracao!r}")
+
+
+def exportar_sqlite(caminho, conjuntos):
+    """
+    Grava todos os conjuntos num banco SQLite com uma tabela por conjunto.
+
+    Parâmetros:
+    - caminho: Caminho do banco que será criado ou sobrescrito.
+    - conjuntos: Dicionário {nome: (caminho, parâmetros de leitura)}.
+
+    As tabelas têm as mesmas colunas das planilhas, sem o esquema aplicado,
+    para que a carga por SQLite passe pelas mesmas conversões da carga por arquivos.
+    """
+    origem = FonteArquivos(conjuntos)
+    with sqlite3.connect(caminho) as conexao:
+        for nome in conjuntos:
+            origem.ler(nome).to_sql(nome, conexao, if_exists="replace", index=False)
+
+
+if __name__ == "__main__":
+    # Uso: python -m comum.fontes dados.db  (gera o substituto local do warehouse)
+    from comum.cargas import CONJUNTOS
+
+    exportar_sqlite(sys.argv[1], CONJUNTOS)
@@ -0,0 +1,325 @@
+"""
+Gráficos rotulados compartilhados pelos dashboards.
+
+Cada gráfico é montado como uma especificação Vega-Lite em camadas que
+referenciam um único dataset nomeado no nível superior, em vez de embutir uma
+cópia dos dados por camada. A especificação depende só dos parâmetros do
+gráfico (colunas, títulos, cores e tipos das colunas), então fica em cache e é
+reaproveitada; a cada renderização apenas o dataset, identificado pela
+impressão digital do seu conteúdo, é anexado.
+"""
+import hashlib
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from comum import telemetria
+from comum.perfil import etapa, registrar_envio
+
+
+def _tipo(dados, coluna):
+    # Tipo Vega-Lite da coluna, inferido a partir do dtype do pandas
+    dtype = dados[coluna].dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "temporal"
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return "quantitative"
+    return "nominal"
+
+
+def _colunas(data, colunas):
+    # Leva o índice para as colunas (se tiver nome) e envia só as colunas usadas no gráfico
+    if not isinstance(data.index, pd.RangeIndex) or data.index.name is not None:
+        data = data.reset_index()
+    return data[list(dict.fromkeys(colunas))]
+
+
+def _impressao_digital(dados):
+    valores = pd.util.hash_pandas_object(dados, index=False).to_numpy()
+    colunas = "|".join(map(str, dados.columns)).encode()
+    return hashlib.sha1(colunas + valores.tobytes()).hexdigest()
+
+
+def _hover(campo):
+    return alt.selection_point(name="hover", fields=[campo], nearest=True, on="mouseover", empty=False)
+
+
+def _titulo(titulo):
+    return alt.TitleParams(text=titulo, anchor="middle")
+
+
+def _renderizar(especificacao, data):
+    """
+    Anexa o dataset à especificação e exibe o gráfico.
+
+    Parâmetros:
+    - especificacao: Dicionário Vega-Lite retornado por um dos construtores em cache.
+    - data: DataFrame com as colunas usadas pelo gráfico.
+    """
+    nome = f"dados_{_impressao_digital(data)}"
+    especificacao["data"] = {"name": nome}
+    especificacao["datasets"] = {nome: data}
+    registrar_envio(data)
+    with etapa("grafico"):
+        st.vega_lite_chart(especificacao, width="stretch")
+
+
+@telemetria.cache_data("especificacao_area", show_spinner=False)
+def _especificacao_area(axisx, axisy, rotuloY, titulo, tipos, rotulo_hover):
+    tipox, tipoy = tipos
+    x = alt.X(field=axisx, type=tipox, title="")
+    y = alt.Y(field=axisy, type=tipoy, title=rotuloY)
+    hover = _hover(axisx)
+    dica = [
+        alt.Tooltip(field=axisx, type=tipox, title="Data"),
+        alt.Tooltip(field=axisy, type=tipoy, title=rotuloY),
+    ]
+
+    if rotulo_hover:
+        # Linha com área preenchida; o rótulo aparece apenas no ponto de hover
+        area = alt.Chart().mark_area(opacity=0.4, line={"color": "#005FB8", "width": 2}).encode(x=x, y=y, tooltip=dica)
+        points = area.transform_filter(hover).mark_circle(size=75, color="#005FB8")
+        labels = (
+            alt.Chart()
+            .mark_text(align='left', dx=5, dy=-5, fontSize=12, color="#005FB8")
+            .encode(x=x, y=y, text=alt.Text(field=axisy, type=tipoy, format=".0f"))
+            .transform_filter(hover)
+        )
+        tooltips = (
+            alt.Chart()
+            .mark_rule(color="gray")
+            .encode(x=x, opacity=alt.condition(hover, alt.value(0.5), alt.value(0)), tooltip=dica)
+            .add_params(hover)
+        )
+    else:
+        # Área com contorno e rótulos em todos os pontos
+        area = (
+            alt.Chart()
+            .mark_area(opacity=0.6, line={"color": "#005FB8"})
+            .encode(x=x, y=y, color=alt.value("#005FB8"), tooltip=dica)
+        )
+        points = area.transform_filter(hover).mark_circle(size=65)
+        labels = (
+            alt.Chart()
+            .mark_text(align='left', dx=5, dy=-5, fontSize=12, color="#FFFFFF")
+            .encode(x=x, y=y, text=alt.Text(field=axisy, type=tipoy, format=".0f"))
+        )
+        tooltips = (
+            alt.Chart()
+            .mark_rule()
+            .encode(x=x, y=y, opacity=alt.condition(hover, alt.value(0.3), alt.value(0)), tooltip=dica)
+            .add_params(hover)
+        )
+
+    return alt.layer(area, points, labels, tooltips, data=alt.Data(name="dados"), title=_titulo(titulo)).to_dict()
+
+
+@telemetria.cache_data("especificacao_area_dupla", show_spinner=False)
+def _especificacao_area_dupla(axisx, axisy1, axisy2, rotuloY1, rotuloY2, titulo, cor1, cor2, tipos):
+    tipox, tipoy1, tipoy2 = tipos
+    x = alt.X(field=axisx, type=tipox, title="")
+    hover = _hover(axisx)
+    camadas = []
+
+    for axisy, tipoy, rotuloY, cor in ((axisy1, tipoy1, rotuloY1, cor1), (axisy2, tipoy2, rotuloY2, cor2)):
+        y = alt.Y(field=axisy, type=tipoy, title=rotuloY)
+        area = (
+            alt.Chart()
+            .mark_area(opacity=0.4, line={"color": cor, "width": 2})
+            .encode(
+                x=x,
+                y=y,
+                tooltip=[
+                    alt.Tooltip(field=axisx, type=tipox, title="Data"),
+                    alt.Tooltip(field=axisy, type=tipoy, title=rotuloY),
+                ],
+            )
+        )
+        points = area.transform_filter(hover).mark_circle(size=75, color=cor)
+        labels = (
+            alt.Chart()
+            .mark_text(align='left', dx=5, dy=-5, fontSize=12, color=cor)
+            .encode(x=x, y=y, text=alt.Text(field=axisy, type=tipoy, format=".0f"))
+            .transform_filter(hover)
+        )
+        camadas += [area, points, labels]
+
+    # Regra de tooltips
+    tooltips = (
+        alt.Chart()
+        .mark_rule(color="gray")
+        .encode(
+            x=x,
+            opacity=alt.condition(hover, alt.value(0.5), alt.value(0)),
+            tooltip=[
+                alt.Tooltip(field=axisx, type=tipox, title="Data"),
+                alt.Tooltip(field=axisy1, type=tipoy1, title=rotuloY1),
+                alt.Tooltip(field=axisy2, type=tipoy2, title=rotuloY2),
+            ],
+        )
+        .add_params(hover)
+    )
+    camadas.append(tooltips)
+
+    return alt.layer(*camadas, data=alt.Data(name="dados"), title=_titulo(titulo)).to_dict()
+
+
+@telemetria.cache_data("especificacao_barras", show_spinner=False)
+def _especificacao_barras(categoria, valor, rotulo_categoria, rotulo_valor, titulo, tipos, horizontal, formato, titulos_dica, cor_regra=None, ordenar_regra=True):
+    tipo_categoria, tipo_valor = tipos
+    hover = _hover(categoria)
+    if horizontal:
+        eixo_categoria = alt.Y(field=categoria, type=tipo_categoria, title=rotulo_categoria, sort="-x")
+        eixo_valor = alt.X(field=valor, type=tipo_valor, title=rotulo_valor)
+        texto = {"align": "left", "dx": 5}
+    else:
+        eixo_categoria = alt.X(field=categoria, type=tipo_categoria, title=rotulo_categoria, sort="-y")
+        eixo_valor = alt.Y(field=valor, type=tipo_valor, title=rotulo_valor)
+        texto = {"dy": -5}
+
+    canais = {"x": eixo_valor, "y": eixo_categoria} if horizontal else {"x": eixo_categoria, "y": eixo_valor}
+    dica = [
+        alt.Tooltip(field=categoria, type=tipo_categoria, title=titulos_dica[0]),
+        alt.Tooltip(field=valor, type=tipo_valor, title=titulos_dica[1]),
+    ]
+
+    bars = alt.Chart().mark_bar(opacity=0.8, color="#005FB8").encode(tooltip=dica, **canais)
+    labels = (
+        alt.Chart()
+        .mark_text(fontSize=12, color="#FFFFFF", **texto)
+        .encode(text=alt.Text(field=valor, type=tipo_valor, format=formato), **canais)
+    )
+
+    canais_regra = dict(canais)
+    if not ordenar_regra:
+        # A regra das barras verticais não herda a ordenação das barras
+        canais_regra["x"] = alt.X(field=categoria, type=tipo_categoria, title=rotulo_categoria)
+    tooltips = (
+        alt.Chart()
+        .mark_rule(**({"color": cor_regra} if cor_regra else {}))
+        .encode(opacity=alt.condition(hover, alt.value(0.3), alt.value(0)), tooltip=dica, **canais_regra)
+        .add_params(hover)
+    )
+
+    return alt.layer(bars, labels, tooltips, data=alt.Data(name="dados"), title=_titulo(titulo)).to_dict()
+
+
+def Grafico_Rotulado_Data(data, axisx, axisy, rotuloY, titulo, rotulo_hover=False):
+    """
+    Exibe um gráfico de área interativo com hover, pontos, tooltips e rótulos.
+
+    Parâmetros:
+    - data: DataFrame com os dados a serem plotados.
+    - axisx: Nome da coluna para o eixo X.
+    - axisy: Nome da coluna para o eixo Y.
+    - rotuloY: Título do eixo Y.
+    - titulo: Título do gráfico.
+    - rotulo_hover: Se True, desenha linha com área preenchida e mostra o rótulo
+      apenas no ponto sob o mouse (estilo das páginas preditivas).
+    """
+    data = _colunas(data, [axisx, axisy])
+    tipos = (_tipo(data, axisx), _tipo(data, axisy))
+    _renderizar(_especificacao_area(axisx, axisy, rotuloY, titulo, tipos, rotulo_hover), data)
+
+
+def Grafico_Rotulado_Data_Dual(data, axisx, axisy1, axisy2, rotuloY1, rotuloY2, titulo, cor1="#005FB8", cor2="#FF0000"):
+    """
+    Exibe um gráfico de linha com área preenchida para dois conjuntos de dados no mesmo eixo X.
+    Interativo, com hover, pontos, tooltips e rótulos.
+
+    Parâmetros:
+    - data: DataFrame com os dados a serem plotados.
+    - axisx: Nome da coluna para o eixo X.
+    - axisy1: Nome da primeira coluna para o eixo Y.
+    - axisy2: Nome da segunda coluna para o eixo Y.
+    - rotuloY1: Título do primeiro eixo Y.
+    - rotuloY2: Título do segundo eixo Y.
+    - titulo: Título do gráfico.
+    - cor1: Cor para o primeiro gráfico (padrão azul).
+    - cor2: Cor para o segundo gráfico (padrão vermelho).
+    """
+    data = _colunas(data, [axisx, axisy1, axisy2])
+    tipos = (_tipo(data, axisx), _tipo(data, axisy1), _tipo(data, axisy2))
+    _renderizar(_especificacao_area_dupla(axisx, axisy1, axisy2, rotuloY1, rotuloY2, titulo, cor1, cor2, tipos), data)
+
+
+def Grafico_Rotulado_Barras(data, axisx, axisy, rotuloX, titulo):
+    """
+    Exibe um gráfico de barras horizontais interativo com hover, tooltips e rótulos.
+
+    Parâmetros:
+    - data: DataFrame com os dados a serem plotados.
+    - axisx: Nome da coluna para o eixo X.
+    - axisy: Nome da coluna para o eixo Y.
+    - rotuloX: Título do eixo X.
+    - titulo: Título do gráfico.
+    """
+    data = _colunas(data, [axisy, axisx])
+    especificacao = _especificacao_barras(
+        categoria=axisy,
+        valor=axisx,
+        rotulo_categoria="",
+        rotulo_valor=rotuloX,
+        titulo=titulo,
+        tipos=(_tipo(data, axisy), _tipo(data, axisx)),
+        horizontal=True,
+        formato=".2f",
+        titulos_dica=("Categoria", rotuloX),
+        cor_regra="gray",
+    )
+    _renderizar(especificacao, data)
+
+
+def Grafico_Rotulado_Barras_Veticais(data, axisx, axisy, rotuloY, titulo):
+    """
+    Exibe um gráfico de barras verticais interativo com hover, tooltips e rótulos.
+
+    Parâmetros:
+    - data: DataFrame com os dados a serem plotados.
+    - axisx: Nome da coluna para o eixo X.
+    - axisy: Nome da coluna para o eixo Y.
+    - rotuloY: Título do eixo Y.
+    - titulo: Título do gráfico.
+    """
+    data = _colunas(data, [axisx, axisy])
+    especificacao = _especificacao_barras(
+        categoria=axisx,
+        valor=axisy,
+        rotulo_categoria="",
+        rotulo_valor=rotuloY,
+        titulo=titulo,
+        tipos=(_tipo(data, axisx), _tipo(data, axisy)),
+        horizontal=False,
+        formato=".2f",
+        titulos_dica=("Tipo", rotuloY),
+        cor_regra="gray",
+        ordenar_regra=False,
+    )
+    _renderizar(especificacao, data)
+
+
+def Grafico_Rotulado_Barras_Horizontal(data, axisx, axisy, rotuloY, titulo):
+    """
+    Exibe um gráfico de barras horizontal interativo com hover, rótulos e tooltips.
+
+    Parâmetros:
+    - data: DataFrame com os dados a serem plotados.
+    - axisx: Nome da coluna para o eixo X.
+    - axisy: Nome da coluna para o eixo Y.
+    - rotuloY: Título do eixo Y.
+    - titulo: Título do gráfico.
+    """
+    data = _colunas(data, [axisy, axisx])
+    especificacao = _especificacao_barras(
+        categoria=axisy,
+        valor=axisx,
+        rotulo_categoria=rotuloY,
+        rotulo_valor="",
+        titulo=titulo,
+        tipos=(_tipo(data, axisy), _tipo(data, axisx)),
+        horizontal=True,
+        formato=".0f",
+        titulos_dica=(rotuloY, "Contagem"),
+    )
+    _renderizar(especificacao, data)
@@ -0,0 +1,208 @@
+"""
+Carga incremental dos conjuntos que crescem todo dia (ordens e notas).
+
+Em vez de descartar o DataFrame e os cubos sempre que a origem muda, cada
+conjunto registrado em INCREMENTAIS mantém um estado único por servidor:
+
+1. a primeira carga lê tudo;
+2. quando a origem muda (ou, nas fontes SQL, a cada DASHS_INCREMENTAL_SEGUNDOS),
+   só são relidas as chaves com alguma linha alterada desde ``marca - JANELA``,
+   em que ``marca`` é a maior data da marca d'água: linhas com alguma das datas
+   de alteração (criação, encerramento, mudanças de status) a partir dessa
+   data, ou sem a marca d'água;
+3. as linhas alteradas e as linhas com as mesmas chaves são substituídas
+   pelo delta (upsert por chave) e os cubos registrados recebem apenas a
+   diferença: menos as linhas substituídas, mais as novas.
+
+Como cada mudança de status grava a sua data, uma ordem antiga que ganhou
+data de encerramento ou uma nota antiga que chegou ao MSPR entram no delta,
+qualquer que seja a data de criação. Alterações que não mudam nenhuma dessas
+datas (uma descrição corrigida, uma data apagada) só aparecem numa releitura
+completa; para forçá-la, basta reiniciar o servidor.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from comum import cache_disco, telemetria
+from comum.cargas import carregar, fonte
+from comum.cubo import construir_cubo
+from comum.esquema import ESQUEMAS, aplicar_esquema
+
+logger = logging.getLogger(__name__)
+
+# {conjunto: (coluna chave, colunas de data que registram alterações; a primeira é a marca d'água)}
+INCREMENTAIS = {
+    "ordens": ("Ordem", ("Data_de_Criacao", "Data_de_Encerramento")),
+    "triagem": ("Nota", ("MSPN", "MSPR", "ORDA", "MSEN", "MREL", "MSIM")),
+}
+
+JANELA = pd.Timedelta(days=int(os.environ.get("DASHS_INCREMENTAL_JANELA_DIAS", 30)))
+INTERVALO = float(os.environ.get("DASHS_INCREMENTAL_SEGUNDOS", 60))
+
+
+def _alinhar_categorias(base, delta):
+    # Une as categorias para que o concat mantenha as colunas categóricas
+    base, delta = base.copy(deep=False), delta.copy(deep=False)
+    for coluna in base.columns:
+        if isinstance(base[coluna].dtype, pd.CategoricalDtype) and coluna in delta.columns:
+            novas = pd.Index(delta[coluna].dropna().unique()).difference(base[coluna].cat.categories)
+            if len(novas):
+                # union mantém as categorias em ordem, como o astype("category") da carga
+                base[coluna] = base[coluna].cat.set_categories(base[coluna].cat.categories.union(novas))
+            delta[coluna] = pd.Categorical(delta[coluna], categories=base[coluna].cat.categories)
+    return base, delta
+
+
+class Incremental:
+    """
+    Estado de um conjunto carregado de forma incremental.
+
+    Parâmetros:
+    - nome: Nome do conjunto de dados, como registrado em comum.cargas.CONJUNTOS.
+    - chave: Coluna que identifica o registro; pode se repetir (uma ordem tem
+      várias linhas), e nesse caso todas as linhas da chave são substituídas juntas.
+    - marcas: Colunas de data gravadas quando o registro muda (criação,
+      encerramento, mudanças de status); a primeira é a marca d'água.
+    """
+
+    def __init__(self, nome, chave, marcas):
+        self.nome = nome
+        self.chave = chave
+        self.marcas = tuple(marcas)
+        self._trava = threading.Lock()
+        self._dados = None
+        self._assinatura = None
+        self._verificado = 0.0
+        # {nome do cubo: (função que retorna (dimensões, pesos) de um DataFrame, cubo atual)}
+        self._cubos = {}
+
+    def _ler(self, desde=None):
+        if desde is None:
+            # A carga completa é a publicada na memória compartilhada; os deltas são sempre relidos
+            return carregar(self.nome)
+        dados = fonte().ler(self.nome, desde=desde, chave=self.chave)
+        return aplicar_esquema(dados, ESQUEMAS.get(self.nome, {}))
+
+    def _precisa_atualizar(self):
+        assinatura = fonte().assinatura(self.nome)
+        if assinatura is None:
+            # Fonte sem assinatura barata: consulta o delta periodicamente
+            return time.monotonic() - self._verificado >= INTERVALO, None
+        return assinatura != self._assinatura, assinatura
+
+    def atualizar(self):
+        """Carrega o conjunto na primeira chamada e, depois, aplica o delta se a origem mudou."""
+        with self._trava:
+            if self._dados is None:
+                inicio = time.perf_counter()
+                self._assinatura = fonte().assinatura(self.nome)
+                self._dados = self._ler()
+                self._verificado = time.monotonic()
+                self._medir(inicio, "completa")
+                return self
+
+            mudou, assinatura = self._precisa_atualizar()
+            if not mudou:
+                return self
+            inicio = time.perf_counter()
+            desde = self._dados[self.marcas[0]].max() - JANELA
+            delta = self._ler(desde=(self.marcas, desde))
+            substituidas = self._aplicar(delta, desde)
+            self._assinatura = assinatura
+            self._verificado = time.monotonic()
+            self._medir(inicio, "incremental")
+            logger.info(
+                "%s: %d linhas substituídas por %d em %.2f s",
+                self.nome, substituidas, len(delta), time.perf_counter() - inicio,
+            )
+        return self
+
+    def _medir(self, inicio, tipo):
+        telemetria.CARGAS.observar(time.perf_counter() - inicio, conjunto=self.nome, tipo=tipo)
+        telemetria.CONJUNTO_BYTES.definir(int(self._dados.memory_usage(deep=True).sum()), conjunto=self.nome)
+
+    def _aplicar(self, delta, desde):
+        dados = self._dados
+        # Saem as linhas alteradas na janela (mesmo critério da leitura do delta, para
+        # que as apagadas na origem também saiam) e as chaves que voltaram no delta
+        sair = dados[self.marcas[0]].isna().to_numpy() | dados[self.chave].isin(delta[self.chave]).to_numpy()
+        for coluna in self.marcas:
+            sair |= (dados[coluna] >= desde).to_numpy()
+        antigas = dados[sair]
+        if len(antigas) == len(delta) and np.array_equal(
+            np.sort(pd.util.hash_pandas_object(antigas, index=False).to_numpy()),
+            np.sort(pd.util.hash_pandas_object(delta[antigas.columns], index=False).to_numpy()),
+        ):
+            # A janela voltou igual: mantém a versão, e com ela os caches derivados
+            return 0
+        base, delta = _alinhar_categorias(dados[~sair], delta)
+        novos = pd.concat([base, delta], ignore_index=True)
+        novos.attrs = {**dados.attrs, "versao": delta.attrs.get("versao")}
+
+        for nome, (dimensoes, cubo) in self._cubos.items():
+            eixos, pesos = dimensoes(antigas)
+            cubo = cubo.atualizar(eixos, -np.asarray(pesos, dtype=np.int64))
+            eixos, pesos = dimensoes(delta)
+            self._cubos[nome] = (dimensoes, cubo.atualizar(eixos, pesos))
+        self._dados = novos
+        return int(sair.sum())
+
+    def dados(self):
+        """Retorna o DataFrame atual; colunas acrescentadas pela página não afetam o estado."""
+        with self._trava:
+            # Cópia rasa: com copy-on-write não duplica os dados, só isola a página
+            return self._dados.copy(deep=False)
+
+    def cubo(self, dimensoes):
+        """
+        Retorna um cubo de contagens mantido junto com o conjunto.
+
+        Parâmetros:
+        - dimensoes: Função que recebe um DataFrame e retorna ``(dimensões, pesos)``,
+          como os argumentos de construir_cubo. O nome da função identifica o cubo.
+
+        O cubo é montado sobre os dados completos na primeira chamada (ou lido
+        do cache em disco, se já foi montado para a mesma versão, por exemplo
+        por comum.precomputar); a cada delta, só as linhas alteradas são
+        descontadas e somadas.
+        """
+        with self._trava:
+            if dimensoes.__name__ not in self._cubos:
+                self._cubos[dimensoes.__name__] = (dimensoes, self._montar(dimensoes))
+            return self._cubos[dimensoes.__name__][1]
+
+    def _montar(self, dimensoes):
+        versao = self._dados.attrs.get("versao")
+        # O código da função entra na chave: mudar as dimensões invalida o cubo gravado
+        chave = cache_disco.chave("cubo", self.nome, dimensoes.__name__, dimensoes.__code__.co_code, versao)
+        celulas = None if versao is None else cache_disco.ler(chave)
+        (telemetria.CACHE_FALTAS if celulas is None else telemetria.CACHE_ACERTOS).inc(cache="cubo_disco")
+        if celulas is not None:
+            return construir_cubo({dimensao: celulas[dimensao] for dimensao in celulas.columns[:-1]}, celulas["Quantidade"])
+        cubo = construir_cubo(*dimensoes(self._dados))
+        # Só versões que a fonte reconhece sem reler os dados valem para outros processos
+        if versao is not None and fonte().versao(self.nome) == versao:
+            cache_disco.gravar(chave, cubo.celulas())
+        return cubo
+
+
+@st.cache_resource(show_spinner=False)
+def _estado(nome):
+    chave, marcas = INCREMENTAIS[nome]
+    return Incremental(nome, chave, marcas)
+
+
+def conjunto_incremental(nome):
+    """
+    Retorna o estado incremental do conjunto, já atualizado com a origem.
+
+    Parâmetros:
+    - nome: Nome do conjunto de dados registrado em INCREMENTAIS.
+    """
+    return _estado(nome).atualizar()
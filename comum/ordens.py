@@ -0,0 +1,19 @@
+"""
+Cubo de contagens das ordens ZPM2/ZPM3.
+
+As dimensões ficam aqui, e não na página, para que o mesmo cubo seja montado
+pela página ZPM2, pelo pré-cálculo (ver comum.precomputar) e pelo benchmark.
+"""
+
+
+def dimensoes_ordens(dados):
+    # Ordens por mês, tipo, disciplina e CT; só as ordens preenchidas entram na contagem
+    return (
+        {
+            "Mes_Ano": dados["Data_de_Criacao"].dt.to_period("M").dt.to_timestamp(),
+            "Tipo": dados["Tipo"],
+            "Disciplina": dados["Disciplina"],
+            "CT": dados["CT"],
+        },
+        dados["Ordem"].notna(),
+    )
@@ -0,0 +1,117 @@
+"""
+Índice de partição por data.
+
+As posições das linhas ficam ordenadas pela coluna de data, junto com as datas
+já ordenadas. Um período (um ano, ou alguns meses de um ano) vira um intervalo
+contínuo desse índice, encontrado com duas buscas binárias: selecionar um ano
+não percorre as linhas nem acrescenta colunas ao DataFrame em cache. O índice é
+montado uma vez por versão dos dados e compartilhado entre as sessões.
+"""
+import numpy as np
+import pandas as pd
+
+from comum import telemetria
+
+
+def _segundos(datas):
+    # Datas como inteiros em segundos, comparáveis com as do índice
+    return np.asarray(datas, dtype="datetime64[s]").view("int64")
+
+
+class Particao:
+    """
+    Posições das linhas ordenadas por uma coluna de data.
+
+    Parâmetros:
+    - datas: Coluna de datas; linhas sem data (NaT) ficam fora do índice.
+    """
+
+    def __init__(self, datas):
+        valores = pd.Series(datas).to_numpy(dtype="datetime64[s]")
+        preenchidas = np.flatnonzero(~np.isnat(valores))
+        inteiros = valores.view("int64")
+        # Ordenação estável: linhas com a mesma data mantêm a ordem original
+        self.ordem = preenchidas[np.argsort(inteiros[preenchidas], kind="stable")]
+        self.datas = inteiros[self.ordem]
+
+    def _limites(self, inicio, fim):
+        primeira = 0 if inicio is None else np.searchsorted(self.datas, _segundos(pd.Timestamp(inicio)), side="left")
+        ultima = len(self.datas) if fim is None else np.searchsorted(self.datas, _segundos(pd.Timestamp(fim)), side="left")
+        return int(primeira), int(ultima)
+
+    def intervalo(self, inicio=None, fim=None):
+        """
+        Retorna as posições das linhas com data em [inicio, fim), em ordem de data.
+
+        Parâmetros:
+        - inicio: Primeira data incluída; None para desde o começo.
+        - fim: Primeira data excluída; None para até o fim.
+
+        O resultado é uma visão do índice: não o altere.
+        """
+        primeira, ultima = self._limites(inicio, fim)
+        return self.ordem[primeira:ultima]
+
+    def contar(self, inicio=None, fim=None):
+        """
+        Retorna o número de linhas com data em [inicio, fim).
+
+        Parâmetros:
+        - inicio: Primeira data incluída; None para desde o começo.
+        - fim: Primeira data excluída; None para até o fim.
+        """
+        primeira, ultima = self._limites(inicio, fim)
+        return ultima - primeira
+
+    def anos(self):
+        """Retorna os anos com pelo menos uma linha, em ordem crescente."""
+        if not len(self.datas):
+            return []
+        primeiro, ultimo = (pd.Timestamp(valor, unit="s").year for valor in (self.datas[0], self.datas[-1]))
+        return [ano for ano in range(primeiro, ultimo + 1) if self.contar(*intervalo_ano(ano))]
+
+
+def intervalo_ano(ano, meses=(1, 12)):
+    """
+    Retorna o período [inicio, fim) de um ano, opcionalmente restrito a alguns meses.
+
+    Parâmetros:
+    - ano: Ano do período.
+    - meses: Tupla (primeiro mês, último mês), ambos incluídos.
+    """
+    primeiro, ultimo = meses
+    return pd.Timestamp(ano, primeiro, 1), pd.Timestamp(ano, ultimo, 1) + pd.offsets.MonthBegin()
+
+
+def meses(periodo):
+    """
+    Retorna o primeiro dia de cada mês de um período, como os rótulos Mes_Ano dos cubos.
+
+    Parâmetros:
+    - periodo: Tupla (inicio, fim), como a de intervalo_ano; None retorna None (sem filtro).
+    """
+    if periodo is None:
+        return None
+    return list(pd.date_range(*periodo, freq="MS", inclusive="left"))
+
+
+@telemetria.cache_resource("particao", show_spinner=False)
+def _particao_em_cache(versao, linhas, coluna, _data):
+    return Particao(_data[coluna])
+
+
+def particao(data, coluna):
+    """
+    Retorna o índice de partição de uma coluna de data.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - coluna: Coluna de data indexada.
+
+    O índice fica em cache pela versão do snapshot (``data.attrs["versao"]``) e
+    é compartilhado, sem cópia, entre as sessões.
+    """
+    versao = data.attrs.get("versao")
+    if versao is None:
+        return Particao(data[coluna])
+    return _particao_em_cache(versao, len(data), coluna, data)
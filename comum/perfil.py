@@ -0,0 +1,201 @@
+"""
+Medição de desempenho das seções dos dashboards (opcional).
+
+Desligada por padrão. Liga com a variável de ambiente ``DASHS_PERFIL`` ou com o
+toggle "Medir desempenho" da barra lateral. Ligada, cada seção executada por
+Executar_Secao registra:
+
+- o tempo total da seção e das etapas internas marcadas com ``etapa`` (filtro,
+  gráfico, tabela e a carga no topo da página);
+- as linhas recebidas (soma dos DataFrames passados à seção) e as linhas e
+  bytes enviados ao navegador pelos gráficos e tabelas.
+
+O Painel_Perfil mostra a última medição de cada seção, inclusive as
+reexecuções isoladas de fragmentos. Com ``DASHS_PERFIL=cprofile`` (ou
+``pyinstrument``, se instalado), cada execução de seção também grava um perfil
+em ``DASHS_PERFIL_PASTA`` (padrão ``.perfis``), para abrir no snakeviz ou no
+navegador.
+"""
+import contextlib
+import contextvars
+import cProfile
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from comum import telemetria
+
+MODO = os.environ.get("DASHS_PERFIL", "").lower()
+PASTA = Path(os.environ.get("DASHS_PERFIL_PASTA", ".perfis"))
+PAINEL = "perfil_painel"
+
+# Chaves do st.session_state: toggle, medições {nome: medição} e painel exibido nesta execução
+_ATIVO = "perfil_ativo"
+_MEDICOES = "_perfil_medicoes"
+_COM_PAINEL = "_perfil_com_painel"
+
+# Medição da seção em execução na thread do script
+_atual = contextvars.ContextVar("perfil_atual", default=None)
+
+
+def ativo():
+    """Indica se a medição está ligada, pelo ambiente ou pelo toggle da barra lateral."""
+    return bool(MODO) or bool(st.session_state.get(_ATIVO))
+
+
+def _linhas(valores):
+    return sum(len(valor) for valor in valores if isinstance(valor, pd.DataFrame))
+
+
+def _rastrear(nome, funcao, args, kwargs):
+    # Executa a seção sob o profiler escolhido em DASHS_PERFIL e grava o resultado
+    PASTA.mkdir(parents=True, exist_ok=True)
+    arquivo = PASTA / f"{nome}-{time.strftime('%Y%m%d-%H%M%S')}"
+    if MODO == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as erro:
+            raise ImportError("DASHS_PERFIL=pyinstrument requer o pacote pyinstrument") from erro
+        profiler = Profiler()
+        with profiler:
+            funcao(*args, **kwargs)
+        arquivo.with_suffix(".html").write_text(profiler.output_html())
+        return
+    profiler = cProfile.Profile()
+    profiler.runcall(funcao, *args, **kwargs)
+    profiler.dump_stats(arquivo.with_suffix(".prof"))
+
+
+def medir_secao(nome, funcao, args, kwargs):
+    """
+    Executa a seção registrando tempo, linhas e bytes enviados.
+
+    Parâmetros:
+    - nome: Nome da seção (o nome do fragmento).
+    - funcao: Função da seção.
+    - args, kwargs: Argumentos da seção.
+    """
+    medicao = {
+        "Seção": nome,
+        "Hora": time.strftime("%H:%M:%S"),
+        "Linhas recebidas": _linhas(list(args) + list(kwargs.values())),
+        "Linhas enviadas": 0,
+        "Bytes enviados": 0,
+        "etapas": {},
+    }
+    token = _atual.set(medicao)
+    inicio = time.perf_counter()
+    try:
+        if MODO in ("cprofile", "pyinstrument"):
+            _rastrear(nome, funcao, args, kwargs)
+        else:
+            funcao(*args, **kwargs)
+    finally:
+        medicao["Segundos"] = time.perf_counter() - inicio
+        _atual.reset(token)
+        st.session_state.setdefault(_MEDICOES, {})[nome] = medicao
+
+
+@contextlib.contextmanager
+def etapa(nome):
+    """
+    Mede um trecho dentro da seção atual.
+
+    Parâmetros:
+    - nome: Nome da etapa; chamadas repetidas com o mesmo nome somam os tempos.
+
+    Fora de uma seção medida (no topo da página), o trecho vira uma linha
+    própria no painel. Com a medição desligada, não faz nada.
+    """
+    medicao = _atual.get()
+    if medicao is None and not ativo():
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        if medicao is not None:
+            medicao["etapas"][nome] = medicao["etapas"].get(nome, 0.0) + segundos
+        else:
+            st.session_state.setdefault(_MEDICOES, {})[nome] = {
+                "Seção": nome,
+                "Hora": time.strftime("%H:%M:%S"),
+                "Segundos": segundos,
+                "etapas": {},
+            }
+
+
+def registrar_envio(data):
+    """
+    Soma as linhas e os bytes de um DataFrame enviado ao navegador pela seção atual.
+
+    Parâmetros:
+    - data: DataFrame anexado a um gráfico ou exibido numa tabela.
+
+    Os bytes são os do Arrow, o formato em que o Streamlit envia os dados.
+    Também alimentam a métrica dashs_bytes_enviados_total (ver comum.telemetria).
+    """
+    medicao = _atual.get()
+    if medicao is None and not telemetria.exportando():
+        return
+    tamanho = pa.Table.from_pandas(data, preserve_index=False).nbytes
+    telemetria.BYTES_ENVIADOS.inc(tamanho, pagina=telemetria.pagina_atual())
+    if medicao is not None:
+        medicao["Linhas enviadas"] += len(data)
+        medicao["Bytes enviados"] += tamanho
+
+
+def fragmentos_extras():
+    """Fragmentos que devem acompanhar as reexecuções isoladas (o painel, quando exibido)."""
+    return [PAINEL] if st.session_state.get(_COM_PAINEL) and ativo() else []
+
+
+def Controle_Perfil():
+    """
+    Cria o toggle "Medir desempenho" na barra lateral.
+
+    Chamado a cada execução completa do app; zera as medições da execução anterior.
+    """
+    st.sidebar.toggle("Medir desempenho", value=bool(MODO), key=_ATIVO, disabled=bool(MODO))
+    st.session_state[_MEDICOES] = {}
+    st.session_state[_COM_PAINEL] = False
+
+
+def _painel():
+    medicoes = st.session_state.get(_MEDICOES, {})
+    if not medicoes:
+        st.caption("Nenhuma seção medida nesta execução.")
+        return
+    linhas = []
+    for medicao in medicoes.values():
+        linha = {chave: valor for chave, valor in medicao.items() if chave != "etapas"}
+        linha.update(medicao["etapas"])
+        linha["Outros"] = medicao["Segundos"] - sum(medicao["etapas"].values())
+        linhas.append(linha)
+    tabela = pd.DataFrame(linhas).sort_values("Segundos", ascending=False)
+    # Etapas entre os totais e "Outros" (o tempo da seção fora das etapas medidas)
+    fixas = ["Seção", "Hora", "Segundos", "Linhas recebidas", "Linhas enviadas", "Bytes enviados"]
+    etapas = [coluna for coluna in tabela.columns if coluna not in fixas + ["Outros"]]
+    tabela = tabela[[coluna for coluna in fixas if coluna in tabela.columns] + etapas + ["Outros"]]
+    st.caption(f"Total medido: {tabela['Segundos'].sum():.3f} s")
+    st.dataframe(tabela, hide_index=True, width="stretch")
+
+
+def Painel_Perfil():
+    """
+    Exibe, no fim da página, o tempo de cada seção na última execução.
+
+    O painel é um fragmento: quando um filtro reexecuta só algumas seções, ele
+    é reexecutado junto (ver comum.secoes) e mostra as novas medições.
+    """
+    if not ativo():
+        return
+    st.session_state[_COM_PAINEL] = True
+    with st.expander("Desempenho das seções", expanded=True):
+        st.fragment(_painel, key=PAINEL)()
@@ -0,0 +1,191 @@
+"""
+Política de cada cache do app: validade, número de entradas e orçamento de memória.
+
+Toda função em cache declarada com ``telemetria.cache_data`` ou
+``telemetria.cache_resource`` tem a sua política registrada em POLITICAS,
+pelo rótulo do cache (o nome da função, se nenhum for dado):
+
+- ``ttl``: segundos até uma entrada expirar; None nunca expira;
+- ``max_entries``: número máximo de entradas guardadas;
+- ``memoria``: bytes que as entradas podem ocupar juntas; ao passar do
+  orçamento, as usadas há mais tempo saem primeiro.
+
+Caches sem política registrada usam PADRAO, que também é limitado: um novo
+cache parametrizado (por ano, filtro, fonte...) nunca cresce sem fim. O
+Streamlit não informa o que está guardado, então cada cache mantém um espelho
+das suas entradas (Entradas) para aplicar o orçamento de memória e contar as
+remoções de cada motivo (ver comum.telemetria).
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MB = 1 << 20
+
+
+class Politica:
+    """
+    Limites de um cache.
+
+    Parâmetros:
+    - ttl: Segundos até uma entrada expirar; None nunca expira.
+    - max_entries: Número máximo de entradas; None não limita.
+    - memoria: Bytes que as entradas podem ocupar juntas; None não limita.
+    """
+
+    __slots__ = ("ttl", "max_entries", "memoria")
+
+    def __init__(self, ttl=None, max_entries=None, memoria=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memoria = memoria
+
+    def __repr__(self):
+        return f"Politica(ttl={self.ttl!r}, max_entries={self.max_entries!r}, memoria={self.memoria!r})"
+
+
+# Para caches sem política registrada
+PADRAO = Politica(ttl=3600, max_entries=32, memoria=256 * MB)
+
+POLITICAS = {
+    # Conjuntos carregados, por versão: mapeados da memória compartilhada (ver
+    # comum.compartilhado); o TTL renova as fontes sem versão, como as SQL
+    "carregar": Politica(ttl=3600, max_entries=16, memoria=2048 * MB),
+    "agregar": Politica(ttl=3600, max_entries=64, memoria=64 * MB),
+    # Índices por versão dos dados; versões antigas saem pelo número de entradas
+    "particao": Politica(max_entries=8, memoria=256 * MB),
+    "indice_busca": Politica(max_entries=8, memoria=512 * MB),
+    "duracoes_triagem": Politica(max_entries=4, memoria=64 * MB),
+    # Derivados de cada combinação de filtros
+    "posicoes": Politica(ttl=3600, max_entries=64, memoria=128 * MB),
+    "ordem_tabela": Politica(ttl=3600, max_entries=32, memoria=64 * MB),
+    "ciclo_triagem": Politica(ttl=3600, max_entries=32, memoria=16 * MB),
+    "metricas_previsao": Politica(ttl=3600, max_entries=32, memoria=16 * MB),
+    "consolidacao": Politica(ttl=3600, max_entries=32, memoria=16 * MB),
+    # Especificações Vega-Lite dos gráficos, pequenas e sem dados
+    "especificacao_area": Politica(max_entries=256, memoria=16 * MB),
+    "especificacao_area_dupla": Politica(max_entries=256, memoria=16 * MB),
+    "especificacao_barras": Politica(max_entries=256, memoria=16 * MB),
+}
+
+
+def politica(rotulo):
+    """
+    Retorna a política registrada para o cache, ou PADRAO.
+
+    Parâmetros:
+    - rotulo: Rótulo do cache, como nas métricas.
+    """
+    return POLITICAS.get(rotulo, PADRAO)
+
+
+def tamanho(valor, _vistos=None):
+    """
+    Estima os bytes ocupados por um valor em cache.
+
+    Parâmetros:
+    - valor: DataFrame, Series, array, coleção ou objeto com atributos (os
+      índices de comum.particao e comum.busca, por exemplo).
+
+    Objetos repetidos dentro do valor são contados uma vez só.
+    """
+    vistos = set() if _vistos is None else _vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho(chave, vistos) + tamanho(item, vistos) for chave, item in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamanho(item, vistos) for item in valor)
+    atributos = getattr(valor, "__dict__", None)
+    if atributos is None and hasattr(valor, "__slots__"):
+        atributos = {nome: getattr(valor, nome) for nome in valor.__slots__ if hasattr(valor, nome)}
+    if atributos and not isinstance(valor, type):
+        return sys.getsizeof(valor) + sum(tamanho(item, vistos) for item in atributos.values())
+    return sys.getsizeof(valor)
+
+
+class Entradas:
+    """
+    Espelho das entradas de um cache, na ordem de uso, com o tamanho de cada uma.
+
+    Parâmetros:
+    - politica: Politica do cache.
+
+    Cada entrada guarda os argumentos da chamada, para que o cache possa ser
+    limpo só para ela (``funcao.clear(*args, **kwargs)`` do Streamlit).
+    """
+
+    def __init__(self, politica):
+        self.politica = politica
+        self.bytes = 0
+        # {chave: (argumentos, tamanho, momento do cálculo)}
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def _remover(self, chave):
+        argumentos, tamanho_item, _ = self._itens.pop(chave)
+        self.bytes -= tamanho_item
+        return argumentos
+
+    def expiradas(self):
+        """Retira as entradas vencidas pelo TTL e retorna ``[("ttl", argumentos)]``."""
+        if self.politica.ttl is None:
+            return []
+        limite = time.monotonic() - self.politica.ttl
+        with self._trava:
+            vencidas = [chave for chave, (_, _, calculo) in self._itens.items() if calculo <= limite]
+            return [("ttl", self._remover(chave)) for chave in vencidas]
+
+    def usar(self, chave):
+        """
+        Marca a entrada como usada agora.
+
+        Parâmetros:
+        - chave: Chave da entrada, como em ``incluir``.
+        """
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+
+    def incluir(self, chave, argumentos, tamanho_item):
+        """
+        Registra uma entrada recém-calculada e retorna as que precisam sair.
+
+        Parâmetros:
+        - chave: Chave da entrada.
+        - argumentos: Tupla ``(args, kwargs)`` da chamada.
+        - tamanho_item: Bytes do valor calculado.
+
+        Retorna uma lista ``[(motivo, argumentos)]``, com motivo "max_entries"
+        ou "memoria", das entradas usadas há mais tempo. A entrada recém-calculada
+        nunca sai, mesmo que sozinha passe do orçamento.
+        """
+        removidas = []
+        with self._trava:
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (argumentos, tamanho_item, time.monotonic())
+            self.bytes += tamanho_item
+            maximo, memoria = self.politica.max_entries, self.politica.memoria
+            while maximo is not None and len(self._itens) > maximo:
+                removidas.append(("max_entries", self._remover(next(iter(self._itens)))))
+            while memoria is not None and self.bytes > memoria and len(self._itens) > 1:
+                removidas.append(("memoria", self._remover(next(iter(self._itens)))))
+        return removidas
+
+    def limpar(self):
+        """Esquece todas as entradas, como depois de um ``clear()`` do cache inteiro."""
+        with self._trava:
+            self._itens.clear()
+            self.bytes = 0
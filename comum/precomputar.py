@@ -0,0 +1,111 @@
+"""
+Pré-cálculo, fora do Streamlit, dos artefatos lidos pelas páginas.
+
+Para cada conjunto registrado em comum.cargas.CONJUNTOS:
+
+1. snapshot tipado: converte a planilha para o snapshot Parquet (ver
+   comum.snapshot), aplica o esquema e grava o resultado no cache em disco
+   (ver comum.cache_disco);
+2. cubos: monta os cubos de contagem mensais registrados em CUBOS (os mesmos
+   das páginas) e grava as suas células;
+3. séries: consolida as séries de SERIES por dia, semana e mês, para o
+   período todo e para cada ano, já no formato dos gráficos.
+
+Os artefatos ficam no cache em disco, com a versão do conteúdo de origem na
+chave: as páginas e a carga incremental procuram lá antes de calcular, então
+com tudo pré-calculado abrir uma página só lê arquivos pequenos e mapeados,
+qualquer que seja o volume das planilhas. Rodar de novo com as planilhas
+inalteradas só confere os arquivos. Rode de novo também depois de mudar o
+código dos cubos ou do esquema, que entram na chave.
+
+Uso: python -m comum.precomputar [--conjuntos ordens triagem ...]
+
+Pode ser agendado (cron, job do Databricks) na mesma pasta do app ou com
+``DASHS_CACHE_DISCO`` apontando para a pasta compartilhada pelas réplicas.
+"""
+import argparse
+import logging
+import sys
+import time
+
+import streamlit.logger
+
+# Fora do servidor, o Streamlit avisa a cada cache e a cada sessão que não há execução ativa
+streamlit.logger.set_log_level("error")
+
+from comum.cargas import CONJUNTOS, fonte, ler
+from comum.incremental import INCREMENTAIS, conjunto_incremental
+from comum.ordens import dimensoes_ordens
+from comum.particao import intervalo_ano, particao
+from comum.previsao import FREQUENCIAS, gravar_consolidado
+from comum.quantis import ESBOCOS
+
+logger = logging.getLogger(__name__)
+
+# Cubos mantidos pela carga incremental de cada conjunto, como usados pelas páginas
+CUBOS = {
+    "ordens": [dimensoes_ordens],
+    "triagem": list(ESBOCOS.values()),
+}
+# Séries dos gráficos: {conjunto: (coluna de data, colunas somadas)}
+SERIES = {
+    "backlog_hh": ("Data-base_iníc", ["y", "y_pred_original"]),
+}
+
+
+def _medir(nome, artefato, funcao, resumo):
+    # Executa funcao e imprime o tempo gasto com o resumo do resultado
+    inicio = time.perf_counter()
+    resultado = funcao()
+    print(f"{nome:<14} {artefato:<26} {time.perf_counter() - inicio:7.2f} s  {resumo(resultado)}", flush=True)
+    return resultado
+
+
+def precomputar(nome):
+    """
+    Gera os artefatos de um conjunto.
+
+    Parâmetros:
+    - nome: Nome do conjunto de dados, como registrado em CONJUNTOS.
+
+    Fontes sem versão estável (as SQL) não geram artefatos: as páginas não
+    teriam como reconhecê-los.
+    """
+    dados = _medir(nome, "snapshot tipado", lambda: ler(nome), lambda dados: f"{len(dados)} linhas")
+    if fonte().versao(nome) is None:
+        print(f"{'':<14} fonte sem versão estável: cubos e séries não são gravados")
+        return
+
+    if nome in INCREMENTAIS:
+        incremental = conjunto_incremental(nome)
+        for dimensoes in CUBOS.get(nome, []):
+            _medir(nome, f"cubo {dimensoes.__name__}", lambda: incremental.cubo(dimensoes), lambda cubo: f"{len(cubo.celulas())} células")
+
+    if nome in SERIES:
+        coluna_data, colunas = SERIES[nome]
+        # O período todo (nenhum ano escolhido) e cada ano com todos os meses, como no filtro de ano
+        periodos = [None, *(intervalo_ano(ano) for ano in particao(dados, coluna_data).anos())]
+        for rotulo, frequencia in FREQUENCIAS.items():
+            _medir(nome, f"séries {rotulo.lower()}", lambda: sum(
+                gravar_consolidado(dados, coluna_data, colunas, frequencia, {coluna_data: periodo}) for periodo in periodos
+            ), lambda total: f"{len(periodos)} séries, {total} períodos")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Pré-calcula os artefatos lidos pelos dashboards.")
+    parser.add_argument("--conjuntos", nargs="+", choices=list(CONJUNTOS), default=list(CONJUNTOS))
+    opcoes = parser.parse_args(argumentos)
+
+    falhas = 0
+    for nome in opcoes.conjuntos:
+        try:
+            precomputar(nome)
+        except Exception:
+            logger.exception("Falha ao pré-calcular %s", nome)
+            falhas += 1
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
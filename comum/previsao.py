@@ -0,0 +1,250 @@
+"""
+Métricas de qualidade das previsões.
+
+As métricas (MSE, RMSE, MAE, MAPE, R² e viés) são calculadas a partir de
+somas acumuláveis do erro de cada ponto: quantidade, soma do erro, do erro ao
+quadrado, do erro absoluto, do erro percentual e do real e seu quadrado. Como
+essas somas se acumulam, a mesma conta vale para a série inteira, para cada
+período e para janelas móveis (diferença de somas acumuladas), tudo numa
+única passada vetorizada. A avaliação de cada combinação de filtros fica em
+cache pela versão dos dados, assim como as séries consolidadas dos gráficos,
+que também podem ser pré-calculadas em disco (ver comum.precomputar).
+"""
+import numpy as np
+import pandas as pd
+
+from comum import cache_disco, telemetria
+from comum.filtros import filtros_ativos, posicoes
+
+METRICAS = ["MSE", "RMSE", "MAE", "MAPE", "R²", "Viés"]
+# Granularidades das séries consolidadas: {rótulo: frequência do pandas}
+FREQUENCIAS = {"Diária": "D", "Semanal": "W", "Mensal": "M"}
+# Consolidações disponíveis na avaliação; None avalia cada registro
+NIVEIS = {"Por registro": None, "Diário": "D", "Semanal": "W", "Mensal": "M"}
+# Período das janelas móveis quando cada registro é avaliado
+_PERIODO_REGISTROS = "M"
+
+
+def consolidar(data, coluna_data, colunas, frequencia="M"):
+    """
+    Soma várias colunas por período numa única passada, sobre um índice de períodos comum.
+
+    Parâmetros:
+    - data: DataFrame com a coluna de data e as colunas somadas.
+    - coluna_data: Coluna de data que define o período de cada registro.
+    - colunas: Colunas numéricas somadas.
+    - frequencia: "D", "W" ou "M" (ver FREQUENCIAS).
+
+    Retorna um DataFrame indexado pelo início de cada período, do primeiro ao
+    último com dados, com a soma de cada coluna e a coluna ``Registros``. As
+    lacunas ficam explícitas: um período sem registros tem Registros 0 e soma
+    NaN, e uma coluna sem nenhum valor no período também fica NaN (e não 0).
+    Registros sem data ficam de fora.
+    """
+    periodos = data[coluna_data].dt.to_period(frequencia).array
+    com_data = ~periodos.isna()
+    ordinais = periodos.asi8[com_data]
+    if not len(ordinais):
+        return pd.DataFrame(columns=[*colunas, "Registros"], index=pd.DatetimeIndex([], name=coluna_data), dtype=np.float64)
+
+    # Posição de cada registro no índice denso de períodos
+    primeiro = ordinais.min()
+    posicao = ordinais - primeiro
+    tamanho = int(posicao.max()) + 1
+    consolidado = {}
+    for coluna in colunas:
+        valores = data[coluna].to_numpy(dtype=np.float64, na_value=np.nan)[com_data]
+        preenchidos = ~np.isnan(valores)
+        soma = np.bincount(posicao[preenchidos], weights=valores[preenchidos], minlength=tamanho)
+        quantidade = np.bincount(posicao[preenchidos], minlength=tamanho)
+        consolidado[coluna] = np.where(quantidade > 0, soma, np.nan)
+    consolidado["Registros"] = np.bincount(posicao, minlength=tamanho)
+
+    indice = pd.period_range(pd.Period(ordinal=primeiro, freq=frequencia), periods=tamanho).to_timestamp()
+    return pd.DataFrame(consolidado, index=indice.rename(coluna_data))
+
+
+def _estatisticas(real, previsto):
+    # Somas acumuláveis de cada ponto, numa matriz (pontos × 8); pontos incompletos valem zero
+    valido = ~(np.isnan(real) | np.isnan(previsto))
+    real = np.where(valido, real, 0.0)
+    erro = np.where(valido, previsto, 0.0) - real
+    # O MAPE ignora os pontos com valor real zero
+    com_base = valido & (real != 0)
+    percentual = np.abs(erro) / np.where(com_base, np.abs(real), 1.0) * com_base
+    return np.column_stack([valido, erro, erro * erro, np.abs(erro), percentual, com_base, real, real * real]).astype(np.float64)
+
+
+def _metricas(somas):
+    # Métricas a partir das somas; a última dimensão são as 8 somas de _estatisticas
+    pontos, erro, quadrado, absoluto, percentual, com_base, real, real_quadrado = np.moveaxis(somas, -1, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mse = quadrado / pontos
+        total = real_quadrado - real * real / pontos
+        return np.stack(
+            [
+                mse,
+                np.sqrt(mse),
+                absoluto / pontos,
+                percentual / com_base * 100,
+                np.where(total > 0, 1 - quadrado / total, np.nan),
+                erro / pontos,
+            ],
+            axis=-1,
+        )
+
+
+def avaliar(real, previsto):
+    """
+    Retorna as métricas de uma série de previsões.
+
+    Parâmetros:
+    - real: Valores observados.
+    - previsto: Valores previstos, alinhados com os observados.
+
+    Pontos com algum valor nulo são ignorados. O MAPE é dado em % e ignora os
+    pontos com valor real zero; o viés é a média de (previsto - real).
+    """
+    estatisticas = _estatisticas(np.asarray(real, dtype=np.float64), np.asarray(previsto, dtype=np.float64))
+    return pd.Series(_metricas(estatisticas.sum(axis=0)), index=METRICAS)
+
+
+def avaliar_movel(estatisticas, janela):
+    """
+    Retorna as métricas de cada janela móvel de períodos consecutivos.
+
+    Parâmetros:
+    - estatisticas: DataFrame (períodos × 8) com as somas de cada período, como
+      o "periodos" retornado por ``avaliacao``.
+    - janela: Número de períodos de cada janela.
+
+    A linha de cada período avalia a janela que termina nele; as primeiras
+    ``janela - 1`` linhas ficam de fora.
+    """
+    acumulado = np.vstack([np.zeros((1, estatisticas.shape[1])), np.cumsum(estatisticas.to_numpy(), axis=0)])
+    somas = acumulado[janela:] - acumulado[:-janela]
+    return pd.DataFrame(_metricas(somas), index=estatisticas.index[janela - 1:], columns=METRICAS)
+
+
+def avaliacao(data, real, previsto, coluna_data, nivel=None, janela=3):
+    """
+    Avalia as previsões de um DataFrame.
+
+    Parâmetros:
+    - data: DataFrame com os valores observados, previstos e a data de cada registro.
+    - real, previsto: Colunas dos valores observados e previstos.
+    - coluna_data: Coluna de data usada nas consolidações e nas janelas.
+    - nivel: Frequência de consolidação ("D", "W" ou "M"), somando real e
+      previsto por período (ver ``consolidar``) antes de avaliar; None avalia
+      cada registro.
+    - janela: Número de períodos das janelas móveis. Avaliando cada registro,
+      os períodos são meses. As janelas seguem o calendário: períodos sem
+      dados contam na janela, mas não entram nas métricas.
+
+    Retorna um dicionário com:
+    - "geral": métricas da série inteira;
+    - "movel": métricas de cada janela móvel, indexadas pelo último período;
+    - "periodos": somas de cada período, que podem ser reaproveitadas.
+    """
+    if nivel is None:
+        estatisticas = _estatisticas(
+            data[real].to_numpy(dtype=np.float64, na_value=np.nan),
+            data[previsto].to_numpy(dtype=np.float64, na_value=np.nan),
+        )
+        geral = estatisticas.sum(axis=0)
+        # As somas de cada registro se acumulam por mês; registros sem data só entram no geral
+        colunas = list(range(estatisticas.shape[1]))
+        somas = pd.DataFrame(estatisticas).assign(**{coluna_data: data[coluna_data].to_numpy()})
+        por_periodo = consolidar(somas, coluna_data, colunas, _PERIODO_REGISTROS)[colunas].fillna(0.0)
+    else:
+        consolidado = consolidar(data, coluna_data, [real, previsto], nivel)
+        # Períodos sem valor (lacunas) entram como pontos inválidos, com somas zero
+        por_periodo = pd.DataFrame(
+            _estatisticas(consolidado[real].to_numpy(), consolidado[previsto].to_numpy()),
+            index=consolidado.index,
+        )
+        geral = por_periodo.to_numpy().sum(axis=0)
+    return {
+        "geral": pd.Series(_metricas(geral), index=METRICAS),
+        "movel": avaliar_movel(por_periodo, janela),
+        "periodos": por_periodo,
+    }
+
+
+def _chave_consolidado(versao, filtros, coluna_data, colunas, frequencia):
+    return cache_disco.chave("consolidacao", versao, filtros, coluna_data, tuple(colunas), frequencia)
+
+
+@telemetria.cache_data("consolidacao", show_spinner=False)
+def _consolidado_em_cache(versao, linhas, filtros, coluna_data, colunas, frequencia, _data):
+    # Série gravada por comum.precomputar para a mesma versão e os mesmos filtros, se houver
+    gravado = cache_disco.ler(_chave_consolidado(versao, filtros, coluna_data, colunas, frequencia))
+    if gravado is not None:
+        return gravado.set_index(coluna_data)
+    selecionadas = posicoes(_data, dict(filtros))
+    data = _data if selecionadas is None else _data.take(selecionadas)
+    return consolidar(data, coluna_data, list(colunas), frequencia)
+
+
+def consolidado(data, coluna_data, colunas, frequencia="M", filtros=None):
+    """
+    Retorna a consolidação (ver ``consolidar``) das linhas que atendem aos filtros.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - coluna_data, colunas, frequencia: Como em ``consolidar``.
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados.
+
+    O resultado fica em cache pela versão dos dados e pelos filtros. Se a série
+    já foi gravada por ``gravar_consolidado``, ela é lida do disco.
+    """
+    versao = data.attrs.get("versao")
+    if versao is None:
+        selecionadas = posicoes(data, filtros or {})
+        return consolidar(data if selecionadas is None else data.take(selecionadas), coluna_data, colunas, frequencia)
+    return _consolidado_em_cache(versao, len(data), filtros_ativos(filtros or {}), coluna_data, tuple(colunas), frequencia, data)
+
+
+def gravar_consolidado(data, coluna_data, colunas, frequencia="M", filtros=None):
+    """
+    Grava no cache em disco a série de ``consolidado``, para as páginas só lerem o arquivo.
+
+    Parâmetros:
+    - data, coluna_data, colunas, frequencia, filtros: Como em ``consolidado``.
+
+    Usado por comum.precomputar; retorna o número de períodos da série.
+    """
+    ativos = filtros_ativos(filtros or {})
+    selecionadas = posicoes(data, dict(ativos))
+    serie = consolidar(data if selecionadas is None else data.take(selecionadas), coluna_data, list(colunas), frequencia)
+    # Sem índice: os arquivos do cache em disco guardam só as colunas
+    cache_disco.gravar(_chave_consolidado(data.attrs["versao"], ativos, coluna_data, colunas, frequencia), serie.reset_index())
+    return len(serie)
+
+
+@telemetria.cache_data("metricas_previsao", show_spinner=False)
+def _avaliacao_em_cache(versao, linhas, filtros, real, previsto, coluna_data, nivel, janela, _data):
+    selecionadas = posicoes(_data, dict(filtros))
+    data = _data if selecionadas is None else _data.take(selecionadas)
+    return avaliacao(data, real, previsto, coluna_data, nivel, janela)
+
+
+def avaliacao_filtrada(data, real, previsto, coluna_data, filtros=None, nivel=None, janela=3):
+    """
+    Retorna a avaliação (ver ``avaliacao``) das linhas que atendem aos filtros.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - real, previsto, coluna_data, nivel, janela: Como em ``avaliacao``.
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados.
+
+    O resultado fica em cache pela versão dos dados, pelos filtros e pela
+    consolidação, então cada nova execução da página só lê o cache.
+    """
+    versao = data.attrs.get("versao")
+    if versao is None:
+        selecionadas = posicoes(data, filtros or {})
+        return avaliacao(data if selecionadas is None else data.take(selecionadas), real, previsto, coluna_data, nivel, janela)
+    return _avaliacao_em_cache(
+        versao, len(data), filtros_ativos(filtros or {}), real, previsto, coluna_data, nivel, janela, data
+    )
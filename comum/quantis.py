@@ -0,0 +1,118 @@
+"""
+Percentis aproximados e combináveis dos tempos de triagem.
+
+Cada duração vai para um bucket logarítmico, como no DDSketch: o bucket ``i``
+cobre o intervalo (γ^(i-1), γ^i], com γ = (1 + ALFA) / (1 - ALFA), e o valor
+representativo de qualquer bucket tem erro relativo de no máximo ALFA.
+Durações zero ficam num bucket próprio. Como os buckets são fixos, o esboço de
+um grupo de notas é apenas a contagem por bucket, e juntar esboços é somar
+contagens.
+
+Por isso o bucket entra como mais uma dimensão de um cubo de contagens
+(mês de criação × Empresa × Disciplina × Centro de Trabalho × bucket, ver
+comum.cubo):
+os percentis de qualquer combinação de filtros saem da soma de uma fatia do
+cubo, com custo que depende do número de buckets e não do número de notas. Os
+cubos são mantidos pela carga incremental (ver comum.incremental), que soma
+só as notas novas ou alteradas.
+"""
+import numpy as np
+
+from comum.incremental import conjunto_incremental
+from comum.triagem import ETAPAS, duracoes
+
+ALFA = 0.05
+GAMMA = (1 + ALFA) / (1 - ALFA)
+# Rótulo do bucket das durações zero; o valor representativo calculado a partir dele é 0
+ZERO = -np.inf
+
+_ETAPA = {nome: posicao for posicao, (nome, _, _) in enumerate(ETAPAS)}
+
+
+def buckets(valores):
+    """
+    Retorna o índice do bucket de cada valor (float, com ZERO para zeros e NaN para nulos).
+
+    Parâmetros:
+    - valores: Durações não negativas.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    indices = np.full(len(valores), np.nan)
+    positivos = valores > 0
+    indices[positivos] = np.ceil(np.log(valores[positivos]) / np.log(GAMMA))
+    indices[valores == 0] = ZERO
+    return indices
+
+
+def valores(indices):
+    """
+    Retorna o valor representativo de cada bucket.
+
+    Parâmetros:
+    - indices: Índices de bucket, como os de ``buckets``.
+    """
+    return 2 * GAMMA ** np.asarray(indices, dtype=np.float64) / (GAMMA + 1)
+
+
+def quantis(contagens, probabilidades):
+    """
+    Retorna os quantis de um esboço.
+
+    Parâmetros:
+    - contagens: pd.Series {índice do bucket: contagem}, como a retornada por Cubo.serie.
+    - probabilidades: Lista de probabilidades entre 0 e 1 (0.5 para a mediana).
+
+    Sem nenhuma nota, todos os quantis são NaN.
+    """
+    contagens = contagens[contagens > 0].sort_index()
+    if contagens.empty:
+        return np.full(len(probabilidades), np.nan)
+    acumulado = np.cumsum(contagens.to_numpy())
+    # Posição do quantil entre as notas ordenadas, como no DDSketch: q * (n - 1)
+    posicoes = np.searchsorted(acumulado, np.asarray(probabilidades) * (acumulado[-1] - 1), side="right")
+    return valores(contagens.index.to_numpy(dtype=np.float64)[posicoes])
+
+
+def _dimensoes(dados, etapa):
+    # Mês de criação da nota (o mesmo do filtro de ano), os filtros da página e o bucket da duração
+    dias = duracoes(dados)[:, _ETAPA[etapa]]
+    return (
+        {
+            "Mes_Ano": dados["Data_de_criação"].dt.to_period("M").dt.to_timestamp(),
+            "Empresa": dados["Empresa"],
+            "Disciplina": dados["Disciplina"],
+            "Centro_de_Trabalho": dados["Centro_de_Trabalho"],
+            "Bucket": buckets(dias),
+        },
+        ~np.isnan(dias),
+    )
+
+
+def esboco_mspn_mspr(dados):
+    # Dimensões do cubo de esboços da etapa MSPN → MSPR (o nome da função identifica o cubo)
+    return _dimensoes(dados, "MSPN → MSPR")
+
+
+def esboco_mspr_orda(dados):
+    # Dimensões do cubo de esboços da etapa MSPR → ORDA
+    return _dimensoes(dados, "MSPR → ORDA")
+
+
+ESBOCOS = {"MSPN → MSPR": esboco_mspn_mspr, "MSPR → ORDA": esboco_mspr_orda}
+
+
+def percentis_triagem(etapa, filtros=None, probabilidades=(0.5, 0.9, 0.99)):
+    """
+    Retorna os percentis, em dias, de uma etapa da triagem para os filtros.
+
+    Parâmetros:
+    - etapa: Uma das chaves de ESBOCOS ("MSPN → MSPR" ou "MSPR → ORDA").
+    - filtros: Dicionário {dimensão: valor ou lista de valores} sobre Mes_Ano,
+      Empresa, Disciplina e Centro_de_Trabalho; valores None são ignorados.
+    - probabilidades: Quantis desejados.
+
+    Retorna um array com um valor por probabilidade, com erro relativo de no
+    máximo ALFA.
+    """
+    cubo = conjunto_incremental("triagem").cubo(ESBOCOS[etapa])
+    return quantis(cubo.serie("Bucket", filtros), probabilidades)
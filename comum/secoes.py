@@ -0,0 +1,84 @@
+"""
+Execução das seções dos dashboards como fragmentos independentes.
+
+Cada seção roda num fragmento nomeado e declara, com o decorador ``secao``,
+quais chaves do ``st.session_state`` ela lê. Quando um filtro da barra lateral
+muda, o callback do widget reexecuta apenas os fragmentos que dependem dele;
+as demais seções (métricas gerais, tabelas) não são recalculadas nem reenviadas.
+"""
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from comum import perfil, telemetria
+
+# Mapa {página: {chave do widget: [fragmentos que dependem dela]}} da última execução completa
+_DEPENDENTES = "_secoes_dependentes"
+
+
+def _pagina():
+    # Página em execução; os fragmentos de uma página não existem nas outras
+    contexto = get_script_run_ctx()
+    return None if contexto is None else contexto.page_script_hash
+
+
+def secao(*depende_de):
+    """
+    Declara de quais chaves do st.session_state a seção depende.
+
+    Parâmetros:
+    - depende_de: Chaves dos widgets lidos pela seção (por exemplo, "filtro1").
+    """
+    def decorar(funcao):
+        funcao.depende_de = depende_de
+        return funcao
+    return decorar
+
+
+def reiniciar_dependencias():
+    # Chamado pelo app.py a cada execução completa, antes de as seções se registrarem
+    st.session_state[_DEPENDENTES] = {}
+
+
+def rerun_dependentes(chave):
+    """
+    Callback de widget: reexecuta só as seções que dependem da chave alterada.
+
+    Parâmetros:
+    - chave: Chave do widget no st.session_state.
+
+    Só são considerados os fragmentos registrados pela página atual na última
+    execução completa. Se nenhum deles depender da chave, a página inteira é
+    reexecutada, como em qualquer widget.
+    """
+    alvos = st.session_state.get(_DEPENDENTES, {}).get(_pagina(), {}).get(chave)
+    if alvos:
+        st.rerun(alvos + perfil.fragmentos_extras())
+
+
+def Executar_Secao(funcao, *args, **kwargs):
+    """
+    Executa uma seção dentro de um fragmento nomeado com o nome da função.
+
+    Parâmetros:
+    - funcao: Função da seção, opcionalmente decorada com ``secao``.
+    - args, kwargs: Argumentos repassados para a seção; o fragmento os reutiliza
+      quando for reexecutado isoladamente.
+
+    Com a medição de desempenho ligada (ver comum.perfil), a seção é medida.
+    """
+    nome = funcao.__name__
+    dependentes = st.session_state.setdefault(_DEPENDENTES, {}).setdefault(_pagina(), {})
+    for chave in getattr(funcao, "depende_de", ()):
+        alvos = dependentes.setdefault(chave, [])
+        if nome not in alvos:
+            alvos.append(nome)
+
+    def executar(*args, **kwargs):
+        # A medição é decidida a cada execução, inclusive nas reexecuções do fragmento
+        with telemetria.medir_fragmento():
+            if perfil.ativo():
+                perfil.medir_secao(nome, funcao, args, kwargs)
+            else:
+                funcao(*args, **kwargs)
+
+    st.fragment(executar, key=nome)(*args, **kwargs)
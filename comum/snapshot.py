@@ -0,0 +1,179 @@
+"""
+Snapshots colunares das planilhas usadas pelos dashboards.
+
+A primeira leitura de cada planilha converte o arquivo para Parquet na pasta
+``.snapshots/``. As leituras seguintes vêm desse arquivo enquanto a planilha
+de origem não mudar: o mtime e o tamanho são conferidos a cada leitura e, se
+mudarem, o hash do conteúdo decide se o snapshot precisa ser refeito.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PASTA_SNAPSHOTS = Path(os.environ.get("DASHS_SNAPSHOTS", ".snapshots"))
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _caminhos(origem, parametros):
+    # Um snapshot por planilha e por conjunto de parâmetros de leitura
+    chave = hashlib.sha1(f"{origem.resolve()}|{parametros}".encode()).hexdigest()[:12]
+    base = PASTA_SNAPSHOTS / f"{origem.stem}-{chave}"
+    return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+
+def _ler_meta(caminho):
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_atomico(caminho, escrever):
+    # Grava num temporário e renomeia, para que outro processo nunca leia um arquivo pela metade
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if temporario.exists():
+            temporario.unlink()
+
+
+def _gravar_meta(caminho, estado, sha256):
+    meta = {"mtime_ns": estado.st_mtime_ns, "tamanho": estado.st_size, "sha256": sha256}
+
+    def escrever(temporario):
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(meta, arquivo)
+
+    _gravar_atomico(caminho, escrever)
+
+
+def _normalizar_colunas(dados):
+    # Parquet exige um único tipo por coluna: colunas com tipos misturados viram texto
+    for coluna in dados.columns:
+        if dados[coluna].dtype == object:
+            tipo = pd.api.types.infer_dtype(dados[coluna], skipna=True)
+            if tipo.startswith("mixed"):
+                dados[coluna] = dados[coluna].where(dados[coluna].isna(), dados[coluna].astype(str))
+    return dados
+
+
+def _atualizar(caminho, kwargs):
+    # Retorna (arquivo, sha256, dados); dados só vem preenchido quando a planilha foi relida
+    origem = Path(caminho)
+    parametros = json.dumps(kwargs, sort_keys=True, default=str)
+    arquivo, arquivo_meta = _caminhos(origem, parametros)
+    estado = origem.stat()
+    meta = _ler_meta(arquivo_meta)
+
+    if meta and arquivo.exists():
+        if meta["mtime_ns"] == estado.st_mtime_ns and meta["tamanho"] == estado.st_size:
+            return arquivo, meta["sha256"], None
+        # O mtime mudou: só reconverte se o conteúdo também mudou
+        sha256 = _hash_arquivo(origem)
+        if meta["sha256"] == sha256:
+            _gravar_meta(arquivo_meta, estado, sha256)
+            return arquivo, sha256, None
+    else:
+        sha256 = _hash_arquivo(origem)
+
+    dados = _normalizar_colunas(pd.read_excel(origem, **kwargs))
+    try:
+        _gravar_atomico(arquivo, lambda temporario: dados.to_parquet(temporario, index=False))
+        _gravar_meta(arquivo_meta, estado, sha256)
+    except OSError:
+        logger.warning("Não foi possível gravar o snapshot de %s", origem, exc_info=True)
+        return None, sha256, dados
+    return arquivo, sha256, dados
+
+
+def snapshot_atualizado(caminho, **kwargs):
+    """
+    Indica se o snapshot da planilha existe e corresponde ao mtime e ao tamanho atuais.
+
+    Parâmetros:
+    - caminho: Caminho da planilha de origem.
+    - kwargs: Parâmetros repassados para ``pd.read_excel``.
+
+    É só uma consulta rápida ao metadado: não calcula hash nem lê a planilha.
+    """
+    return versao_snapshot(caminho, **kwargs) is not None
+
+
+def versao_snapshot(caminho, **kwargs):
+    """
+    Retorna o hash da planilha registrado no snapshot, se ele estiver atualizado.
+
+    Parâmetros:
+    - caminho: Caminho da planilha de origem.
+    - kwargs: Parâmetros repassados para ``pd.read_excel``.
+
+    Como em ``snapshot_atualizado``, só o metadado é consultado; sem snapshot,
+    ou com a planilha alterada desde que ele foi gerado, retorna None.
+    """
+    origem = Path(caminho)
+    arquivo, arquivo_meta = _caminhos(origem, json.dumps(kwargs, sort_keys=True, default=str))
+    meta = _ler_meta(arquivo_meta)
+    if not meta or not arquivo.exists():
+        return None
+    estado = origem.stat()
+    if meta["mtime_ns"] != estado.st_mtime_ns or meta["tamanho"] != estado.st_size:
+        return None
+    return meta["sha256"]
+
+
+def garantir_snapshot(caminho, **kwargs):
+    """
+    Garante que o snapshot Parquet da planilha está atualizado.
+
+    Parâmetros:
+    - caminho: Caminho da planilha de origem.
+    - kwargs: Parâmetros repassados para ``pd.read_excel``.
+
+    Retorna uma tupla ``(arquivo, sha256)`` com o caminho do snapshot e o hash
+    do conteúdo da planilha que o gerou. Se o snapshot não puder ser gravado
+    (pasta somente leitura, por exemplo), o arquivo retornado é ``None``.
+    """
+    arquivo, sha256, _ = _atualizar(caminho, kwargs)
+    return arquivo, sha256
+
+
+def ler_excel(caminho, **kwargs):
+    """
+    Lê uma planilha a partir do seu snapshot Parquet, criando-o se necessário.
+
+    Parâmetros:
+    - caminho: Caminho da planilha de origem.
+    - kwargs: Parâmetros repassados para ``pd.read_excel``.
+
+    O hash da planilha fica em ``dados.attrs["versao"]``.
+    """
+    arquivo, sha256, dados = _atualizar(caminho, kwargs)
+    if dados is None:
+        dados = pd.read_parquet(arquivo)
+    # A versão identifica o snapshot para os caches derivados (cubos, filtros...)
+    dados.attrs["versao"] = sha256
+    return dados
+
+
+if __name__ == "__main__":
+    # Uso: python -m comum.snapshot planilha.xlsx [parâmetros do read_excel em JSON]
+    import sys
+
+    garantir_snapshot(sys.argv[1], **(json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}))
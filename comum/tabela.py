@@ -0,0 +1,106 @@
+"""
+Tabela paginada no servidor.
+
+Em vez de serializar o DataFrame inteiro a cada execução, a tabela aplica os
+filtros, a ordenação e a projeção de colunas sobre os dados em cache e envia ao
+navegador apenas a página visível. A ordem das linhas fica em cache por versão
+do snapshot, filtros e coluna de ordenação, então trocar de página custa apenas
+um fatiamento.
+"""
+import numpy as np
+import streamlit as st
+
+from comum import telemetria
+from comum.busca import Busca
+from comum.filtros import filtros_ativos, posicoes
+from comum.perfil import etapa, registrar_envio
+
+TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+
+def _ordenar(data, selecionadas, coluna, decrescente):
+    serie = data[coluna] if selecionadas is None else data[coluna].take(selecionadas)
+    # Posições relativas à seleção; nulos sempre no fim, empates mantêm a ordem original
+    ordem = serie.reset_index(drop=True).sort_values(
+        ascending=not decrescente, kind="stable", na_position="last"
+    ).index.to_numpy()
+    return ordem if selecionadas is None else selecionadas[ordem]
+
+
+@telemetria.cache_data("ordem_tabela", show_spinner=False)
+def _ordem_em_cache(versao, linhas, filtros, coluna, decrescente, _data):
+    return _ordenar(_data, posicoes(_data, dict(filtros)), coluna, decrescente)
+
+
+def _ordem(data, filtros, coluna, decrescente):
+    ativos = filtros_ativos(filtros)
+    versao = data.attrs.get("versao")
+    if versao is None:
+        return _ordenar(data, posicoes(data, filtros), coluna, decrescente)
+    return _ordem_em_cache(versao, len(data), ativos, coluna, decrescente, data)
+
+
+def Tabela_Paginada(data, colunas, chave, filtros=None, ordenar_por=None, busca=None):
+    """
+    Exibe uma tabela paginada, enviando ao navegador só as linhas da página atual.
+
+    Parâmetros:
+    - data: DataFrame completo, como retornado pelo load_data da página.
+    - colunas: Colunas exibidas (as demais nunca são serializadas).
+    - chave: Prefixo das chaves dos widgets no st.session_state.
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados.
+    - ordenar_por: Coluna de ordenação inicial. Se omitida, mantém a ordem dos dados.
+    - busca: Coluna de texto pesquisável pela caixa de busca (ver comum.busca).
+      Se omitida, a tabela não tem caixa de busca.
+
+    Chame dentro de uma seção (ver comum.secoes) para que trocar de página
+    reexecute só o fragmento da tabela.
+    """
+    filtros = filtros or {}
+    if busca is not None:
+        # Combinada com os filtros da página; cada termo é buscado como prefixo
+        texto = st.text_input(
+            f"Buscar em {busca}",
+            key=f"{chave}_busca",
+            placeholder="Digite parte do texto...",
+        ).strip()
+        filtros = {**filtros, busca: Busca(texto) if texto else None}
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+    opcoes = [None] + list(colunas)
+    coluna = col1.selectbox(
+        "Ordenar por",
+        opcoes,
+        index=opcoes.index(ordenar_por) if ordenar_por in opcoes else 0,
+        format_func=lambda opcao: "Ordem original" if opcao is None else opcao,
+        key=f"{chave}_ordenar",
+    )
+    decrescente = col2.toggle("Decrescente", key=f"{chave}_decrescente", disabled=coluna is None)
+    tamanho = col3.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1, key=f"{chave}_tamanho")
+
+    if coluna is None:
+        ordem = posicoes(data, filtros)
+        if ordem is None:
+            ordem = np.arange(len(data))
+    else:
+        with etapa("ordenacao"):
+            ordem = _ordem(data, filtros, coluna, decrescente)
+
+    total = len(ordem)
+    paginas = max(1, -(-total // tamanho))
+    # Filtros mais restritivos podem deixar a página guardada fora do intervalo
+    chave_pagina = f"{chave}_pagina"
+    if st.session_state.get(chave_pagina, 1) > paginas:
+        st.session_state[chave_pagina] = paginas
+    pagina = col4.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, total)
+    # Recorta as linhas antes de projetar as colunas: só a janela é copiada
+    janela = data.take(ordem[inicio:fim])[colunas]
+    # O Arrow serializa o dicionário inteiro das categorias; só as da página seguem
+    for coluna in janela.select_dtypes("category").columns:
+        janela[coluna] = janela[coluna].cat.remove_unused_categories()
+    registrar_envio(janela)
+    with etapa("tabela"):
+        st.dataframe(janela, hide_index=True, width="stretch")
+    st.caption(f"Linhas {inicio + 1 if total else 0}–{fim} de {total} · página {pagina} de {paginas}")
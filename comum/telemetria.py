@@ -0,0 +1,441 @@
+"""
+Métricas de produção do app no formato de texto do Prometheus.
+
+As métricas são coletadas sempre (contadores em memória, baratos) e exportadas
+só quando configurado:
+
+- ``DASHS_METRICAS_PORTA``: serve ``/metrics`` nessa porta, numa thread do
+  próprio servidor do Streamlit, no endereço ``DASHS_METRICAS_ENDERECO``
+  (padrão 127.0.0.1, só a própria máquina; use 0.0.0.0 para expor em todas
+  as interfaces). Se a porta já estiver ocupada (outro processo do app na
+  mesma máquina), o app segue sem servir as métricas;
+- ``DASHS_METRICAS_ARQUIVO``: grava o mesmo texto nesse arquivo a cada
+  ``DASHS_METRICAS_INTERVALO`` segundos (padrão 15), para o textfile
+  collector do node_exporter.
+
+Métricas exportadas:
+
+- ``dashs_execucao_segundos{pagina,tipo}``: duração das execuções completas
+  do script e de cada fragmento reexecutado sozinho, por página;
+- ``dashs_cache_{acertos,faltas,descartes}_total{cache}``: uso dos caches
+  declarados com ``cache_data`` e ``cache_resource`` deste módulo e do cache
+  em disco (rótulos terminados em ``_disco``, ver comum.cache_disco);
+- ``dashs_cache_remocoes_total{cache,motivo}`` e ``dashs_cache_bytes{cache}``:
+  entradas retiradas pela política de cada cache e memória ocupada (ver
+  comum.politica_cache);
+- ``dashs_carga_segundos{conjunto,tipo}`` e ``dashs_conjunto_bytes{conjunto}``:
+  tempo de carga e memória de cada conjunto de dados;
+- ``dashs_bytes_enviados_total{pagina}``: bytes Arrow dos gráficos e tabelas;
+- ``dashs_exportacao_segundos{formato}``: tempo de geração dos arquivos da
+  aba "Baixar dados" (ver comum.exportar);
+- ``dashs_sessoes_ativas`` e ``dashs_memoria_rss_bytes``.
+"""
+import bisect
+import contextlib
+import functools
+import inspect
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from comum import politica_cache
+
+logger = logging.getLogger(__name__)
+
+PORTA = os.environ.get("DASHS_METRICAS_PORTA")
+ENDERECO = os.environ.get("DASHS_METRICAS_ENDERECO", "127.0.0.1")
+ARQUIVO = os.environ.get("DASHS_METRICAS_ARQUIVO")
+INTERVALO = float(os.environ.get("DASHS_METRICAS_INTERVALO", 15))
+# Sessões que executaram o script nesta janela contam como ativas
+JANELA_SESSAO = 300
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor):
+    # Inteiros sem notação científica; os demais com precisão completa
+    valor = float(valor)
+    return str(int(valor)) if valor.is_integer() else repr(valor)
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)) + "}"
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+        self._valores = {}
+        _METRICAS.append(self)
+
+    def _chave(self, rotulos):
+        return tuple(rotulos[nome] for nome in self.rotulos)
+
+    def texto(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._trava:
+            for chave, valor in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}")
+        return linhas
+
+
+class Contador(_Metrica):
+    """
+    Contador monotônico com rótulos.
+
+    Parâmetros:
+    - nome: Nome da métrica no Prometheus (terminado em ``_total``).
+    - ajuda: Descrição exibida em ``# HELP``.
+    - rotulos: Nomes dos rótulos aceitos por ``inc``.
+    """
+    tipo = "counter"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+
+class Medidor(_Metrica):
+    """
+    Valor instantâneo com rótulos, definido diretamente ou lido de uma função na coleta.
+
+    Parâmetros:
+    - nome, ajuda, rotulos: Como em Contador.
+    - funcao: Se informada, chamada a cada coleta; retorna o valor (sem rótulos).
+    """
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None):
+        super().__init__(nome, ajuda, rotulos)
+        self._funcao = funcao
+
+    def definir(self, valor, **rotulos):
+        with self._trava:
+            self._valores[self._chave(rotulos)] = valor
+
+    def texto(self):
+        if self._funcao is not None:
+            self.definir(self._funcao())
+        return super().texto()
+
+
+class Histograma(_Metrica):
+    """
+    Histograma cumulativo com rótulos, como o do cliente oficial do Prometheus.
+
+    Parâmetros:
+    - nome, ajuda, rotulos: Como em Contador.
+    - limites: Limites superiores dos buckets, em ordem crescente.
+    """
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_SEGUNDOS):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(limites)
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            contagens, soma = self._valores.get(chave, ([0] * (len(self.limites) + 1), 0.0))
+            contagens[bisect.bisect_left(self.limites, valor)] += 1
+            self._valores[chave] = (contagens, soma + valor)
+
+    def texto(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        nomes = self.rotulos + ("le",)
+        with self._trava:
+            for chave, (contagens, soma) in sorted(self._valores.items()):
+                acumulado = 0
+                for limite, contagem in zip(self.limites + (float("inf"),), contagens):
+                    acumulado += contagem
+                    le = "+Inf" if limite == float("inf") else f"{limite:g}"
+                    linhas.append(f"{self.nome}_bucket{_rotulos(nomes, chave + (le,))} {acumulado}")
+                linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(soma)}")
+                linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {acumulado}")
+        return linhas
+
+
+_METRICAS = []
+# Chave do st.session_state com a página aberta, que as reexecuções de fragmentos não recebem
+_PAGINA = "_telemetria_pagina"
+_sessoes = {}
+_trava_sessoes = threading.Lock()
+
+
+def _memoria_rss():
+    # RSS atual pelo /proc no Linux; nos demais sistemas, o pico do processo
+    try:
+        paginas = int(Path("/proc/self/statm").read_text().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if sys.platform == "darwin" else pico * 1024
+
+
+def _sessoes_ativas():
+    limite = time.monotonic() - JANELA_SESSAO
+    with _trava_sessoes:
+        for sessao in [sessao for sessao, visto in _sessoes.items() if visto < limite]:
+            del _sessoes[sessao]
+        return len(_sessoes)
+
+
+EXECUCOES = Histograma(
+    "dashs_execucao_segundos", "Duração das execuções completas do script e dos fragmentos reexecutados sozinhos.", ("pagina", "tipo")
+)
+CACHE_ACERTOS = Contador("dashs_cache_acertos_total", "Chamadas respondidas pelo cache.", ("cache",))
+CACHE_FALTAS = Contador("dashs_cache_faltas_total", "Chamadas que calcularam o valor.", ("cache",))
+CACHE_DESCARTES = Contador(
+    "dashs_cache_descartes_total", "Faltas de argumentos já calculados antes (descartados por max_entries, ttl ou clear).", ("cache",)
+)
+CACHE_REMOCOES = Contador(
+    "dashs_cache_remocoes_total", "Entradas retiradas do cache pela política (ttl, max_entries ou memoria).", ("cache", "motivo")
+)
+CACHE_BYTES = Medidor("dashs_cache_bytes", "Memória estimada das entradas guardadas em cada cache.", ("cache",))
+CARGAS = Histograma("dashs_carga_segundos", "Tempo de leitura de um conjunto de dados, com o esquema aplicado.", ("conjunto", "tipo"))
+CONJUNTO_BYTES = Medidor("dashs_conjunto_bytes", "Memória do último DataFrame carregado de cada conjunto.", ("conjunto",))
+BYTES_ENVIADOS = Contador("dashs_bytes_enviados_total", "Bytes Arrow dos dados de gráficos e tabelas enviados ao navegador.", ("pagina",))
+EXPORTACOES = Histograma("dashs_exportacao_segundos", "Tempo de geração de um arquivo da aba Baixar dados.", ("formato",))
+SESSOES = Medidor("dashs_sessoes_ativas", f"Sessões que executaram o script nos últimos {JANELA_SESSAO} s.", funcao=_sessoes_ativas)
+MEMORIA = Medidor("dashs_memoria_rss_bytes", "Memória residente do processo do servidor.", funcao=_memoria_rss)
+
+
+def exportando():
+    """Indica se as métricas são exportadas (porta ou arquivo configurados)."""
+    return bool(PORTA or ARQUIVO)
+
+
+def texto():
+    """Retorna todas as métricas no formato de texto do Prometheus."""
+    linhas = []
+    for metrica in _METRICAS:
+        linhas.extend(metrica.texto())
+    return "\n".join(linhas) + "\n"
+
+
+def pagina_atual():
+    """Retorna o título da página aberta na sessão (vazio fora do app.py)."""
+    return st.session_state.get(_PAGINA, "")
+
+
+def registrar_execucao(pagina):
+    """
+    Registra a página aberta pela sessão; chamado pelo app.py a cada execução completa.
+
+    Parâmetros:
+    - pagina: Título da página, usado como rótulo ``pagina`` das métricas.
+
+    A sessão conta como ativa até JANELA_SESSAO segundos sem executar o script.
+    """
+    st.session_state[_PAGINA] = pagina
+    contexto = get_script_run_ctx()
+    if contexto is not None:
+        with _trava_sessoes:
+            _sessoes[contexto.session_id] = time.monotonic()
+
+
+@contextlib.contextmanager
+def medir_execucao(pagina, tipo="completa"):
+    """
+    Mede uma execução do script ou de um fragmento.
+
+    Parâmetros:
+    - pagina: Título da página.
+    - tipo: "completa" ou "fragmento".
+
+    Execuções interrompidas por st.rerun ou st.stop também são contadas.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        EXECUCOES.observar(time.perf_counter() - inicio, pagina=pagina, tipo=tipo)
+
+
+def medir_fragmento():
+    """
+    Mede o fragmento se ele estiver sendo reexecutado sozinho.
+
+    Dentro de uma execução completa, o fragmento já entra no tempo da página.
+    """
+    contexto = get_script_run_ctx()
+    if contexto is None or not contexto.fragment_ids_this_run:
+        return contextlib.nullcontext()
+    return medir_execucao(pagina_atual(), "fragmento")
+
+
+# Pilha de chamadas em andamento por thread, para saber se o corpo em cache executou
+_chamadas = threading.local()
+
+
+def _argumentos(assinatura, args, kwargs):
+    # Argumentos da chamada para limpar só a sua entrada; os com "_" ficam fora da
+    # chave do Streamlit e não são guardados, para não prender DataFrames antigos
+    nomes = list(assinatura.parameters)
+    posicionais = tuple(None if posicao < len(nomes) and nomes[posicao].startswith("_") else valor for posicao, valor in enumerate(args))
+    return posicionais, {nome_arg: None if nome_arg.startswith("_") else valor for nome_arg, valor in kwargs.items()}
+
+
+def _cache(decorador, nome, opcoes):
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+        assinatura = inspect.signature(funcao)
+        regra = politica_cache.politica(rotulo)
+        entradas = politica_cache.Entradas(regra)
+        # Chaves já calculadas, limitadas para não crescer sem fim
+        calculadas = OrderedDict()
+
+        @functools.wraps(funcao)
+        def calcular(*args, **kwargs):
+            pilha = getattr(_chamadas, "pilha", None)
+            if pilha:
+                pilha[-1] = True
+            return funcao(*args, **kwargs)
+
+        # Opções passadas no decorador prevalecem sobre a política registrada
+        em_cache = decorador(**{"ttl": regra.ttl, "max_entries": regra.max_entries, **opcoes})(calcular)
+
+        def remover(removidas):
+            for motivo, (args, kwargs) in removidas:
+                em_cache.clear(*args, **kwargs)
+                CACHE_REMOCOES.inc(cache=rotulo, motivo=motivo)
+
+        @functools.wraps(funcao)
+        def chamar(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs).arguments
+            chave = repr([(nome_arg, valor) for nome_arg, valor in argumentos.items() if not nome_arg.startswith("_")])
+            vencidas = entradas.expiradas()
+            if vencidas:
+                remover(vencidas)
+                CACHE_BYTES.definir(entradas.bytes, cache=rotulo)
+            pilha = _chamadas.__dict__.setdefault("pilha", [])
+            pilha.append(False)
+            try:
+                valor = em_cache(*args, **kwargs)
+            finally:
+                calculou = pilha.pop()
+                (CACHE_FALTAS if calculou else CACHE_ACERTOS).inc(cache=rotulo)
+            if not calculou:
+                entradas.usar(chave)
+                return valor
+
+            if chave in calculadas:
+                CACHE_DESCARTES.inc(cache=rotulo)
+            calculadas[chave] = None
+            calculadas.move_to_end(chave)
+            if len(calculadas) > 10_000:
+                calculadas.popitem(last=False)
+            remover(entradas.incluir(chave, _argumentos(assinatura, args, kwargs), politica_cache.tamanho(valor)))
+            CACHE_BYTES.definir(entradas.bytes, cache=rotulo)
+            return valor
+
+        def limpar(*args, **kwargs):
+            em_cache.clear(*args, **kwargs)
+            if not args and not kwargs:
+                entradas.limpar()
+                CACHE_BYTES.definir(0, cache=rotulo)
+
+        chamar.clear = limpar
+        chamar.politica = regra
+        return chamar
+    return decorar
+
+
+def cache_data(nome=None, **opcoes):
+    """
+    Equivalente ao st.cache_data que aplica a política do cache e conta acertos, faltas e remoções.
+
+    Parâmetros:
+    - nome: Rótulo ``cache`` das métricas e da política; por padrão, o nome da função.
+    - opcoes: Parâmetros repassados para st.cache_data (show_spinner...); ttl e
+      max_entries vêm da política registrada em comum.politica_cache.
+
+    Um descarte é uma falta para argumentos que já tinham sido calculados: o
+    valor saiu do cache por max_entries, ttl, orçamento de memória ou clear.
+    Parâmetros com ``_`` no início ficam fora da chave, como no próprio st.cache_data.
+    """
+    return _cache(st.cache_data, nome, opcoes)
+
+
+def cache_resource(nome=None, **opcoes):
+    """
+    Equivalente ao st.cache_resource com a política do cache e as mesmas métricas de ``cache_data``.
+
+    Parâmetros:
+    - nome: Rótulo ``cache`` das métricas e da política; por padrão, o nome da função.
+    - opcoes: Parâmetros repassados para st.cache_resource (show_spinner...).
+    """
+    return _cache(st.cache_resource, nome, opcoes)
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        corpo = texto().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+
+def _gravar_periodicamente(caminho):
+    caminho = Path(caminho)
+    while True:
+        # Grava ao lado e renomeia: o coletor nunca lê um arquivo pela metade
+        temporario = caminho.with_suffix(caminho.suffix + ".tmp")
+        try:
+            temporario.write_text(texto())
+            os.replace(temporario, caminho)
+        except OSError:
+            # Disco cheio, permissão, pasta ausente: tenta de novo no próximo ciclo
+            logger.warning("Não foi possível gravar as métricas em %s", caminho, exc_info=True)
+        time.sleep(INTERVALO)
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_telemetria():
+    """
+    Inicia a exportação configurada no ambiente, uma vez por servidor.
+
+    Sem DASHS_METRICAS_PORTA nem DASHS_METRICAS_ARQUIVO, não faz nada.
+    """
+    if PORTA:
+        try:
+            servidor = ThreadingHTTPServer((ENDERECO, int(PORTA)), _Manipulador)
+        except OSError:
+            # Porta ocupada ou endereço inválido: as métricas não podem derrubar as páginas
+            logger.warning("Não foi possível servir as métricas em %s:%s", ENDERECO, PORTA, exc_info=True)
+        else:
+            threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+            logger.info("Métricas em http://%s:%s/metrics", ENDERECO, PORTA)
+    if ARQUIVO:
+        threading.Thread(target=_gravar_periodicamente, args=(ARQUIVO,), name="metricas-arquivo", daemon=True).start()
+        logger.info("Métricas gravadas em %s a cada %g s", ARQUIVO, INTERVALO)
+    return True
@@ -0,0 +1,157 @@
+"""
+Ciclo de vida das notas de triagem.
+
+As durações de cada etapa (criação → MSPN → MSPR → ORDA) são calculadas
+direto das colunas de data, numa única passada vetorizada sobre todas as
+notas, e ficam em cache pela versão dos dados. Para cada combinação de
+filtros, o resumo (percentis por etapa, quebras por Centro de Trabalho e por
+Disciplina e faixas de idade das notas ainda sem ordem) é calculado sobre as
+posições já filtradas e também fica em cache, então trocar de filtro e voltar
+não recalcula nada.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from comum import telemetria
+from comum.filtros import filtros_ativos, posicoes
+
+# (etapa, coluna de início, coluna de fim)
+ETAPAS = [
+    ("Criação → MSPN", "Data_de_criação", "MSPN"),
+    ("MSPN → MSPR", "MSPN", "MSPR"),
+    ("MSPR → ORDA", "MSPR", "ORDA"),
+    ("Criação → ORDA", "Data_de_criação", "ORDA"),
+]
+PERCENTIS = [50, 75, 90, 95, 99]
+# Limites das faixas de idade, em dias, das notas que ainda não viraram ordem
+FAIXAS_IDADE = [0, 7, 15, 30, 60, 90, 180, 365, np.inf]
+ROTULOS_IDADE = ["até 7 dias", "8–15 dias", "16–30 dias", "31–60 dias", "61–90 dias", "91–180 dias", "181–365 dias", "mais de 1 ano"]
+
+_DIA = 86400
+
+
+def _segundos(serie):
+    # Datas como inteiros em segundos; NaT vira NaN
+    valores = serie.to_numpy(dtype="datetime64[s]")
+    segundos = valores.view("int64").astype("float64")
+    segundos[np.isnat(valores)] = np.nan
+    return segundos
+
+
+def duracoes(data):
+    """
+    Retorna a duração de cada etapa de cada nota, em dias.
+
+    Parâmetros:
+    - data: DataFrame de notas com as colunas de data de ETAPAS.
+
+    Retorna uma matriz float32 (notas × etapas, na ordem de ETAPAS). Etapas não
+    alcançadas e datas fora de ordem (fim antes do início) ficam NaN.
+    """
+    colunas = list(dict.fromkeys(coluna for _, inicio, fim in ETAPAS for coluna in (inicio, fim)))
+    datas = np.column_stack([_segundos(data[coluna]) for coluna in colunas])
+    indice = {coluna: posicao for posicao, coluna in enumerate(colunas)}
+    inicio = [indice[coluna] for _, coluna, _ in ETAPAS]
+    fim = [indice[coluna] for _, _, coluna in ETAPAS]
+    dias = ((datas[:, fim] - datas[:, inicio]) / _DIA).astype("float32")
+    dias[dias < 0] = np.nan
+    return dias
+
+
+@telemetria.cache_data("duracoes_triagem", show_spinner=False)
+def _duracoes_em_cache(versao, linhas, _data):
+    return duracoes(_data)
+
+
+def _percentis(dias, nomes):
+    # Uma linha por etapa: notas com a etapa concluída, média e percentis
+    preenchidos = ~np.isnan(dias)
+    with warnings.catch_warnings():
+        # Etapas sem nenhuma nota geram "All-NaN slice" e "Mean of empty slice"
+        warnings.simplefilter("ignore", RuntimeWarning)
+        tabela = pd.DataFrame(
+            np.nanpercentile(dias, PERCENTIS, axis=0).T if len(dias) else np.full((len(nomes), len(PERCENTIS)), np.nan),
+            index=pd.Index(nomes, name="Etapa"),
+            columns=[f"p{percentil}" for percentil in PERCENTIS],
+        )
+        tabela.insert(0, "Média", np.nanmean(dias, axis=0) if len(dias) else np.nan)
+    tabela.insert(0, "Notas", preenchidos.sum(axis=0))
+    return tabela.round(1)
+
+
+def _quebra(dias, grupos, nomes):
+    # Mediana e p90 de cada etapa por grupo, com o número de notas
+    quadro = pd.DataFrame(dias, columns=nomes)
+    agrupado = quadro.groupby(grupos, observed=True, sort=True)
+    tabela = pd.concat(
+        {"Notas": agrupado.size()} | {
+            f"{nome} (p50)": agrupado[nome].median() for nome in nomes
+        } | {
+            f"{nome} (p90)": agrupado[nome].quantile(0.9) for nome in nomes
+        },
+        axis=1,
+    )
+    return tabela.sort_values("Notas", ascending=False).round(1)
+
+
+def _idade(data, referencia):
+    # Notas sem ORDA: idade desde o MSPN (ou a criação) até a data de referência
+    abertas = data["ORDA"].isna()
+    inicio = data["MSPN"].where(data["MSPN"].notna(), data["Data_de_criação"])
+    idade = (referencia - inicio[abertas]).dt.days
+    faixas = pd.cut(idade, FAIXAS_IDADE, labels=ROTULOS_IDADE, include_lowest=True)
+    return faixas.value_counts(sort=False).rename("Notas").rename_axis("Idade").reset_index()
+
+
+def resumo_ciclo(data, selecionadas=None):
+    """
+    Calcula o resumo do ciclo de vida para as notas selecionadas.
+
+    Parâmetros:
+    - data: DataFrame completo de notas.
+    - selecionadas: Posições das notas (como as de comum.filtros.posicoes); None para todas.
+
+    Retorna um dicionário com:
+    - "percentis": notas, média e percentis de cada etapa, em dias;
+    - "por_ct" e "por_disciplina": mediana e p90 de cada etapa por grupo;
+    - "idade": notas ainda sem ordem por faixa de idade, contada até a data
+      mais recente dos dados (não até hoje, para que planilhas antigas não
+      caiam todas na última faixa).
+    """
+    versao = data.attrs.get("versao")
+    dias = duracoes(data) if versao is None else _duracoes_em_cache(versao, len(data), data)
+    referencia = max(data["MSPN"].max(), data["Data_de_criação"].max())
+    if selecionadas is not None:
+        dias = dias[selecionadas]
+        data = data.take(selecionadas)
+    nomes = [nome for nome, _, _ in ETAPAS]
+    return {
+        "percentis": _percentis(dias, nomes),
+        "por_ct": _quebra(dias, data["Centro_de_Trabalho"].array, nomes),
+        "por_disciplina": _quebra(dias, data["Disciplina"].array, nomes),
+        "idade": _idade(data, referencia),
+    }
+
+
+@telemetria.cache_data("ciclo_triagem", show_spinner=False)
+def _resumo_em_cache(versao, linhas, filtros, _data):
+    return resumo_ciclo(_data, posicoes(_data, dict(filtros)))
+
+
+def ciclo_de_vida(data, filtros=None):
+    """
+    Retorna o resumo do ciclo de vida das notas que atendem aos filtros.
+
+    Parâmetros:
+    - data: DataFrame completo de notas, como retornado pelo load_data da página.
+    - filtros: Dicionário {coluna: valor}; valores None são ignorados.
+
+    O resultado fica em cache pela versão dos dados e pela combinação de filtros
+    (ver resumo_ciclo para o conteúdo).
+    """
+    versao = data.attrs.get("versao")
+    if versao is None:
+        return resumo_ciclo(data, posicoes(data, filtros or {}))
+    return _resumo_em_cache(versao, len(data), filtros_ativos(filtros or {}), data)
@@ -1,104 +1,31 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 from datetime import date, timedelta
 import string
-import altair as alt
 from streamlit_extras.metric_cards import style_metric_cards
+from comum.exportar import Baixar_Dados
+from comum.filtros import Filtro_Ano, Filtros, filtrar, periodo, selecao
+from comum.graficos import Grafico_Rotulado_Barras_Veticais, Grafico_Rotulado_Data
+from comum.incremental import conjunto_incremental
+from comum.particao import meses
+from comum.perfil import etapa
+from comum.quantis import ALFA, percentis_triagem
+from comum.secoes import Executar_Secao, secao
+from comum.tabela import Tabela_Paginada
+from comum.triagem import ciclo_de_vida
+
+# Filtros da barra lateral: (chave no session_state, coluna, rótulo, texto padrão)
+FILTROS = [
+    ("filtro1", "Empresa", "Empresa:", "Selecione uma empresa"),
+    ("filtro2", "Disciplina", "Disciplina:", "Selecione uma disciplina"),
+    ("filtro3", "Centro_de_Trabalho", "Centro de Trabalho:", "Selecione um CT"),
+]
+# Filtro de ano: (chave do ano, chave dos meses, coluna de data)
+ANO = ("filtro_ano", "filtro_meses", "Data_de_criação")
 
-@st.cache_data
 def load_data():
-    tria = pd.read_excel("./tempo_triagem_notas.xlsx")
-    return tria
-
-
-@st.cache_data
-def get_data():
-    # Criar colunas baseadas no alfabeto
-    columns = ["Produto " + column for column in string.ascii_uppercase[:10]]  # Limitar para 10 produtos
-    valores = np.random.normal(1000, 600, len(columns))
-    dicionario = dict(zip(columns, valores))
-
-    # Criar datas para o intervalo desejado
-    data_vendas = pd.date_range(start=date(2023, 1, 1), end=date(2023, 12, 31), freq="D")
-
-    # Criar DataFrame com os dados simulados
-    data = pd.DataFrame(index=data_vendas)
-
-    for column, valor in dicionario.items():
-        data[column] = np.random.normal(valor, 500, len(data_vendas))
-
-    return data
-
-
-def Grafico_Rotulado_Data(data, axisx, axisy, rotuloY, titulo):
-    """
-    Exibe um gráfico de área interativo com hover, pontos, tooltips e rótulos.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy: Nome da coluna para o eixo Y.
-    - rotuloY: Título do eixo Y.
-    - titulo: Título do gráfico.
-    """
-    hover = alt.selection_single(
-        fields=[axisx],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
-
-    # Criar o gráfico de área
-    area = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_area(opacity=0.6, line={"color": "#005FB8"})  # Adiciona transparência e linha no contorno
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            color=alt.value("#005FB8"),  # Define a cor da área
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-    )
-
-    # Pontos para o hover
-    points = area.transform_filter(hover).mark_circle(size=65)
-
-    # Rótulos nos pontos
-    labels = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, dy=-5, fontSize=12,  color="#FFFFFF")
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            text=alt.Text(axisy, format=".0f"),  # Formato dos valores exibidos
-        )
-    )
-
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule()
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            opacity=alt.condition(hover, alt.value(0.3), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-        .add_selection(hover)
-    )
-
-    # Combinação de camadas
-    data_layer = area + points + labels + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
-
-
+    # Estado incremental compartilhado com o aquecimento do app.py
+    return conjunto_incremental("triagem").dados()
 
 
 def Graficos_Tabelas(data):
@@ -141,77 +68,10 @@ def Graficos_Tabelas(data):
 
     st.dataframe(data,hide_index=True)
 
-def Cartoes(data):
-    mediaA = round(np.average(data[['Produto A']]), 2)
-    mediaB = round(np.average(data[['Produto B']]), 2)
-    mediaC = round(np.average(data[['Produto C']]), 2)
-
-    with st.container(height=300):
-        st.metric(label="Média Produto A", value=mediaA)
-    with st.container(height=300):
-        st.metric(label="Média Produto B", value=mediaB)
-    with st.container(height=300):
-        st.metric(label="Média Produto C", value=mediaC)
-
-
-def Filtros(data):
-    # Inicializando os filtros no st.session_state com valores padrão
-    if "filtro1" not in st.session_state:
-        st.session_state["filtro1"] = "Selecione uma empresa"
-    if "filtro2" not in st.session_state:
-        st.session_state["filtro2"] = "Selecione uma disciplina"
-    if "filtro3" not in st.session_state:
-        st.session_state["filtro3"] = "Selecione um CT"
-
-    # Criando os filtros na barra lateral com valor padrão selecionado
-    st.sidebar.selectbox(
-        "Empresa:",
-        options=["Selecione uma empresa"] + list(data['Empresa'].unique()),
-        index=0,  # Define "Selecione uma empresa" como padrão
-        key="filtro1",
-    )
-    st.sidebar.selectbox(
-        "Disciplina:",
-        options=["Selecione uma disciplina"] + list(data["Disciplina"].unique()),
-        index=0,  # Define "Selecione uma disciplina" como padrão
-        key="filtro2",
-    )
-    st.sidebar.selectbox(
-        "Centro de Trabalho:",
-        options=["Selecione um CT"] + list(data["Centro_de_Trabalho"].unique()),
-        index=0,  # Define "Selecione um CT" como padrão
-        key="filtro3",
-    )
-
-
-
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
 def Secao1(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Selecionando colunas relevantes
-    data = data[['Status', 'MSPN', 'Empresa', 'Disciplina', 'Centro_de_Trabalho']].copy()
-
-    # Verificar se todos os filtros estão no estado padrão ou nenhum foi selecionado
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione uma empresa") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Aplicar filtro padrão
-        data = data[data["Status"] == "MSPN"]
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione uma empresa":
-            data = data[(data['Status'] == 'MSPN') & (data['Empresa'] == st.session_state["filtro1"])]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[(data['Status'] == 'MSPN') & (data['Disciplina'] == st.session_state["filtro2"])]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[(data['Status'] == 'MSPN') & (data['Centro_de_Trabalho'] == st.session_state["filtro3"])]
-
-    # Garantindo que 'MSPN' é datetime
-    if not np.issubdtype(data['MSPN'].dtype, np.datetime64):
-        data['MSPN'] = pd.to_datetime(data['MSPN'], errors='coerce')
+    # Selecionando as notas em MSPN que atendem aos filtros
+    data = filtrar(data, ['Status', 'MSPN'], {**selecao(FILTROS, ANO), "Status": "MSPN"})
 
     # Criando a coluna de mês/ano e agrupando
     data['Mes_Ano'] = data['MSPN'].dt.to_period("M")
@@ -234,16 +94,10 @@ def Secao1(data):
         )
 
     
+@secao("filtro_ano", "filtro_meses")
 def Secao2(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-    # Selecionando colunas e filtrando por 'Status' == 'MSPN'
-    data = data[['Status', 'MSPR']].copy()
-    data = data[data['Status'] == 'MSPR']
-
-    # Garantindo que 'MSPN' é datetime
-    if not np.issubdtype(data['MSPR'].dtype, np.datetime64):
-        data['MSPR'] = pd.to_datetime(data['MSPR'], errors='coerce')
+    # Selecionando as notas em MSPR do período (esta seção não usa os filtros da barra lateral)
+    data = filtrar(data, ['Status', 'MSPR'], {**selecao([], ANO), "Status": "MSPR"})
 
     # Criando a coluna de mês/ano e agrupando
     data['Mes_Ano'] = data['MSPR'].dt.to_period("M")
@@ -264,34 +118,10 @@ def Secao2(data):
                 rotuloY="",
                 titulo="Entrada de Notas MSPN x MSPR",
             )
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
 def Secao3(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Verificando os filtros aplicados no st.session_state
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione uma empresa") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Nenhum filtro selecionado: utiliza os dados sem filtro
-        data = data[['ORDA']].copy()
-        data = data.dropna()
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione uma empresa":
-            data = data[data['Empresa'] == st.session_state["filtro1"]]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[data['Disciplina'] == st.session_state["filtro2"]]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[data['Centro_de_Trabalho'] == st.session_state["filtro3"]]
-
-        # Filtrando apenas a coluna ORDA
-        data = data[['ORDA']].copy()
-        data = data.dropna()
-
-    # Garantindo que 'ORDA' é datetime
-    data['ORDA'] = pd.to_datetime(data['ORDA'], errors='coerce')
+    # Selecionando as datas ORDA das notas que atendem aos filtros
+    data = filtrar(data, ['ORDA'], selecao(FILTROS, ANO)).dropna()
 
     # Criando a coluna de mês/ano e agrupando
     data["Mes_Ano"] = data["ORDA"].dt.to_period("M")
@@ -316,12 +146,44 @@ def Secao3(data):
 
 
 
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Ciclo_de_Vida(data):
+    # Duração de cada etapa calculada das próprias datas, para as notas filtradas
+    ciclo = ciclo_de_vida(data, selecao(FILTROS, ANO))
+
+    st.subheader("Ciclo de vida das notas (dias)")
+    col1, col2 = st.columns([3, 2])
+    col1.dataframe(ciclo["percentis"], width="stretch")
+    with col2:
+        Grafico_Rotulado_Barras_Veticais(
+            data=ciclo["idade"],
+            axisx="Idade",
+            axisy="Notas",
+            rotuloY="Notas",
+            titulo="Notas sem ordem por idade",
+        )
+
+    # Mediana (p50) e p90 de cada etapa por grupo
+    aba_ct, aba_disciplina = st.tabs(["Por Centro de Trabalho", "Por Disciplina"])
+    aba_ct.dataframe(ciclo["por_ct"], width="stretch")
+    aba_disciplina.dataframe(ciclo["por_disciplina"], width="stretch")
+
+
+def _percentis_texto(etapa_triagem):
+    # p50 / p90 / p99 da etapa, lidos dos esboços de quantis (ver comum.quantis)
+    # O período vira a lista de meses de criação do eixo Mes_Ano dos esboços
+    valores = percentis_triagem(etapa_triagem, {**selecao(FILTROS), "Mes_Ano": meses(periodo(ANO))})
+    return " / ".join("–" if np.isnan(valor) else f"{valor:.1f}" for valor in valores)
+
+
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
 def Metricas(data):
     # Configuração das colunas
     col1, col2, col3 = st.columns(3)
-    col1.metric(label="Idade Média", value=round(np.average(data["Idade_média"]), 2), delta=-10)
-    col2.metric(label="Conversão MSPN x MSPR", value=round(np.nanmean(data["MSPN_X_MSPR"]), 2), delta=-210)
-    col3.metric(label="Conversão NT x OM", value=round(np.nanmean(data["MSPR_x_ORDA"]), 2), delta=-210)
+    idade = filtrar(data, ["Idade_média"], selecao(FILTROS, ANO))["Idade_média"]
+    col1.metric(label="Idade Média", value=round(np.nanmean(idade), 2) if len(idade) else "–", delta=-10)
+    col2.metric(label="Conversão MSPN x MSPR (p50 / p90 / p99)", value=_percentis_texto("MSPN → MSPR"), help=f"Dias, com erro relativo de até {ALFA:.0%}")
+    col3.metric(label="Conversão NT x OM (p50 / p90 / p99)", value=_percentis_texto("MSPR → ORDA"), help=f"Dias, com erro relativo de até {ALFA:.0%}")
 
     # Aplicação de estilo
     style_metric_cards(border_left_color="#005FB8",background_color="#262730",border_color="#005FB8")
@@ -329,36 +191,23 @@ def Metricas(data):
    
     
 
-def Filtro_Ano(data):
-    # Criando uma coluna de ano
-    data['Ano'] = data['Data_de_criação'].dt.year
-    lista_anos = list(data['Ano'].unique())
-
-    # CSS para aumentar o tamanho do texto "Ano"
-    st.markdown(
-        """
-        <style>
-        label[data-testid="stSelectboxLabel"] {
-            font-size: 20px; /* Altere o tamanho da fonte aqui */
-            font-weight: bold; /* Deixe o texto em negrito se desejar */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Tabela(data):
+    # Só a página visível é enviada ao navegador
+    Tabela_Paginada(
+        data,
+        colunas=["Nota","Texto","Status","Idade_média","MSPN_X_MSPR","Centro_de_Trabalho"],
+        chave="tabela_notas",
+        filtros=selecao(FILTROS, ANO),
+        busca="Texto",
     )
 
-    # Criando o selectbox
-    option = st.selectbox(
-        "Ano",
-        lista_anos,
-        index=None,
-        placeholder="Selecione um ano...",
-    )
 
-    return option
-def Tabela(data):
-    st.dataframe(data[["Nota","Texto","Status","Idade_média","MSPN_X_MSPR","Centro_de_Trabalho"]],hide_index=True,use_container_width=True)
 
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Exportacao(data):
+    # O arquivo segue os mesmos filtros das seções do dashboard
+    Baixar_Dados(data, "notas_triagem", filtros=selecao(FILTROS, ANO), chave="exportar_notas")
 
 
 # Criando as abas com ícones nos nomes
@@ -366,25 +215,27 @@ tab1, tab2 = st.tabs(["📊 DashBoard: Triagem", "📥 Baixar dados"])
 
 with tab1:
     st.title("Tempo de triagem :chart_with_upwards_trend:")
-    data = get_data()
-    data1 = load_data()
+    with etapa("carga"):
+        data1 = load_data()
     col2, col3 = st.columns([3, 1])
 
-    Filtros(data1)
+    Filtros(data1, FILTROS)
     st.divider()
 
-    Filtro_Ano(data1)
-    Metricas(data1)
+    Filtro_Ano(data1, ANO)
+    Executar_Secao(Metricas, data1)
 
-    Secao1(data1)
-    Secao2(data1)
-    Secao3(data1)
-    Tabela(data1)
+    Executar_Secao(Secao1, data1)
+    Executar_Secao(Secao2, data1)
+    Executar_Secao(Secao3, data1)
+    Executar_Secao(Ciclo_de_Vida, data1)
+    Executar_Secao(Tabela, data1)
 
 
 
 with tab2:
     st.write("📥 Baixar Dados")
+    Executar_Secao(Exportacao, data1)
 
 
 
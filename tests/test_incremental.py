@@ -0,0 +1,88 @@
+"""
+Carga incremental sobre uma fonte SQLite.
+
+Uso: python -m pytest tests
+"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from comum import incremental
+from comum.esquema import ESQUEMAS, aplicar_esquema
+from comum.fontes import FonteSQLite
+
+
+def encerradas(dados):
+    # Ordens abertas e encerradas: o encerramento move a ordem de célula
+    return {"Encerrada": dados["Data_de_Encerramento"].notna()}, dados["Ordem"].notna()
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    caminho = tmp_path / "dados.db"
+    ordens = pd.DataFrame({
+        "Ordem": [1, 2, 2, 3, 4],
+        "Tipo": ["ZPM2", "ZPM2", "ZPM3", "ZPM2", "ZPM3"],
+        "Data_de_Criacao": pd.to_datetime(["2024-01-10", "2024-02-01", "2024-02-01", "2024-11-20", None]),
+        "Data_de_Encerramento": pd.to_datetime([None, "2024-03-01", None, None, None]),
+    })
+    with sqlite3.connect(caminho) as conexao:
+        ordens.to_sql("ordens", conexao, index=False)
+
+    fonte = FonteSQLite(str(caminho))
+    monkeypatch.setattr(incremental, "fonte", lambda: fonte)
+    monkeypatch.setattr(incremental, "carregar", lambda nome: aplicar_esquema(fonte.ler(nome), ESQUEMAS[nome]))
+    # Fontes SQL não têm assinatura: sem intervalo, toda chamada consulta o delta
+    monkeypatch.setattr(incremental, "INTERVALO", 0)
+    return caminho
+
+
+def _executar(caminho, sql):
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute(sql)
+
+
+def _estado():
+    chave, marcas = incremental.INCREMENTAIS["ordens"]
+    return incremental.Incremental("ordens", chave, marcas).atualizar()
+
+
+def test_ordem_antiga_encerrada_entra_no_delta(banco):
+    estado = _estado()
+    assert estado.cubo(encerradas).total({"Encerrada": True}) == 1
+
+    # Criada muito antes da janela, encerrada agora
+    _executar(banco, "UPDATE ordens SET Data_de_Encerramento = '2024-11-24 00:00:00' WHERE Ordem = 1")
+    dados = estado.atualizar().dados()
+
+    assert dados.loc[dados["Ordem"] == 1, "Data_de_Encerramento"].tolist() == [pd.Timestamp("2024-11-24")]
+    assert len(dados) == 5
+    cubo = estado.cubo(encerradas)
+    assert cubo.total({"Encerrada": True}) == 2
+    assert cubo.total({"Encerrada": False}) == 3
+
+
+def test_chave_com_varias_linhas_volta_inteira(banco):
+    estado = _estado()
+    estado.cubo(encerradas)
+
+    # Só uma das linhas da ordem 2 muda: a outra, antiga, não pode se perder
+    _executar(banco, "UPDATE ordens SET Data_de_Encerramento = '2024-11-22 00:00:00' WHERE Ordem = 2 AND Tipo = 'ZPM3'")
+    dados = estado.atualizar().dados()
+
+    linhas = dados[dados["Ordem"] == 2].sort_values("Tipo")
+    assert linhas["Data_de_Encerramento"].tolist() == [pd.Timestamp("2024-03-01"), pd.Timestamp("2024-11-22")]
+    assert len(dados) == 5
+    assert estado.cubo(encerradas).total({"Encerrada": True}) == 2
+
+
+def test_linha_sem_marca_dagua_entra_no_delta(banco):
+    estado = _estado()
+    estado.cubo(encerradas)
+
+    _executar(banco, "UPDATE ordens SET Data_de_Encerramento = '2024-01-05 00:00:00' WHERE Ordem = 4")
+    dados = estado.atualizar().dados()
+
+    assert dados.loc[dados["Ordem"] == 4, "Data_de_Encerramento"].tolist() == [pd.Timestamp("2024-01-05")]
+    assert estado.cubo(encerradas).total({"Encerrada": True}) == 2
@@ -1,327 +1,68 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 from datetime import date, timedelta
 import string
-import altair as alt
 from streamlit_extras.metric_cards import style_metric_cards 
-
+from comum.exportar import Baixar_Dados
+from comum.filtros import Filtro_Ano, Filtros, periodo, selecao
+from comum.graficos import Grafico_Rotulado_Barras_Horizontal, Grafico_Rotulado_Barras_Veticais, Grafico_Rotulado_Data
+from comum.incremental import conjunto_incremental
+from comum.ordens import dimensoes_ordens
+from comum.particao import meses
+from comum.perfil import etapa
+from comum.secoes import Executar_Secao, secao
+from comum.tabela import Tabela_Paginada
+
+# Filtros da barra lateral: (chave no session_state, coluna, rótulo, texto padrão)
+FILTROS = [
+    ("filtro1", "Tipo", "Tipo:", "Selecione um tipo"),
+    ("filtro2", "Disciplina", "Disciplina:", "Selecione uma disciplina"),
+    ("filtro3", "CT", "CT:", "Selecione um CT"),
+]
+# Filtro de ano: (chave do ano, chave dos meses, coluna de data)
+ANO = ("filtro_ano", "filtro_meses", "Data_de_Criacao")
 
 st.header("ZPM2")
-@st.cache_data
 def load_data():
-    dados = pd.read_excel("./Ordens_zpm2zpm3.xlsx")
-    return dados
-
-def Grafico_Rotulado_Barras(data, axisx, axisy, rotuloX, titulo):
-    """
-    Exibe um gráfico de barras horizontais interativo com hover, tooltips e rótulos.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy: Nome da coluna para o eixo Y.
-    - rotuloX: Título do eixo X.
-    - titulo: Título do gráfico.
-    """
-    hover = alt.selection_single(
-        fields=[axisy],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
-
-    # Criar o gráfico de barras horizontais
-    bars = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_bar(opacity=0.8, color="#005FB8")
-        .encode(
-            x=alt.X(axisx, title=rotuloX),
-            y=alt.Y(axisy, title="", sort="-x"),
-            tooltip=[
-                alt.Tooltip(axisy, title="Categoria"),
-                alt.Tooltip(axisx, title=rotuloX),
-            ],
-        )
-    )
-
-    # Rótulos nas barras
-    labels = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, fontSize=12, color="#FFFFFF")
-        .encode(
-            x=alt.X(axisx, title=rotuloX),
-            y=alt.Y(axisy, title="", sort="-x"),
-            text=alt.Text(axisx, format=".2f"),  # Formato dos valores exibidos
-        )
-    )
-
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule(color="gray")
-        .encode(
-            x=alt.X(axisx, title=rotuloX),
-            y=alt.Y(axisy, title="", sort="-x"),
-            opacity=alt.condition(hover, alt.value(0.3), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisy, title="Categoria"),
-                alt.Tooltip(axisx, title=rotuloX),
-            ],
-        )
-        .add_selection(hover)
-    )
-
-    # Combinação de camadas
-    data_layer = bars + labels + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
-def Grafico_Rotulado_Barras_Veticais(data, axisx, axisy, rotuloY, titulo):
-    """
-    Exibe um gráfico de barras verticais interativo com hover, tooltips e rótulos.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy: Nome da coluna para o eixo Y.
-    - rotuloY: Título do eixo Y.
-    - titulo: Título do gráfico.
-    """
-    hover = alt.selection_single(
-        fields=[axisx],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
+    # Estado incremental compartilhado com o aquecimento do app.py
+    return conjunto_incremental("ordens")
 
-    # Criar o gráfico de barras verticais
-    bars = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_bar(opacity=0.8, color="#005FB8")
-        .encode(
-            x=alt.X(axisx, title="", sort="-y"),
-            y=alt.Y(axisy, title=rotuloY),
-            tooltip=[
-                alt.Tooltip(axisx, title="Tipo"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-    )
 
-    # Rótulos nas barras
-    labels = (
-        alt.Chart(data.reset_index())
-        .mark_text(dy=-5, fontSize=12, color="#FFFFFF")  # Ajusta a posição vertical do texto
-        .encode(
-            x=alt.X(axisx, title="", sort="-y"),
-            y=alt.Y(axisy, title=rotuloY),
-            text=alt.Text(axisy, format=".2f"),  # Formato dos valores exibidos
-        )
-    )
+def filtros_cubo():
+    # O período escolhido vira a lista de meses do eixo Mes_Ano do cubo
+    filtros = selecao(FILTROS)
+    filtros["Mes_Ano"] = meses(periodo(ANO))
+    return filtros
 
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule(color="gray")
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            opacity=alt.condition(hover, alt.value(0.3), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisx, title="Tipo"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-        .add_selection(hover)
-    )
-
-    # Combinação de camadas
-    data_layer = bars + labels + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
 
-def Grafico_Rotulado_Data(data, axisx, axisy, rotuloY, titulo):
-    """
-    Exibe um gráfico de área interativo com hover, pontos, tooltips e rótulos.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy: Nome da coluna para o eixo Y.
-    - rotuloY: Título do eixo Y.
-    - titulo: Título do gráfico.
-    """
-    hover = alt.selection_single(
-        fields=[axisx],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
+def percentual(cubo, tipo):
+    # Percentual das ordens do período escolhido que são do tipo
+    mes_ano = meses(periodo(ANO))
+    total = cubo.total({"Mes_Ano": mes_ano})
+    return f'{round(cubo.total({"Tipo": tipo, "Mes_Ano": mes_ano}) / total * 100, 2) if total else 0} %'
 
-    # Criar o gráfico de área
-    area = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_area(opacity=0.6, line={"color": "#005FB8"})  # Adiciona transparência e linha no contorno
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            color=alt.value("#005FB8"),  # Define a cor da área
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-    )
-
-    # Pontos para o hover
-    points = area.transform_filter(hover).mark_circle(size=65)
-
-    # Rótulos nos pontos
-    labels = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, dy=-5, fontSize=12,  color="#FFFFFF")
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            text=alt.Text(axisy, format=".0f"),  # Formato dos valores exibidos
-        )
-    )
-
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule()
-        .encode(
-            x=alt.X(axisx, title=""),
-            y=alt.Y(axisy, title=rotuloY),
-            opacity=alt.condition(hover, alt.value(0.3), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisx, title="Data"),
-                alt.Tooltip(axisy, title=rotuloY),
-            ],
-        )
-        .add_selection(hover)
-    )
 
-    # Combinação de camadas
-    data_layer = area + points + labels + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
-def Metricas(data):
+@secao("filtro_ano", "filtro_meses")
+def Metricas(cubo):
     # Configuração das colunas
     col1, col2 = st.columns(2)
 
     col1.metric(
         label="%ZPM2", 
-        value=f'{round(len(data[data["Tipo"] == "ZPM2"]) / len(data) * 100, 2)} %', 
+        value=percentual(cubo, "ZPM2"), 
         delta=-10
     )
     col2.metric(
         label="%ZPM3",  
-        value=f'{round(len(data[data["Tipo"] == "ZPM3"]) / len(data) * 100, 2)} %', 
+        value=percentual(cubo, "ZPM3"), 
         delta=-210
     )
 
     # Aplicação de estilo
     style_metric_cards(border_left_color="#005FB8", background_color="#262730", border_color="#005FB8")
-def Grafico_Rotulado_Barras_Horizontal(data, axisx, axisy, rotuloY, titulo):
-    """
-    Exibe um gráfico de barras horizontal interativo com hover, rótulos e tooltips.
-
-    Parâmetros:
-    - data: DataFrame com os dados a serem plotados.
-    - axisx: Nome da coluna para o eixo X.
-    - axisy: Nome da coluna para o eixo Y.
-    - rotuloY: Título do eixo Y.
-    - titulo: Título do gráfico.
-    """
-    hover = alt.selection_single(
-        fields=[axisy],
-        nearest=True,
-        on="mouseover",
-        empty="none",
-    )
-
-    # Criar o gráfico de barras
-    bars = (
-        alt.Chart(data.reset_index(), title=alt.TitleParams(text=titulo, anchor="middle"))
-        .mark_bar(opacity=0.8, color="#005FB8")  # Adiciona cor e opacidade às barras
-        .encode(
-            y=alt.Y(axisy, title=rotuloY, sort="-x"),  # Ordena por valores do eixo X
-            x=alt.X(axisx, title=""),
-            tooltip=[
-                alt.Tooltip(axisy, title=rotuloY),
-                alt.Tooltip(axisx, title="Contagem"),
-            ],
-        )
-    )
-
-    # Rótulos nas barras
-    labels = (
-        alt.Chart(data.reset_index())
-        .mark_text(align='left', dx=5, dy=0, fontSize=12, color="#FFFFFF")
-        .encode(
-            y=alt.Y(axisy, title=rotuloY, sort="-x"),
-            x=alt.X(axisx, title=""),
-            text=alt.Text(axisx, format=".0f"),  # Formato dos valores exibidos
-        )
-    )
-
-    # Regra de tooltips
-    tooltips = (
-        alt.Chart(data.reset_index())
-        .mark_rule()
-        .encode(
-            y=alt.Y(axisy, title=rotuloY, sort="-x"),
-            x=alt.X(axisx, title=""),
-            opacity=alt.condition(hover, alt.value(0.3), alt.value(0)),
-            tooltip=[
-                alt.Tooltip(axisy, title=rotuloY),
-                alt.Tooltip(axisx, title="Contagem"),
-            ],
-        )
-        .add_selection(hover)
-    )
-
-    # Combinação de camadas
-    data_layer = bars + labels + tooltips
-    st.altair_chart(data_layer, use_container_width=True)
-
-def Secao1(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Selecionando colunas relevantes
-    data = original_data[['Ordem', 'Tipo', 'Data_de_Criacao', 'CT',"Disciplina"]].copy()
-
-    # Verificar se todos os filtros estão no estado padrão ou nenhum foi selecionado
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione um tipo") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Aplicar filtro padrão
-        pass
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione um tipo":
-            data = data[data['Tipo'] == st.session_state["filtro1"]]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[data['Disciplina'] == st.session_state["filtro2"]]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[data['CT'] == st.session_state["filtro3"]]
-
-    # Garantindo que 'MSPN' é datetime
-    if not np.issubdtype(data['Data_de_Criacao'].dtype, np.datetime64):
-        data['Data_de_Criacao'] = pd.to_datetime(data['Data_de_Criacao'], errors='coerce')
-
-    # Criando a coluna de mês/ano e agrupando
-   
-    data['Mes_Ano'] = data['Data_de_Criacao'].dt.to_period("M")
-    data = data.groupby("Mes_Ano")['Ordem'].count().reset_index()
-   
-    # Convertendo Mes_Ano para timestamp
-    data['Mes_Ano'] = data['Mes_Ano'].dt.to_timestamp()
-
-    # Configurando índice para Mes_Ano
-    data.set_index('Mes_Ano', inplace=True)
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Secao1(cubo):
+    # Contagem mensal de ordens para os filtros selecionados
+    data = cubo.serie("Mes_Ano", filtros_cubo()).rename("Ordem").rename_axis("Mes_Ano").to_frame()
 
     # Criando o gráfico
     with st.container(height=350):
@@ -332,32 +73,10 @@ def Secao1(data):
             rotuloY="",
             titulo="Contagem de orndes ZPM2/ZPM3",
         )
-def Secao2(data):
-    # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Selecionando colunas relevantes
-    data = original_data[['Ordem', 'Tipo', 'Data_de_Criacao', 'CT',"Disciplina"]].copy()
-
-    # Verificar se todos os filtros estão no estado padrão ou nenhum foi selecionado
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione um tipo") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Aplicar filtro padrão
-        pass
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione um tipo":
-            data = data[data['Tipo'] == st.session_state["filtro1"]]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[data['Disciplina'] == st.session_state["filtro2"]]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[data['CT'] == st.session_state["filtro3"]]
-
-    # Criando a coluna de CT e agrupando os dados por contagem de 'Ordem'
-    data = data.groupby("CT")['Ordem'].count().reset_index()
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Secao2(cubo):
+    # Contagem de ordens por CT para os filtros selecionados
+    data = cubo.serie("CT", filtros_cubo()).rename("Ordem").rename_axis("CT").reset_index()
 
     # Criar o gráfico de barras horizontais
     with st.container():
@@ -368,36 +87,10 @@ def Secao2(data):
             rotuloY="CT",   # Título do eixo Y
             titulo="Contagem de ordens ZPM2/ZPM3 por CT",  # Título do gráfico
         )
-def Secao3(data):
-     # Mantém uma cópia dos dados originais
-    original_data = data.copy()
-
-    # Selecionando colunas relevantes
-    data = original_data[['Ordem', 'Tipo', 'Data_de_Criacao', 'CT',"Disciplina"]].copy()
-
-    # Verificar se todos os filtros estão no estado padrão ou nenhum foi selecionado
-    if (
-        (not st.session_state["filtro1"] or st.session_state["filtro1"] == "Selecione um tipo") and
-        (not st.session_state["filtro2"] or st.session_state["filtro2"] == "Selecione uma disciplina") and
-        (not st.session_state["filtro3"] or st.session_state["filtro3"] == "Selecione um CT")
-    ):
-        # Aplicar filtro padrão
-        pass
-    else:
-        # Aplicar filtros específicos
-        if st.session_state["filtro1"] and st.session_state["filtro1"] != "Selecione um tipo":
-            data = data[data['Tipo'] == st.session_state["filtro1"]]
-        if st.session_state["filtro2"] and st.session_state["filtro2"] != "Selecione uma disciplina":
-            data = data[data['Disciplina'] == st.session_state["filtro2"]]
-        if st.session_state["filtro3"] and st.session_state["filtro3"] != "Selecione um CT":
-            data = data[data['CT'] == st.session_state["filtro3"]]
-
-    
-
-    # Criando a coluna de mês/ano e agrupando
-    # Criando a coluna de mês/ano e agrupando
-    data = data.groupby("Tipo")['Ordem'].count().reset_index()  # Agrupamento e contagem
-    data["Ordem"] = pd.to_numeric(data["Ordem"], errors="coerce").fillna(0)  # Substituir NaN por 0
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Secao3(cubo):
+    # Contagem de ordens por tipo para os filtros selecionados
+    data = cubo.serie("Tipo", filtros_cubo()).rename("Ordem").rename_axis("Tipo").reset_index()
     data["Ordem"] = (data["Ordem"] / data["Ordem"].sum()) * 100  # Calcular porcentagem
     data["Ordem"] = data["Ordem"].round(2)  # Arredondar valores
 
@@ -411,85 +104,50 @@ def Secao3(data):
             titulo="Contagem de ordens ZPM2/ZPM3 por CT",
         )
     
-def Filtros(data):
-    # Inicializando os filtros no st.session_state com valores padrão
-    if "filtro1" not in st.session_state:
-        st.session_state["filtro1"] = "Selecione um tipo"
-    if "filtro2" not in st.session_state:
-        st.session_state["filtro2"] = "Selecione uma disciplina"
-    if "filtro3" not in st.session_state:
-        st.session_state["filtro3"] = "Selecione um CT"
-
-    # Criando os filtros na barra lateral com valor padrão selecionado
-    st.sidebar.selectbox(
-        "Tipo:",
-        options=["Selecione um tipo"] + list(data['Tipo'].unique()),
-        index=0,  # Define "Selecione uma empresa" como padrão
-        key="filtro1",
-    )
-    st.sidebar.selectbox(
-        "Disciplina:",
-        options=["Selecione uma disciplina"] + list(data["Disciplina"].unique()),
-        index=0,  # Define "Selecione uma disciplina" como padrão
-        key="filtro2",
-    )
-    st.sidebar.selectbox(
-        "CT:",
-        options=["Selecione um CT"] + list(data["CT"].unique()),
-        index=0,  # Define "Selecione uma disciplina" como padrão
-        key="filtro3",
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Tabela(data):
+    # Só a página visível é enviada ao navegador
+    Tabela_Paginada(
+        data,
+        colunas=["Ordem","Tipo","Texto_da_Ordem","Empresa","CT","Data_de_Encerramento","Disciplina"],
+        chave="tabela_ordens",
+        filtros=selecao(FILTROS, ANO),
+        ordenar_por="Data_de_Encerramento",
+        busca="Texto_da_Ordem",
     )
-  
 
-def Filtro_Ano(data):
-    # Criando uma coluna de ano
-    data['Ano'] = data['Data_de_Criacao'].dt.year
-    lista_anos = list(data['Ano'].unique())
-
-    # CSS para aumentar o tamanho do texto "Ano"
-    st.markdown(
-        """
-        <style>
-        label[data-testid="stSelectboxLabel"] {
-            font-size: 20px; /* Altere o tamanho da fonte aqui */
-            font-weight: bold; /* Deixe o texto em negrito se desejar */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-    # Criando o selectbox
-    option = st.selectbox(
-        "Ano",
-        lista_anos,
-        index=None,
-        placeholder="Selecione um ano...",
-    )
 
-    return option
+@secao("filtro1", "filtro2", "filtro3", "filtro_ano", "filtro_meses")
+def Exportacao(data):
+    # O arquivo segue os mesmos filtros das seções do dashboard
+    Baixar_Dados(data, "ordens_zpm2_zpm3", filtros=selecao(FILTROS, ANO), chave="exportar_ordens")
 
 
-data=load_data()
+with etapa("carga"):
+    ordens = load_data()
+    data = ordens.dados()
 
 
 tab1, tab2 = st.tabs(["📊 DashBoard: Ordens ZPM2/ZPM3", "📥 Baixar dados"])
 
 with tab1:
     st.title("Ordens ZPM2/ZPM3 :chart_with_upwards_trend:")
-    Filtros(data)
+    Filtros(data, FILTROS)
     st.divider()
-    Filtro_Ano(data)
-    Metricas(data)
-    Secao1(data)
-    Secao2(data)
-    Secao3(data)
+    Filtro_Ano(data, ANO)
+    # Cubo mantido pelo estado incremental: cada atualização soma só as linhas novas
+    cubo = ordens.cubo(dimensoes_ordens)
+    Executar_Secao(Metricas, cubo)
+    Executar_Secao(Secao1, cubo)
+    Executar_Secao(Secao2, cubo)
+    Executar_Secao(Secao3, cubo)
     #st.write(data.columns)
-    st.dataframe(data[["Ordem","Tipo","Texto_da_Ordem","Empresa","CT","Data_de_Encerramento","Disciplina"]],hide_index=True,use_container_width=True)
+    Executar_Secao(Tabela, data)
     #Tabela(data1)
 
 
 
 with tab2:
     st.write("📥 Baixar Dados")
+    Executar_Secao(Exportacao, data)
 